@@ -13,6 +13,10 @@ interface PitchPageData {
   error: string | null;
 }
 
+// Calendar months the pitch compares actual and optimal cashback over: last month and
+// this month so far, so there is a full month of spending even early in the month
+const PITCH_MONTHS = 2;
+
 const PitchPage: React.FC = () => {
   const navigate = useNavigate();
   const { user } = useAuth();
@@ -34,10 +38,11 @@ const PitchPage: React.FC = () => {
         setRewardsData(prev => ({ ...prev, isLoading: true, error: null }));
         console.log("Fetching rewards data...");
 
-        // Create an array of promises to fetch both data sources simultaneously
+        // Create an array of promises to fetch both data sources simultaneously;
+        // both cover the same calendar months so the totals can be compared
         const [cashbackResponse, optimalResponse] = await Promise.all([
-          plaidService.getCashBackSummary(user?.id),
-          plaidService.getOptimalCashBack(user?.id)
+          plaidService.getCashBackSummary(user?.id, PITCH_MONTHS),
+          plaidService.getOptimalCashBack(user?.id, PITCH_MONTHS)
         ]);
 
         console.log("Cashback response:", cashbackResponse);
@@ -142,7 +147,7 @@ const PitchPage: React.FC = () => {
             <>
               <div className="rewards-comparison">
                 <div className="time-period-label">
-                  Based on your spending data from {getPreviousMonthName()}
+                  Based on your spending data since the start of {getPreviousMonthName()}
                 </div>
 
                 <div className="rewards-card current">
@@ -137,15 +137,19 @@ export const plaidService = {
     return response.data;
   },
 
-  // Get cash back summary for a user
-  getCashBackSummary: async (userId?: string) => {
-    const response = await api.get(`/transactions/cashback${userId ? `?user_id=${userId}` : ''}`);
+  // Get cash back summary for a user over the last `months` calendar months (default: this month)
+  getCashBackSummary: async (userId?: string, months?: number) => {
+    const response = await api.get('/transactions/cashback', {
+      params: { user_id: userId, months }
+    });
     return response.data;
   },
 
-  // Get optimal cash back summary for a user
-  getOptimalCashBack: async (userId?: string) => {
-    const response = await api.get(`/transactions/optimal-cashback${userId ? `?user_id=${userId}` : ''}`);
+  // Get optimal cash back for a user over the same window as getCashBackSummary
+  getOptimalCashBack: async (userId?: string, months?: number) => {
+    const response = await api.get('/transactions/optimal-cashback', {
+      params: { user_id: userId, months }
+    });
     return response.data;
   },
 
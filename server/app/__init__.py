@@ -2,6 +2,7 @@ from flask import Flask
 from flask_cors import CORS
 from supabase import Client, create_client
 from dotenv import load_dotenv
+import logging
 import os
 
 # Load environment variables
@@ -16,6 +17,10 @@ def create_app():
     # Configure the Flask application
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev')
     
+    # Configure logging once for the whole app rather than at import time
+    logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    logging.getLogger('plaid').setLevel(os.getenv('PLAID_LOG_LEVEL', 'INFO').upper())
+    
     # Initialize CORS with specific configuration
     CORS(app, 
          resources={r"/*": {"origins": ["http://localhost:3000", "http://127.0.0.1:3000", "https://www.smartswipe.co", "http://smartswipe.co", "https://smartswipe.co"]}},
@@ -0,0 +1,67 @@
+import numpy as np
+
+def _group_totals(codes, abs_cents, size):
+    """Row count and exact absolute cents per code, both as int64 arrays of length size."""
+    counts = np.bincount(codes, minlength=size)
+    # float64 weights are exact for integer cents below 2**53 (about $90 trillion)
+    cents = np.bincount(codes, weights=abs_cents, minlength=size).astype(np.int64)
+    return counts, cents
+
+def summarize_transactions(frame):
+    """
+    Compute the /transactions/summary payload from a TransactionFrame in one vectorized pass.
+    Totals are exact sums of integer cents converted to dollars once at the end, and groups
+    appear in first-seen order, as in TransactionSummarySchema's input.
+
+    Args:
+        frame: The TransactionFrame to summarize
+
+    Returns:
+        A dict with total_transactions, total_amount, income, expenses and the
+        categories, accounts and institutions breakdowns
+    """
+    cents = frame.amount_cents
+    abs_cents = np.abs(cents)
+
+    summary = {
+        'total_transactions': len(frame),
+        'total_amount': int(abs_cents.sum()) / 100,
+        'income': int(cents[cents > 0].sum()) / 100,
+        'expenses': int(abs_cents[cents < 0].sum()) / 100,
+        'categories': {},
+        'accounts': {},
+        'institutions': {}
+    }
+
+    category_counts, category_cents = _group_totals(frame.category_codes, abs_cents, len(frame.categories))
+    for code, category in enumerate(frame.categories):
+        summary['categories'][category] = {
+            'count': int(category_counts[code]),
+            'amount': int(category_cents[code]) / 100
+        }
+
+    account_counts, account_cents = _group_totals(frame.account_codes, abs_cents, len(frame.account_ids))
+    for code, account_id in enumerate(frame.account_ids):
+        summary['accounts'][account_id] = {
+            'name': frame.account_names[code],
+            'count': int(account_counts[code]),
+            'amount': int(account_cents[code]) / 100
+        }
+
+    # Institutions are a property of accounts, so roll the account totals up instead of
+    # scanning the rows again
+    institution_codes = {}
+    for name in frame.institution_names:
+        institution_codes.setdefault(name, len(institution_codes))
+    account_institutions = np.array(
+        [institution_codes[name] for name in frame.institution_names], dtype=np.int64
+    )
+    institution_counts = np.bincount(account_institutions, weights=account_counts, minlength=len(institution_codes))
+    institution_cents = np.bincount(account_institutions, weights=account_cents, minlength=len(institution_codes))
+    for name, code in institution_codes.items():
+        summary['institutions'][name] = {
+            'count': int(institution_counts[code]),
+            'amount': int(institution_cents[code]) / 100
+        }
+
+    return summary
@@ -0,0 +1,112 @@
+import time
+import logging
+from datetime import timedelta
+
+import numpy as np
+
+from app.transactions.caps import PERIODS, period_bounds, period_of
+from app.transactions.frame import TransactionFrame
+from app.transactions.optimizer import optimize_assignment, price_assignment
+from app.transactions.rewards import REWARDS_PROGRAMS
+
+logger = logging.getLogger('plaid.backtest')
+
+def backtest_windows(start_date, end_date, period):
+    """
+    Split a date range at calendar period boundaries.
+
+    Args:
+        start_date: First date (inclusive)
+        end_date: Last date (inclusive)
+        period: 'quarter' or 'year'
+
+    Yields:
+        (start, end) date windows in order, the first and last clipped to the range
+    """
+    start = start_date
+    while start <= end_date:
+        _, last = period_bounds(start, period)
+        yield start, min(last, end_date)
+        start = last + timedelta(days=1)
+
+def _monthly_totals(frame, actual, optimal):
+    """Per calendar month of frame: (label, spending, actual, optimal), oldest first."""
+    amounts = np.abs(frame.amount_cents) / 100
+    months, month_rows = np.unique(frame.dates.astype('datetime64[M]'), return_inverse=True)
+    month_rows = month_rows.reshape(-1)
+    spending = np.bincount(month_rows, weights=amounts, minlength=len(months))
+    actual = np.bincount(month_rows, weights=actual, minlength=len(months))
+    optimal = np.bincount(month_rows, weights=optimal, minlength=len(months))
+    return list(zip(np.datetime_as_string(months).tolist(), spending.tolist(), actual.tolist(), optimal.tolist()))
+
+def iter_backtest(load_window, account_programs, start_date, end_date, programs=None):
+    """
+    Replay a history window by window, pricing what each transaction earned on the card
+    it was made with and what the cap-aware optimal assignment would have earned.
+
+    Windows are whole calendar periods of the longest cap any program has, so every cap
+    period is seen complete and in order, and only one window's transactions are held
+    at a time however long the history is.
+
+    Args:
+        load_window: Callable (start_date, end_date) -> normalized transactions
+        account_programs: account_id -> RewardsProgram of the card it is
+        start_date: First date (inclusive) to replay
+        end_date: Last date (inclusive) to replay
+        programs: Programs the optimal assignment chooses from; defaults to REWARDS_PROGRAMS
+
+    Yields:
+        One dict per calendar month with transactions, in order: month ('YYYY-MM'),
+        spending, actual and optimal
+    """
+    programs = list(REWARDS_PROGRAMS.values()) if programs is None else list(programs)
+    columns_by_name = {program.name: j for j, program in enumerate(programs)}
+    cap_periods = [program.cap_period for program in programs if program.capped_rules]
+    period = max(cap_periods, key=PERIODS.index) if cap_periods else PERIODS[0]
+
+    for window_start, window_end in backtest_windows(start_date, end_date, period):
+        started = time.perf_counter()
+        frame = TransactionFrame.from_transactions(load_window(window_start, window_end))
+        if not len(frame):
+            continue
+
+        account_columns = np.array([
+            columns_by_name.get(account_programs[account_id].name, -1) if account_id in account_programs else -1
+            for account_id in frame.account_ids
+        ], dtype=np.int64)
+        columns = account_columns[frame.account_codes]
+
+        # Cap periods never straddle windows, so a fresh ledger per window is exact
+        actual = price_assignment(frame, columns, programs)
+        optimal = optimize_assignment(frame, programs, start=columns).rewards
+
+        for month, spending, actual_total, optimal_total in _monthly_totals(frame, actual, optimal):
+            yield {'month': month, 'spending': spending, 'actual': actual_total, 'optimal': optimal_total}
+
+        logger.info(
+            f"Backtested {window_start.isoformat()} to {window_end.isoformat()}: "
+            f"{len(frame)} transactions in {(time.perf_counter() - started) * 1000:.1f}ms"
+        )
+
+def run_backtest(load_window, account_programs, start_date, end_date, programs=None):
+    """
+    Run iter_backtest to the end and roll the months up into quarters.
+
+    Returns:
+        A dict with monthly and quarterly series (each entry with spending, actual,
+        optimal and missed = optimal - actual) and the totals over the whole range
+    """
+    monthly = []
+    quarterly = []
+    for month in iter_backtest(load_window, account_programs, start_date, end_date, programs):
+        quarter = period_of(f"{month['month']}-01", 'quarter')
+        if not quarterly or quarterly[-1]['quarter'] != quarter:
+            quarterly.append({'quarter': quarter, 'spending': 0.0, 'actual': 0.0, 'optimal': 0.0})
+        for key in ('spending', 'actual', 'optimal'):
+            quarterly[-1][key] += month[key]
+        monthly.append(month)
+
+    totals = {key: sum(month[key] for month in monthly) for key in ('spending', 'actual', 'optimal')}
+    for entry in monthly + quarterly + [totals]:
+        entry['missed'] = entry['optimal'] - entry['actual']
+    return {'monthly': monthly, 'quarterly': quarterly, 'totals': totals}
@@ -0,0 +1,72 @@
+import time
+import threading
+from collections import OrderedDict
+
+class TTLCache:
+    """
+    Thread-safe in-process LRU cache with an optional per-entry time to live.
+    Once maxsize entries are held, the least recently used one is evicted.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None):
+        """
+        Args:
+            maxsize: Maximum number of entries kept
+            ttl: Seconds an entry stays valid, or None to keep entries until evicted
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        """Get a cached value, or default if it is missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > time.time():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, stored_at=None):
+        """
+        Cache a value.
+
+        Args:
+            key: The cache key
+            value: The value to cache
+            stored_at: When the value was fetched, for entries restored from elsewhere; defaults to now
+        """
+        stored_at = time.time() if stored_at is None else stored_at
+        expires_at = stored_at + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop every entry and reset the hit/miss counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """Get the entry count and hit/miss counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
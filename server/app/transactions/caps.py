@@ -0,0 +1,126 @@
+import threading
+from datetime import date, timedelta
+
+# Calendar periods a spending cap can reset on
+PERIODS = ('quarter', 'year')
+
+def period_of(date, period):
+    """
+    Get the calendar period a transaction date falls in.
+
+    Args:
+        date: A 'YYYY-MM-DD' string, or anything whose isoformat() is one
+        period: 'quarter' or 'year'
+
+    Returns:
+        A period label such as '2024-Q2' or '2024'
+    """
+    if not isinstance(date, str):
+        date = date.isoformat()
+    year = date[:4]
+    if period == 'year':
+        return year
+    if period == 'quarter':
+        return f"{year}-Q{(int(date[5:7]) - 1) // 3 + 1}"
+    raise ValueError(f"Unknown cap period {period}")
+
+def period_bounds(day, period):
+    """
+    Get the first and last day of the calendar period a date falls in.
+
+    Args:
+        day: A datetime.date
+        period: 'quarter' or 'year'
+
+    Returns:
+        A (first, last) tuple of datetime.date
+    """
+    if period == 'year':
+        return date(day.year, 1, 1), date(day.year, 12, 31)
+    if period == 'quarter':
+        first_month = (day.month - 1) // 3 * 3 + 1
+        first = date(day.year, first_month, 1)
+        following = date(day.year + 1, 1, 1) if first_month == 10 else date(day.year, first_month + 3, 1)
+        return first, following - timedelta(days=1)
+    raise ValueError(f"Unknown cap period {period}")
+
+class CapLedger:
+    """
+    Running usage of rewards caps keyed by (user, program, cap, period).
+    Rewards programs are stateless; whoever evaluates them owns a ledger, so concurrent
+    requests and worker threads never see each other's spending. Each reservation is a
+    single O(1) check-and-update under a lock, and a new calendar period simply starts
+    from an empty key.
+    """
+
+    def __init__(self):
+        self._usage = {}
+        self._lock = threading.Lock()
+
+    def used(self, user_id, program, cap, period):
+        """How much of a cap has been used in a period."""
+        return self._usage.get((user_id, program, cap, period), 0)
+
+    def reserve(self, user_id, program, cap, period, amount, limit, partial=False, commit=True):
+        """
+        Atomically take amount out of a cap.
+
+        Args:
+            user_id: Whose spending this is; None for anonymous evaluations
+            program: Name of the rewards program owning the cap
+            cap: Name of the cap within the program
+            period: Period label from period_of
+            amount: Spending to count against the cap
+            limit: The cap's size per period
+            partial: Take whatever room is left when amount does not fit entirely,
+                instead of nothing
+            commit: Record the reservation; False only reports what would be reserved
+
+        Returns:
+            The amount reserved: amount, the remaining room (partial only) or 0
+        """
+        key = (user_id, program, cap, period)
+        with self._lock:
+            used = self._usage.get(key, 0)
+            # Amounts are dollars; summing to the cent keeps float drift from pushing
+            # spending that exactly fills the cap over it
+            total = round(used + amount, 2)
+            if total <= limit:
+                if commit:
+                    self._usage[key] = total
+                return amount
+            if partial and limit - used > 0:
+                if commit:
+                    self._usage[key] = limit
+                return limit - used
+            return 0
+
+    def copy(self):
+        """A new ledger starting from this one's usage, for pricing alternatives on top of it."""
+        ledger = CapLedger()
+        with self._lock:
+            ledger._usage = dict(self._usage)
+        return ledger
+
+    def probe(self):
+        """
+        A view of this ledger whose reservations are never recorded, for quoting a
+        reward against current usage without spending any of it.
+        """
+        return _LedgerProbe(self)
+
+    def clear(self):
+        with self._lock:
+            self._usage.clear()
+
+class _LedgerProbe:
+    """Read-only stand-in for a CapLedger; see CapLedger.probe."""
+
+    def __init__(self, ledger):
+        self._ledger = ledger
+
+    def used(self, user_id, program, cap, period):
+        return self._ledger.used(user_id, program, cap, period)
+
+    def reserve(self, user_id, program, cap, period, amount, limit, partial=False):
+        return self._ledger.reserve(user_id, program, cap, period, amount, limit, partial=partial, commit=False)
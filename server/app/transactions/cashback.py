@@ -0,0 +1,140 @@
+import json
+import time
+import hashlib
+import logging
+import threading
+from datetime import date
+
+import numpy as np
+
+from app.transactions.backtest import backtest_windows
+from app.transactions.caps import period_bounds
+from app.transactions.frame import TransactionFrame
+from app.transactions.optimizer import price_assignment
+from app.transactions.rewards import REWARDS_FINGERPRINT
+from app.transactions.store import get_transaction_store
+
+logger = logging.getLogger('plaid.cashback')
+
+# One refresh per user at a time, so concurrent requests never price the same windows twice
+_user_locks = {}
+_user_locks_guard = threading.Lock()
+
+def _get_user_lock(user_id):
+    with _user_locks_guard:
+        return _user_locks.setdefault(str(user_id), threading.Lock())
+
+def cashback_fingerprint(context):
+    """
+    Digest of what a user's cashback aggregates are built from besides the transactions
+    themselves: which linked accounts have which rewards program, and the program
+    definitions. Any change to either means rebuilding the aggregates.
+    """
+    accounts = sorted(
+        (str(item['id']), account['account_id'], context.account_map[account['account_id']]['rewards_program'])
+        for item in context.items
+        for account in context.accounts_by_item.get(item['id'], [])
+    )
+    return hashlib.sha256(json.dumps([REWARDS_FINGERPRINT, accounts]).encode()).hexdigest()
+
+def _drop_superseded(plaid_transactions):
+    """
+    Leave out pending transactions whose posted version is also stored. Plaid removes the
+    pending one when it posts, but a sync interrupted in between must not count it twice.
+    """
+    posted = {tx.get('pending_transaction_id') for tx in plaid_transactions if not tx.get('pending')}
+    return [tx for tx in plaid_transactions if not (tx.get('pending') and tx.get('transaction_id') in posted)]
+
+def _price_window(store, program, account_items, start_date, end_date, normalize):
+    """
+    Cashback of one program's cards over a whole cap period, caps counted from its start.
+
+    Returns:
+        (month, spending, cashback) for each month of the window with transactions
+    """
+    stored = store.get_transactions(sorted(set(account_items.values())), start_date, end_date)
+    plaid_transactions = _drop_superseded([
+        tx for item_transactions in stored.values() for tx in item_transactions
+        if tx.get('account_id') in account_items
+    ])
+    # Same order as load_user_transactions, so same-day purchases meet the caps in the same order
+    transactions = normalize(plaid_transactions)
+    transactions.sort(key=lambda x: (x['date'], x['id']), reverse=True)
+    frame = TransactionFrame.from_transactions(transactions)
+    if not len(frame):
+        return []
+
+    cashback = price_assignment(frame, np.zeros(len(frame), dtype=np.int64), [program])
+    months, month_rows = np.unique(frame.dates.astype('datetime64[M]'), return_inverse=True)
+    month_rows = month_rows.reshape(-1)
+    spending = np.bincount(month_rows, weights=np.abs(frame.amount_cents) / 100, minlength=len(months))
+    cashback = np.bincount(month_rows, weights=cashback, minlength=len(months))
+    return list(zip(np.datetime_as_string(months).tolist(), spending.tolist(), cashback.tolist()))
+
+def refresh_cashback(context, normalize):
+    """
+    Bring a user's materialized cashback aggregates, one row per (program, month), up to
+    date with the transaction store.
+
+    Only the cap periods holding a month where a transaction was added, modified or
+    removed since the last refresh are priced again: a change can move later purchases
+    of the same period over or under a cap, but never touches another period. A pending
+    transaction that posts is removed and re-added, so both its old and new periods are
+    refreshed. Everything is rebuilt when the user's accounts, their programs or the
+    program definitions change. All windows are priced before anything is written, and
+    then saved together (see TransactionStore.save_cashback).
+
+    Args:
+        context: The user's UserDataContext
+        normalize: Callable (raw Plaid transactions, account_map) -> normalized transactions
+    """
+    with _get_user_lock(context.user_id):
+        started = time.perf_counter()
+        store = get_transaction_store()
+        account_programs = context.account_programs
+        programs = {program.name: program for program in account_programs.values()}
+        linked_items = [item for item in context.items if context.accounts_by_item.get(item['id'])]
+        item_ids = [item['id'] for item in linked_items]
+        account_items = {
+            account['account_id']: item['id'] for item in linked_items for account in context.accounts_by_item[item['id']]
+        }
+
+        marker, dirty = store.get_cashback_dirty(item_ids)
+        fingerprint = cashback_fingerprint(context)
+        rebuild = store.get_cashback_fingerprint(context.user_id) != fingerprint
+
+        # Every cap period of every program to price again
+        windows = set()
+        if rebuild:
+            first, last = store.get_date_range(item_ids)
+            if first:
+                for program in programs.values():
+                    for window in backtest_windows(date.fromisoformat(first), date.fromisoformat(last), program.cap_period):
+                        windows.add((program.name, period_bounds(window[0], program.cap_period)))
+        else:
+            for account_id, month in dirty:
+                program = account_programs.get(account_id)
+                if program is not None:
+                    windows.add((program.name, period_bounds(date.fromisoformat(f'{month}-01'), program.cap_period)))
+            if not windows and marker is None:
+                return
+
+        replaced = []
+        for program_name, (start_date, end_date) in sorted(windows):
+            program_accounts = {
+                account_id: account_items[account_id]
+                for account_id, program in account_programs.items()
+                if program.name == program_name and account_id in account_items
+            }
+            months = _price_window(
+                store, programs[program_name], program_accounts, start_date, end_date,
+                lambda plaid_transactions: normalize(plaid_transactions, context.account_map)
+            )
+            replaced.append((program_name, start_date.isoformat()[:7], end_date.isoformat()[:7], months))
+
+        store.save_cashback(context.user_id, fingerprint, replaced, item_ids, marker, rebuild=rebuild)
+        if windows:
+            logger.info(
+                f"Refreshed cashback for user {context.user_id}: {len(windows)} cap periods"
+                f"{' (full rebuild)' if rebuild else ''} in {(time.perf_counter() - started) * 1000:.1f}ms"
+            )
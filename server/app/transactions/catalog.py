@@ -0,0 +1,180 @@
+import json
+
+import numpy as np
+
+from app.transactions.caps import PERIODS
+from app.transactions.matcher import MATCH_FIELDS, RuleMatcher
+
+# Fields a catalog rule can test: substrings of the MATCH_FIELDS, exact payment channels
+CONDITION_FIELDS = MATCH_FIELDS + ('payment_channel',)
+
+def _parse_condition(name, rule, field, value):
+    """
+    Normalize one field condition of a catalog rule to (field, patterns, case_sensitive).
+    A list of patterns matches case-insensitively; {"patterns": [...], "case_sensitive": true}
+    matches exactly. Payment channels are always compared whole and exactly.
+    """
+    case_sensitive = field == 'payment_channel'
+    if isinstance(value, dict):
+        case_sensitive = bool(value.get('case_sensitive', case_sensitive))
+        value = value.get('patterns')
+    if not isinstance(value, list) or not value or not all(isinstance(pattern, str) and pattern for pattern in value):
+        raise ValueError(f"{name}: rule {rule} needs a non-empty list of patterns for {field}")
+    return field, tuple(value), case_sensitive
+
+def parse_program(definition):
+    """
+    Validate one program of a rewards catalog and normalize it.
+
+    A program has a name, rates (rule -> rate), rules tried in order with the first
+    match winning, a default rule for everything else, and optionally caps
+    (rule -> {"limit", "overflow", "partial"}) that reset every cap_period. A rule
+    matches when all of its field conditions do.
+
+    Returns:
+        A dict with name, rates, rules as (rule, conditions) tuples, default, caps as
+        rule -> (limit, overflow_rule, partial) and cap_period
+    """
+    name = definition.get('name')
+    if not isinstance(name, str) or not name:
+        raise ValueError(f"Catalog program without a name: {definition!r}")
+
+    rates = definition.get('rates')
+    if not isinstance(rates, dict) or not rates:
+        raise ValueError(f"{name}: rates must map rule names to rates")
+    rates = {rule: float(rate) for rule, rate in rates.items()}
+
+    rules = []
+    for entry in definition.get('rules', []):
+        rule = entry.get('rule')
+        if rule not in rates:
+            raise ValueError(f"{name}: rule {rule!r} has no rate")
+        unknown = set(entry) - {'rule'} - set(CONDITION_FIELDS)
+        if unknown:
+            raise ValueError(f"{name}: rule {rule} tests unknown fields {sorted(unknown)}")
+        conditions = tuple(
+            _parse_condition(name, rule, field, entry[field]) for field in CONDITION_FIELDS if field in entry
+        )
+        if not conditions:
+            raise ValueError(f"{name}: rule {rule} has no conditions; use default instead")
+        rules.append((rule, conditions))
+
+    default = definition.get('default')
+    if default not in rates:
+        raise ValueError(f"{name}: default rule {default!r} has no rate")
+
+    caps = {}
+    for rule, terms in definition.get('caps', {}).items():
+        if rule not in rates or terms.get('overflow') not in rates:
+            raise ValueError(f"{name}: cap on {rule!r} must name rated rules")
+        caps[rule] = (float(terms['limit']), terms['overflow'], bool(terms.get('partial', False)))
+
+    cap_period = definition.get('cap_period', PERIODS[0])
+    if cap_period not in PERIODS:
+        raise ValueError(f"{name}: cap_period must be one of {PERIODS}")
+
+    return {
+        'name': name,
+        'rates': rates,
+        'rules': tuple(rules),
+        'default': default,
+        'caps': caps,
+        'cap_period': cap_period
+    }
+
+def read_catalog(path):
+    """
+    Read and validate a rewards catalog JSON file ({"programs": [...]}).
+
+    Returns:
+        The parse_program output of every program, in file order
+    """
+    with open(path) as f:
+        definitions = json.load(f)['programs']
+    programs = [parse_program(definition) for definition in definitions]
+
+    names = [program['name'] for program in programs]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"Catalog programs defined more than once: {duplicates}")
+    return programs
+
+class CompiledCatalog:
+    """
+    The rules of many catalog programs compiled into shared lookup tables.
+
+    Every distinct field condition across all programs is numbered once. Substring
+    conditions go into one RuleMatcher and payment channels into a dict, so a
+    transaction's hit conditions come from a single scan and a dict lookup. Rules are
+    flattened in program order with the default rule last; each rule needs a known
+    number of hit conditions, and a program's rule is the first of its rules that gets
+    them all. Classifying a transaction is then a bincount, a comparison and a
+    minimum.reduceat, however many programs there are.
+    """
+
+    def __init__(self, programs):
+        """
+        Args:
+            programs: CatalogPrograms, in column order
+        """
+        self.programs = list(programs)
+        condition_ids = {}
+        condition_rules = []
+        matcher = RuleMatcher()
+        self._channels = {}
+
+        rule_keys = []
+        rule_rates = []
+        needed = []
+        self._offsets = []
+        for program in self.programs:
+            self._offsets.append(len(rule_keys))
+            for rule, conditions in program.match_order + ((program.default, ()),):
+                rule_index = len(rule_keys)
+                for condition in conditions:
+                    condition_id = condition_ids.get(condition)
+                    if condition_id is None:
+                        condition_id = condition_ids[condition] = len(condition_rules)
+                        condition_rules.append([])
+                        field, patterns, case_sensitive = condition
+                        if field == 'payment_channel':
+                            for channel in patterns:
+                                self._channels.setdefault(channel, []).append(condition_id)
+                        else:
+                            matcher.add_rule('catalog', condition_id, field, patterns, case_sensitive)
+                    condition_rules[condition_id].append(rule_index)
+                rule_keys.append(rule)
+                rule_rates.append(program.rules[rule])
+                needed.append(len(conditions))
+
+        self._matcher = matcher.build()
+        self._condition_rules = [np.array(rules, dtype=np.int64) for rules in condition_rules]
+        self._rule_keys = np.array(rule_keys, dtype=object)
+        self._rule_rates = np.array(rule_rates)
+        self._needed = np.array(needed, dtype=np.int64)
+        self._positions = np.arange(len(rule_keys))
+        self._offsets = np.array(self._offsets, dtype=np.int64)
+
+    def classify(self, transaction):
+        """
+        Rule and rate of a transaction under every program, ignoring caps.
+
+        Args:
+            transaction: Dict with merchant_name, category and payment_channel
+
+        Returns:
+            A (rules, rates) tuple with one rule key and rate per program
+        """
+        hit = [condition_id for _, condition_id in self._matcher.match(transaction)]
+        hit.extend(self._channels.get(transaction.get('payment_channel', ''), ()))
+
+        if hit:
+            counts = np.bincount(
+                np.concatenate([self._condition_rules[condition_id] for condition_id in hit]),
+                minlength=len(self._needed)
+            )
+            matched = counts == self._needed
+        else:
+            matched = self._needed == 0
+        first = np.minimum.reduceat(np.where(matched, self._positions, len(self._positions)), self._offsets)
+        return tuple(self._rule_keys[first].tolist()), tuple(self._rule_rates[first].tolist())
@@ -0,0 +1,127 @@
+import os
+import logging
+
+logger = logging.getLogger('plaid')
+
+def get_plaid_base_url():
+    """Get the appropriate Plaid API URL based on environment."""
+    env = os.getenv('PLAID_ENV', 'sandbox')
+    if env == 'development':
+        return 'https://development.plaid.com'
+    elif env == 'production':
+        return 'https://production.plaid.com'
+    else:
+        return 'https://sandbox.plaid.com'
+
+def get_int_setting(name, default, minimum=1, maximum=None):
+    """Read an integer setting from the environment, clamped to [minimum, maximum]."""
+    try:
+        value = int(os.getenv(name, str(default)))
+    except ValueError:
+        logger.warning(f"Invalid value for {name}, using default {default}")
+        value = default
+    value = max(minimum, value)
+    if maximum is not None:
+        value = min(maximum, value)
+    return value
+
+def get_plaid_max_concurrency():
+    """Get the maximum number of Plaid requests issued in parallel per fan-out."""
+    return get_int_setting('PLAID_MAX_CONCURRENCY', 8)
+
+# Plaid caps transactions/get at 500 transactions per page
+PLAID_MAX_PAGE_SIZE = 500
+
+def get_plaid_page_size():
+    """Get the number of transactions requested per transactions/get page."""
+    return get_int_setting('PLAID_PAGE_SIZE', PLAID_MAX_PAGE_SIZE, maximum=PLAID_MAX_PAGE_SIZE)
+
+def get_plaid_max_pages_per_item():
+    """Get the maximum number of transactions/get pages fetched for a single item."""
+    return get_int_setting('PLAID_MAX_PAGES_PER_ITEM', 20)
+
+def get_transactions_source():
+    """
+    Get where transaction endpoints read from.
+    'sync' serves them from the local store kept current with /transactions/sync;
+    'get' fetches the window live from /transactions/get on every request.
+    """
+    source = os.getenv('PLAID_TRANSACTIONS_SOURCE', 'sync').lower()
+    if source not in ('sync', 'get'):
+        logger.warning(f"Unknown PLAID_TRANSACTIONS_SOURCE '{source}', using 'sync'")
+        return 'sync'
+    return source
+
+def get_transaction_store_path():
+    """Get the path of the SQLite database backing the local transaction store."""
+    default_path = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'transactions.db')
+    return os.getenv('TRANSACTION_STORE_PATH', os.path.normpath(default_path))
+
+def get_rewards_catalog_path():
+    """Get the path of the JSON rewards catalog the rewards programs are loaded from."""
+    return os.getenv('REWARDS_CATALOG_PATH', os.path.join(os.path.dirname(__file__), 'rewards_catalog.json'))
+
+def get_sync_interval():
+    """Get how many seconds a synced item is served from the store before it is synced again."""
+    return get_int_setting('PLAID_SYNC_INTERVAL', 300, minimum=0)
+
+# Plaid caps /transactions/sync at 500 updates per page
+PLAID_MAX_SYNC_PAGE_SIZE = 500
+
+def get_plaid_http_pool_size():
+    """Get how many keep-alive connections the shared Plaid session keeps open."""
+    return get_int_setting('PLAID_HTTP_POOL_SIZE', 16)
+
+def get_plaid_timeouts():
+    """Get the (connect, read) timeouts in seconds for Plaid requests."""
+    return (
+        get_int_setting('PLAID_CONNECT_TIMEOUT', 5),
+        get_int_setting('PLAID_READ_TIMEOUT', 30)
+    )
+
+def get_plaid_max_retries():
+    """Get how many times a rate-limited or failed Plaid request is retried."""
+    return get_int_setting('PLAID_MAX_RETRIES', 3, minimum=0)
+
+def get_institution_cache_ttl():
+    """Get how many seconds institution metadata is cached."""
+    return get_int_setting('INSTITUTION_CACHE_TTL', 7 * 24 * 3600)
+
+def get_institution_cache_path():
+    """Get the JSON file backing the institution cache across restarts, or None to keep it in memory only."""
+    return os.getenv('INSTITUTION_CACHE_PATH') or None
+
+def get_plaid_webhook_url():
+    """Get the public URL Plaid should send webhooks to, or None if webhooks are not used."""
+    return os.getenv('PLAID_WEBHOOK_URL') or None
+
+def is_webhook_verification_enabled():
+    """Whether webhook signatures are checked; only disable this for local testing."""
+    return os.getenv('PLAID_WEBHOOK_VERIFICATION', 'true').lower() not in ('false', '0', 'no')
+
+def get_debug_sample_percent():
+    """Get the percentage of requests whose row-level debug lines are logged (0-100)."""
+    return get_int_setting('PLAID_DEBUG_SAMPLE_PERCENT', 1, minimum=0, maximum=100)
+
+def get_debug_sample_rows():
+    """Get how many rows per batch a sampled request logs at debug level."""
+    return get_int_setting('PLAID_DEBUG_SAMPLE_ROWS', 5, minimum=0)
+
+def get_reward_rate_cache_size():
+    """Get how many (merchant, category, channel) reward rate entries are cached per process."""
+    return get_int_setting('REWARD_RATE_CACHE_SIZE', 4096)
+
+def get_swipe_state_ttl():
+    """Get the seconds a user's precomputed card routing state is served before it is rebuilt."""
+    return get_int_setting('SWIPE_STATE_TTL', 300)
+
+def get_swipe_state_cache_size():
+    """Get how many users' card routing states are kept per process."""
+    return get_int_setting('SWIPE_STATE_CACHE_SIZE', 1024)
+
+def get_simulation_workers():
+    """
+    Get the number of worker processes card catalog simulations are sharded across.
+    0 or 1 runs simulations in the request's own process.
+    """
+    return get_int_setting('SIMULATION_WORKERS', os.cpu_count() or 1, minimum=0)
@@ -0,0 +1,130 @@
+import logging
+from datetime import datetime, timedelta
+from flask import g
+
+from app.transactions.repository import get_user_items, get_accounts_for_items
+from app.transactions.frame import TransactionFrame
+from app.transactions.rewards import REWARDS_PROGRAMS, resolve_rewards_program
+
+logger = logging.getLogger('plaid.context')
+
+# Default transaction window used by the dashboard endpoints
+DEFAULT_WINDOW_DAYS = 30
+
+class UserDataContext:
+    """
+    Per-request view of one user's linked data.
+    Items, accounts and normalized transactions are loaded lazily on first access and
+    memoized, so a request that needs them in several places hits Supabase and Plaid once.
+    Analytics read the columnar TransactionFrame built from the same transactions.
+    """
+
+    def __init__(self, user_id, transactions_loader):
+        """
+        Args:
+            user_id: The user whose data is loaded
+            transactions_loader: Callable (context, start_date, end_date) -> normalized transactions
+        """
+        self.user_id = user_id
+        self._transactions_loader = transactions_loader
+        self._items = None
+        self._accounts_by_item = None
+        self._account_map = None
+        self._account_programs = None
+        self._transactions = {}
+        self._frames = {}
+
+    @property
+    def items(self):
+        """The user's plaid_items rows."""
+        if self._items is None:
+            self._items = get_user_items(self.user_id, include_access_token=True)
+            logger.info(f"Loaded {len(self._items)} linked items for user {self.user_id}")
+        return self._items
+
+    @property
+    def accounts_by_item(self):
+        """plaid_items.id -> that item's plaid_accounts rows."""
+        if self._accounts_by_item is None:
+            self._accounts_by_item = get_accounts_for_items([item['id'] for item in self.items])
+        return self._accounts_by_item
+
+    @property
+    def accounts(self):
+        """Every plaid_accounts row for the user, in item order."""
+        return [account for item in self.items for account in self.accounts_by_item.get(item['id'], [])]
+
+    @property
+    def account_map(self):
+        """
+        account_id -> name, mask, type, institution_name and rewards_program for every
+        linked account. Accounts stored without a program (linked before programs were
+        resolved) fall back to resolve_rewards_program.
+        """
+        if self._account_map is None:
+            account_map = {}
+            for item in self.items:
+                institution_name = item.get('institution_name', 'Financial Institution')
+                for account in self.accounts_by_item.get(item['id'], []):
+                    account_map[account['account_id']] = {
+                        'name': account['name'],
+                        'mask': account.get('mask', ''),
+                        'type': account.get('type', ''),
+                        'institution_name': institution_name,
+                        'rewards_program': account.get('rewards_program') or resolve_rewards_program(institution_name, account['name'])
+                    }
+            self._account_map = account_map
+        return self._account_map
+
+    @property
+    def account_programs(self):
+        """account_id -> RewardsProgram for every linked account with a known program."""
+        if self._account_programs is None:
+            self._account_programs = {
+                account_id: REWARDS_PROGRAMS[account['rewards_program']]
+                for account_id, account in self.account_map.items()
+                if account['rewards_program'] in REWARDS_PROGRAMS
+            }
+        return self._account_programs
+
+    def _window(self, start_date, end_date):
+        """Resolve a date window, defaulting to the last DEFAULT_WINDOW_DAYS days."""
+        if end_date is None:
+            end_date = datetime.now().date()
+        if start_date is None:
+            start_date = end_date - timedelta(days=DEFAULT_WINDOW_DAYS)
+        return start_date, end_date
+
+    def get_transactions(self, start_date=None, end_date=None):
+        """
+        Normalized transactions across all items for a date window, newest first.
+        Defaults to the last DEFAULT_WINDOW_DAYS days.
+        """
+        key = self._window(start_date, end_date)
+        if key not in self._transactions:
+            self._transactions[key] = self._transactions_loader(self, *key)
+        return self._transactions[key]
+
+    def get_frame(self, start_date=None, end_date=None):
+        """The TransactionFrame of get_transactions for the same window, built once."""
+        key = self._window(start_date, end_date)
+        if key not in self._frames:
+            self._frames[key] = TransactionFrame.from_transactions(self.get_transactions(*key))
+        return self._frames[key]
+
+    @property
+    def transactions(self):
+        """Normalized transactions for the default window."""
+        return self.get_transactions()
+
+    @property
+    def frame(self):
+        """TransactionFrame for the default window."""
+        return self.get_frame()
+
+def get_user_context(user_id, transactions_loader):
+    """Get the UserDataContext for a user, shared by everything handling the current request."""
+    contexts = g.setdefault('user_data_contexts', {})
+    if user_id not in contexts:
+        contexts[user_id] = UserDataContext(user_id, transactions_loader)
+    return contexts[user_id]
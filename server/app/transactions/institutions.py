@@ -0,0 +1,110 @@
+import os
+import json
+import time
+import logging
+import tempfile
+import threading
+
+from app.transactions.cache import TTLCache
+from app.transactions.config import get_institution_cache_ttl, get_institution_cache_path
+from app.transactions.plaid_client import get_plaid_client
+
+logger = logging.getLogger('plaid.institutions')
+
+# Our users link a small set of banks, so a few hundred entries covers everyone
+INSTITUTION_CACHE_SIZE = 512
+
+class InstitutionCache:
+    """
+    Cache of institutions/get_by_id results keyed by institution_id.
+    Entries live in an in-process TTL/LRU cache and, when a path is configured,
+    in a JSON file so they survive restarts.
+    """
+
+    def __init__(self, path=None, ttl=None, maxsize=INSTITUTION_CACHE_SIZE):
+        self.path = path
+        self.ttl = ttl if ttl is not None else get_institution_cache_ttl()
+        self._memory = TTLCache(maxsize=maxsize, ttl=self.ttl)
+        self._disk = {}
+        self._disk_lock = threading.Lock()
+        if self.path:
+            self._load()
+
+    def _load(self):
+        """Warm the in-process cache from the on-disk layer, skipping expired entries."""
+        try:
+            with open(self.path, 'r') as cache_file:
+                entries = json.load(cache_file)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable institution cache {self.path}: {str(e)}")
+            return
+
+        now = time.time()
+        for institution_id, entry in entries.items():
+            if now - entry.get('fetched_at', 0) < self.ttl:
+                self._disk[institution_id] = entry
+                self._memory.set(institution_id, entry['institution'], stored_at=entry['fetched_at'])
+        logger.info(f"Loaded {len(self._disk)} cached institutions from {self.path}")
+
+    def _persist(self, institution_id, institution, fetched_at):
+        """Write an entry through to disk, replacing the file atomically."""
+        with self._disk_lock:
+            self._disk[institution_id] = {'institution': institution, 'fetched_at': fetched_at}
+            directory = os.path.dirname(self.path) or '.'
+            try:
+                os.makedirs(directory, exist_ok=True)
+                with tempfile.NamedTemporaryFile('w', dir=directory, delete=False) as tmp_file:
+                    json.dump(self._disk, tmp_file)
+                os.replace(tmp_file.name, self.path)
+            except OSError as e:
+                logger.warning(f"Could not write institution cache {self.path}: {str(e)}")
+
+    def get(self, institution_id):
+        """
+        Get institution metadata, calling Plaid only on a cache miss.
+
+        Returns:
+            A dict with institution_id and name, or None if Plaid could not resolve it
+        """
+        institution = self._memory.get(institution_id)
+        if institution is not None:
+            return institution
+
+        payload = {
+            'institution_id': institution_id,
+            'country_codes': ['US']
+        }
+        response = get_plaid_client().post('/institutions/get_by_id', payload)
+        if response.status_code != 200:
+            logger.error(f"Error getting institution {institution_id}: {response.text}")
+            return None
+
+        institution_data = response.json().get('institution', {})
+        institution = {
+            'institution_id': institution_id,
+            'name': institution_data.get('name', 'Financial Institution')
+        }
+
+        fetched_at = time.time()
+        self._memory.set(institution_id, institution, stored_at=fetched_at)
+        if self.path:
+            self._persist(institution_id, institution, fetched_at)
+        return institution
+
+    def stats(self):
+        """Hit/miss counters of the in-process layer."""
+        return self._memory.stats()
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_institution_cache():
+    """Get the process-wide institution cache, creating it on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = InstitutionCache(path=get_institution_cache_path())
+    return _cache
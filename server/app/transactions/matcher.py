@@ -0,0 +1,166 @@
+from collections import deque
+
+# Fields a rule can match against, in the order they are laid out for scanning
+MATCH_FIELDS = ('merchant_name', 'category')
+
+# Never part of a pattern, so no match can span two scanned segments
+_SEPARATOR = '\x1f'
+
+class AhoCorasick:
+    """
+    Aho-Corasick automaton: finds every occurrence of every pattern, overlapping ones
+    included, in a single left-to-right scan of the text.
+    """
+
+    def __init__(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [()]
+        self._built = False
+
+    def add(self, pattern, value):
+        """Report value at the end of each occurrence of pattern. Call before build()."""
+        if self._built:
+            raise RuntimeError("Cannot add patterns after the automaton is built")
+        if not pattern:
+            raise ValueError("Patterns must not be empty")
+
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+            state = next_state
+        self._output[state] = self._output[state] + (value,)
+
+    def build(self):
+        """Compute failure links breadth-first and fold each state's suffix outputs into it."""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+        self._built = True
+        return self
+
+    def scan(self, text):
+        """
+        Yield (end_index, value) for every pattern occurrence in text.
+        end_index is the index of the occurrence's last character.
+        """
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for value in output[state]:
+                yield index, value
+
+class RuleMatcher:
+    """
+    The substring rules of many rewards programs compiled into one automaton.
+    A transaction's merchant_name and category are lowercased, joined and scanned a single
+    time; the result is every (program, rule) whose list of substrings occurs in its field.
+    Case-sensitive patterns are found in the same scan and then checked against the
+    original text. Cost per transaction depends on the length of those fields, not on how
+    many programs or patterns are registered, and results are memoized per field values.
+    """
+
+    def __init__(self, memo_size=4096):
+        self._automaton = AhoCorasick()
+        self._rules = set()
+        self._memo = {}
+        self._memo_size = memo_size
+
+    def add_rule(self, program, rule, field, patterns, case_sensitive=False):
+        """
+        Register a rule that hits when any of patterns is a substring of field.
+
+        Args:
+            program: Name of the rewards program owning the rule
+            rule: Name of the rule within the program
+            field: One of MATCH_FIELDS
+            patterns: Substrings to look for
+            case_sensitive: Match patterns exactly instead of ignoring case
+        """
+        if field not in MATCH_FIELDS:
+            raise ValueError(f"Unknown match field {field}")
+
+        segment = MATCH_FIELDS.index(field)
+        hit = (program, rule)
+        for pattern in patterns:
+            exact = pattern if case_sensitive else None
+            self._automaton.add(pattern.lower(), (segment, hit, exact))
+        self._rules.add(hit)
+
+    def build(self):
+        self._automaton.build()
+        return self
+
+    @property
+    def rules(self):
+        """Every registered (program, rule)."""
+        return frozenset(self._rules)
+
+    def match(self, transaction):
+        """
+        Get every (program, rule) whose patterns occur in the transaction.
+        A non-string field matches nothing.
+        """
+        values = []
+        for field in MATCH_FIELDS:
+            value = transaction.get(field) or ''
+            values.append(value if isinstance(value, str) else '')
+
+        key = tuple(values)
+        hits = self._memo.get(key)
+        if hits is None:
+            hits = self._scan(values)
+            if len(self._memo) >= self._memo_size:
+                self._memo.clear()
+            self._memo[key] = hits
+        return hits
+
+    def _scan(self, values):
+        lowered = [value.lower() for value in values]
+        # Lowercasing a few non-ASCII characters changes the length; case-sensitive
+        # patterns in such a field are checked with a plain substring test instead
+        aligned = [len(low) == len(value) for low, value in zip(lowered, values)]
+
+        text = _SEPARATOR.join(lowered)
+        starts = []
+        offset = 0
+        for low in lowered:
+            starts.append(offset)
+            offset += len(low) + 1
+
+        hits = set()
+        segment_index = 0
+        for end_index, (segment, hit, exact) in self._automaton.scan(text):
+            while segment_index + 1 < len(starts) and end_index >= starts[segment_index + 1]:
+                segment_index += 1
+            if segment != segment_index or hit in hits:
+                continue
+            if exact is not None:
+                value = values[segment]
+                if aligned[segment]:
+                    end = end_index - starts[segment] + 1
+                    if value[end - len(exact):end] != exact:
+                        continue
+                elif exact not in value:
+                    continue
+            hits.add(hit)
+        return frozenset(hits)
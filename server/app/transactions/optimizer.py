@@ -0,0 +1,624 @@
+from bisect import bisect_left
+from collections import deque
+
+import numpy as np
+
+from app.transactions.caps import CapLedger, period_of
+from app.transactions.rewards import classify_frame
+
+# Rate differences below this are treated as no gain
+_EPSILON = 1e-12
+
+# Bonus (cents x rate) below which an assignment counts as meeting the bound
+_TOLERANCE = 1e-6
+
+# Transactions priced (nodes x transactions) per branch-and-bound search, so small
+# sets of buckets are searched deep and large ones stop early
+_SEARCH_WORK = 25_000
+
+# Largest subset-sum table (rows x cents) built to fill a bucket exactly
+_FILL_WORK = 20_000_000
+
+class OptimalAssignment:
+    """
+    A card for every transaction, chosen to maximize total rewards with caps honored.
+
+    Attributes:
+        programs: The programs columns index into
+        columns: Program index for each row of the frame
+        rewards: Reward of each row under its program, priced by the programs' own rules
+        upper_bound: Rewards of the fractional relaxation; no assignment can earn more
+        exact: Whether no assignment earns more than rewards; False when the search
+            stopped early (see optimize_assignment)
+    """
+
+    def __init__(self, programs, columns, rewards, upper_bound, exact):
+        self.programs = programs
+        self.columns = columns
+        self.rewards = rewards
+        self.upper_bound = upper_bound
+        self.exact = exact
+
+    @property
+    def total(self):
+        return float(self.rewards.sum())
+
+class _FlowNetwork:
+    """Min-cost flow by successive shortest paths; edges are stored in forward/reverse pairs."""
+
+    def __init__(self, size):
+        self.graph = [[] for _ in range(size)]
+        self.edges = []
+
+    def add_edge(self, source, target, capacity, cost):
+        """Add an edge and return its index; its flow is the capacity of index ^ 1."""
+        index = len(self.edges)
+        self.graph[source].append(index)
+        self.edges.append([target, capacity, cost])
+        self.graph[target].append(index + 1)
+        self.edges.append([source, 0, -cost])
+        return index
+
+    def flow(self, index):
+        return self.edges[index ^ 1][1]
+
+    def min_cost_flow(self, source, sink):
+        """
+        Push flow from source to sink along the cheapest residual path for as long as
+        that path has negative cost. The result is the minimum cost over all flow
+        amounts, not a maximum flow.
+        """
+        size = len(self.graph)
+        while True:
+            distance = [float('inf')] * size
+            via = [-1] * size
+            queued = [False] * size
+            distance[source] = 0
+            queue = deque([source])
+            while queue:
+                node = queue.popleft()
+                queued[node] = False
+                for index in self.graph[node]:
+                    target, capacity, cost = self.edges[index]
+                    if capacity > 0 and distance[node] + cost < distance[target] - _EPSILON:
+                        distance[target] = distance[node] + cost
+                        via[target] = index
+                        if not queued[target]:
+                            queued[target] = True
+                            queue.append(target)
+
+            if distance[sink] >= -_EPSILON:
+                return
+
+            amount = None
+            node = sink
+            while node != source:
+                index = via[node]
+                capacity = self.edges[index][1]
+                amount = capacity if amount is None else min(amount, capacity)
+                node = self.edges[index ^ 1][0]
+
+            node = sink
+            while node != source:
+                index = via[node]
+                self.edges[index][1] -= amount
+                self.edges[index ^ 1][1] += amount
+                node = self.edges[index ^ 1][0]
+
+def _price_rows(frame, programs, rules, rates, signature_rows, columns, capped_rows, ledger, user_id):
+    """
+    Reward of each row under columns[row] (no card when negative), with capped_rows
+    going through their program's caps oldest first and every other row at its rate.
+    """
+    amounts = np.abs(frame.amount_cents) / 100
+    rewards = np.zeros(len(frame))
+    carded = columns >= 0
+    rewards[carded] = amounts[carded] * rates[signature_rows[carded], columns[carded]]
+
+    capped_rows = capped_rows[np.argsort(frame.dates[capped_rows], kind='stable')]
+    days = np.datetime_as_string(frame.dates[capped_rows]).tolist()
+    for i, day in zip(capped_rows.tolist(), days):
+        program = programs[columns[i]]
+        rule = rules[signature_rows[i]][columns[i]]
+        period = period_of(day, program.cap_period)
+        rewards[i] = program.capped_reward(float(amounts[i]), rule, ledger, user_id, period)
+    return rewards
+
+def _price_columns(frame, classification, columns, ledger, user_id):
+    """price_assignment on an existing classify_frame result."""
+    programs, rules, rates, signature_rows = classification
+    capped = np.array([
+        [rule in program.capped_rules for rule, program in zip(signature_rules, programs)]
+        for signature_rules in rules
+    ])
+    carded = np.flatnonzero(columns >= 0)
+    capped_rows = carded[capped[signature_rows[carded], columns[carded]]]
+    return _price_rows(frame, programs, rules, rates, signature_rows, columns, capped_rows, ledger, user_id)
+
+def price_assignment(frame, columns, programs=None, ledger=None, user_id=None):
+    """
+    Rewards each transaction earns on a given card, with every card's caps counting
+    only the spending assigned to it.
+
+    Args:
+        frame: A TransactionFrame
+        columns: Index into programs for each row, or -1 for no rewards program
+        programs: Programs the columns index into; defaults to REWARDS_PROGRAMS
+        ledger: CapLedger to count capped spending in; a fresh one when omitted
+        user_id: Whose caps the spending counts against in ledger
+
+    Returns:
+        A float64 array with one reward per row
+    """
+    classification = classify_frame(frame, programs)
+    if not len(frame):
+        return np.zeros(0)
+    return _price_columns(
+        frame, classification, np.asarray(columns), CapLedger() if ledger is None else ledger, user_id
+    )
+
+def _fill(sizes, target, work):
+    """
+    Positions in sizes (cents, largest first) whose sum comes as close to target as it
+    can without going over. Rows are taken greedily until what is left of the target
+    fits a subset-sum table of the untaken rows within work cells, and that table then
+    finds the closest sum for the rest.
+    """
+    reserve = min(target, work // max(len(sizes), 1))
+    chosen = []
+    left = target
+    for k, size in enumerate(sizes):
+        if size <= left - reserve:
+            chosen.append(k)
+            left -= size
+    taken = set(chosen)
+    rest = [k for k in range(len(sizes)) if k not in taken]
+
+    # Without the table, finish greedily
+    greedy = []
+    greedy_left = left
+    for k in rest:
+        if sizes[k] <= greedy_left:
+            greedy.append(k)
+            greedy_left -= sizes[k]
+    if not greedy_left or len(rest) * left > work:
+        return chosen + greedy
+
+    # The first row reaching each sum; walking back from a sum never repeats a row
+    reached = np.zeros(left + 1, dtype=bool)
+    reached[0] = True
+    via = np.full(left + 1, -1, dtype=np.int64)
+    for k in rest:
+        size = sizes[k]
+        if size > left:
+            continue
+        shifted = reached[:left + 1 - size].copy()
+        via[size:][shifted & ~reached[size:]] = k
+        reached[size:] |= shifted
+        if reached[left]:
+            break
+    best = int(np.flatnonzero(reached)[-1])
+    if left - best >= greedy_left:
+        return chosen + greedy
+    while best:
+        k = int(via[best])
+        chosen.append(k)
+        best -= sizes[k]
+    return chosen
+
+def _bonus_flow(supplies, rooms, edges):
+    """
+    The fractional relaxation: the most bonus (cents x rate over base) that supplies[g]
+    cents of each group can earn in buckets with rooms[b] cents left, along edges
+    (g, b, profit). Rows with the same eligible buckets and base rate are interchangeable
+    here, so the graph has a node per group, not per transaction.
+
+    Returns:
+        (bonus, flows) with the cents sent along each edge
+    """
+    live = [e for e, (g, b, profit) in enumerate(edges) if supplies[g] > 0 and rooms[b] > 0]
+    groups = {g: n for n, g in enumerate(sorted({edges[e][0] for e in live}))}
+    buckets = {b: 2 + len(groups) + n for n, b in enumerate(sorted({edges[e][1] for e in live}))}
+    network = _FlowNetwork(2 + len(groups) + len(buckets))
+    source, sink = 0, 1
+    for g, n in groups.items():
+        network.add_edge(source, 2 + n, supplies[g], 0)
+    for b, node in buckets.items():
+        network.add_edge(node, sink, rooms[b], 0)
+    indexes = {}
+    for e in live:
+        g, b, profit = edges[e]
+        indexes[e] = network.add_edge(2 + groups[g], buckets[b], supplies[g], -profit)
+    network.min_cost_flow(source, sink)
+
+    flows = [network.flow(indexes[e]) if e in indexes else 0 for e in range(len(edges))]
+    return sum(flow * edges[e][2] for e, flow in enumerate(flows)), flows
+
+class _Component:
+    """
+    Transactions whose capped rules share cap buckets, and the search for their best
+    assignment. Positions index the transactions in the order the caps see them (date,
+    then frame row); bonus is reward over each position's base rate, in cents x rate.
+    """
+
+    def __init__(self, cents, groups, base, fallback, fallback_columns, group_edges, group_overflows, bucket_terms):
+        """
+        Args:
+            cents: Amount of each position
+            groups: Group of each position
+            base: Best rate of each position without a bonus: its fallback, or the
+                overflow rate of a capped rule
+            fallback: Best uncapped rate of each position, 0 without one
+            fallback_columns: Program giving fallback, -1 for none
+            group_edges: Per group, (bucket, profit) of every bucket it gains in
+            group_overflows: Per group, the buckets it touches, highest overflow rate first
+            bucket_terms: (column, rate, overflow_rate, limit_cents, partial) per bucket
+        """
+        self.cents = cents
+        self.groups = groups
+        self.base = base
+        self.fallback = fallback
+        self.fallback_columns = fallback_columns
+        self.group_edges = group_edges
+        self.group_overflows = group_overflows
+        self.bucket_terms = bucket_terms
+        self.limits = tuple(terms[3] for terms in bucket_terms)
+        self.base_total = sum(c * rate for c, rate in zip(cents, base))
+        self.edges = [(g, b, profit) for g, edges in enumerate(group_edges) for b, profit in edges]
+
+        # Branch on positions that can earn a bonus, largest first
+        self.order = sorted((p for p in range(len(cents)) if group_edges[groups[p]]), key=lambda p: (-cents[p], p))
+        self.rank = {p: k for k, p in enumerate(self.order)}
+        self.group_order = [[] for _ in group_edges]
+        for p in self.order:
+            self.group_order[groups[p]].append(p)
+        # Cents of each group from each of its positions in order onwards
+        self.group_suffix = [np.cumsum([cents[p] for p in members][::-1])[::-1].tolist() + [0] for members in self.group_order]
+        self.group_ranks = [[self.rank[p] for p in members] for members in self.group_order]
+
+    def supplies(self, k):
+        """Cents of each group among order[k:]."""
+        return [
+            suffix[bisect_left(ranks, k)] for suffix, ranks in zip(self.group_suffix, self.group_ranks)
+        ]
+
+    def price(self, bucket_of, columns=None):
+        """
+        Bonus of an assignment as the caps actually pay it, walking positions in order.
+        A position outside the buckets earns an overflow rate on a capped card only while
+        that cap has no room for it, since a cap takes any transaction that still fits;
+        otherwise it earns its fallback.
+
+        Args:
+            bucket_of: Bucket of each position, -1 for none
+            columns: List to append the program of each position to
+        """
+        room = list(self.limits)
+        total = 0.0
+        for p, c in enumerate(self.cents):
+            b = bucket_of[p]
+            if b >= 0:
+                column, rate, overflow_rate, limit_cents, partial = self.bucket_terms[b]
+                if c <= room[b]:
+                    total += c * rate
+                    room[b] -= c
+                elif partial and room[b] > 0:
+                    total += room[b] * rate + (c - room[b]) * overflow_rate
+                    room[b] = 0
+                else:
+                    total += c * overflow_rate
+            else:
+                column, rate = self.fallback_columns[p], self.fallback[p]
+                for b in self.group_overflows[self.groups[p]]:
+                    if self.bucket_terms[b][2] <= rate + _EPSILON:
+                        break
+                    if room[b] < c and (not room[b] or not self.bucket_terms[b][4]):
+                        column, rate = self.bucket_terms[b][0], self.bucket_terms[b][2]
+                        break
+                total += c * rate
+            if columns is not None:
+                columns.append(column)
+        return total - self.base_total
+
+    def realize(self, bucket_of, k, rooms, flows, work):
+        """
+        Round a fractional flow for order[k:] to whole transactions in place: what the
+        flow sent each group to each bucket is filled as closely as the group's rows
+        allow (see _fill), the room left is topped up with any rows that gain there, and
+        a partial bucket still short is filled by splitting the row that gains most from
+        crossing its limit.
+        """
+        room = list(rooms)
+        for e in sorted(range(len(self.edges)), key=lambda e: -self.edges[e][2]):
+            g, b, profit = self.edges[e]
+            target = min(flows[e], room[b])
+            if target <= 0:
+                continue
+            members = [p for p in self.group_order[g] if self.rank[p] >= k and bucket_of[p] < 0]
+            for n in _fill([self.cents[p] for p in members], target, work):
+                bucket_of[members[n]] = b
+                room[b] -= self.cents[members[n]]
+
+        for b in sorted(range(len(room)), key=lambda b: -self.bucket_terms[b][1]):
+            if room[b] <= 0:
+                continue
+            candidates = sorted(
+                (
+                    (-profit, -self.cents[p], p)
+                    for g, edges in enumerate(self.group_edges) for edge_bucket, profit in edges if edge_bucket == b
+                    for p in self.group_order[g] if self.rank[p] >= k and bucket_of[p] < 0
+                )
+            )
+            for _, _, p in candidates:
+                if self.cents[p] <= room[b]:
+                    bucket_of[p] = b
+                    room[b] -= self.cents[p]
+            if self.bucket_terms[b][4] and room[b] > 0:
+                overflow_rate = self.bucket_terms[b][2]
+                gains = [
+                    (room[b] * -neg_profit - (self.cents[p] - room[b]) * (self.base[p] - overflow_rate), p)
+                    for neg_profit, _, p in candidates if bucket_of[p] < 0
+                ]
+                if gains and max(gains)[0] > _EPSILON:
+                    bucket_of[max(gains)[1]] = b
+                    room[b] = 0
+
+    def _decided(self, path):
+        bucket_of = [-1] * len(self.cents)
+        while path is not None:
+            p, b, path = path
+            bucket_of[p] = b
+        return bucket_of
+
+    def search(self, nodes):
+        """
+        Branch and bound over order: each node decides one more transaction's bucket,
+        and a subtree is dropped once the fractional flow over the rest cannot beat the
+        best assignment found. Every node also rounds its flow to an assignment, which
+        usually meets the bound at the root already.
+
+        Args:
+            nodes: Nodes to search before settling for the best assignment found
+
+        Returns:
+            (bucket_of, bound, exact): the best assignment, the root relaxation's bonus,
+            and whether the search proved no assignment earns more
+        """
+        bound, flows = _bonus_flow(self.supplies(0), self.limits, self.edges)
+        best = self._decided(None)
+        self.realize(best, 0, self.limits, flows, _FILL_WORK)
+        best_bonus = self.price(best)
+        # Highest model bonus of a fully decided assignment the caps did not pay in full
+        unpaid = -np.inf
+
+        stack = [(0, self.limits, 0.0, None)]
+        searched = 0
+        while stack:
+            if best_bonus >= bound - _TOLERANCE:
+                return best, bound, True
+            if searched >= nodes:
+                return best, bound, False
+            k, rooms, bonus, path = stack.pop()
+            searched += 1
+
+            bucket_of = self._decided(path)
+            if k == len(self.order):
+                paid = self.price(bucket_of)
+                if paid > best_bonus:
+                    best, best_bonus = bucket_of, paid
+                if paid < bonus - _TOLERANCE:
+                    unpaid = max(unpaid, bonus)
+                continue
+
+            relaxed, flows = _bonus_flow(self.supplies(k), rooms, self.edges)
+            if bonus + relaxed <= best_bonus + _TOLERANCE:
+                continue
+            self.realize(bucket_of, k, rooms, flows, 0)
+            paid = self.price(bucket_of)
+            if paid > best_bonus:
+                best, best_bonus = bucket_of, paid
+            if paid >= bonus + relaxed - _TOLERANCE:
+                continue
+
+            # Children: no bonus, or any bucket the transaction still gains in
+            p = self.order[k]
+            c = self.cents[p]
+            children = [(0.0, (k + 1, rooms, bonus, path))]
+            for b, profit in self.group_edges[self.groups[p]]:
+                column, rate, overflow_rate, limit_cents, partial = self.bucket_terms[b]
+                if c <= rooms[b]:
+                    gain, left = c * profit, rooms[b] - c
+                elif partial and rooms[b] > 0:
+                    gain, left = rooms[b] * profit - (c - rooms[b]) * (self.base[p] - overflow_rate), 0
+                else:
+                    continue
+                if gain > _EPSILON:
+                    child_rooms = rooms[:b] + (left,) + rooms[b + 1:]
+                    children.append((gain, (k + 1, child_rooms, bonus + gain, (p, b, path))))
+            children.sort(key=lambda child: child[0])
+            stack.extend(child for _, child in children)
+
+        return best, bound, best_bonus >= unpaid - _TOLERANCE
+
+def optimize_assignment(frame, programs=None, user_id=None, classification=None, start=None, ledger=None):
+    """
+    Choose a card for every transaction so that total rewards are as large as
+    possible with every spending cap honored.
+
+    Without caps the best card is simply each row's highest rate. A capped rule instead
+    offers a bonus bucket per calendar period: up to its limit of spending earns the
+    capped rate, anything else on that card earns the overflow rate. Each row therefore
+    earns its base rate (best rate with no bonus) plus, if placed in a bucket it is
+    eligible for, the bucket's rate minus that base rate on every dollar. Greedy by
+    marginal rate is not enough: a row eligible for two buckets can take the space
+    another row could only have used in one of them.
+
+    With rows made fractional this is a transportation problem from rows to buckets,
+    solved by min-cost flow over groups of interchangeable rows (see _bonus_flow); its
+    value is kept as upper_bound. Whole rows are then chosen per set of buckets that
+    share rows, by branch and bound on the rows largest first with that flow as the
+    bound (see _Component.search). Each candidate is priced the way the caps pay it:
+    in date order, a cap that only counts whole transactions (the BoA Customized and
+    Discover quarterly caps) skips one that does not fit, and a cap that splits one at
+    the limit (the Amex supermarket cap) pays the overflow rate on the rest.
+
+    A finished search is exact whenever every row has an uncapped card at its base
+    rate, as the flat-rate cards of the default catalog give; a row whose base rate is
+    an overflow rate only earns it once that cap is too full to take it, and exact is
+    then set only when the bound is met. The flow bound makes the search quick unless
+    a period holds several purchases of the order of its caps or the bound is a few
+    cents out of reach; past _SEARCH_WORK it keeps the best assignment found.
+
+    Args:
+        frame: A TransactionFrame
+        programs: Programs to choose from, in column order; defaults to REWARDS_PROGRAMS
+        user_id: Whose caps the assignment is priced against
+        classification: classify_frame output for frame to reuse, e.g. a
+            select_programs subset when evaluating many combinations; programs is then ignored
+        start: Columns of an assignment the result must not earn less than, such as the
+            cards actually used, for when the search stops early
+        ledger: CapLedger with spending already counted against the caps, e.g. earlier
+            in the current cap periods; only the room left is assigned. Left unchanged
+
+    Returns:
+        An OptimalAssignment
+    """
+    classification = classification or classify_frame(frame, programs)
+    programs, rules, rates, signature_rows = classification
+    count = len(frame)
+    if not count or not programs:
+        return OptimalAssignment(programs, np.full(count, -1), np.zeros(count), 0.0, True)
+
+    cents = np.abs(frame.amount_cents)
+
+    # Per signature and program: whether the rule is capped, and its rate without a bonus
+    capped = np.zeros(rates.shape, dtype=bool)
+    base_rates = rates.copy()
+    cap_terms = {}
+    for s, signature_rules in enumerate(rules):
+        for j, program in enumerate(programs):
+            rule = signature_rules[j]
+            if rule in program.capped_rules:
+                if (j, rule) not in cap_terms:
+                    cap_terms[(j, rule)] = program.cap_terms(rule)
+                capped[s, j] = True
+                base_rates[s, j] = program.rules[cap_terms[(j, rule)][1]]
+
+    # Spending nobody puts in a bucket goes to the best base rate; uncapped rules win
+    # ties so it never competes for cap room it was not given
+    base_columns = np.where(capped, base_rates - _EPSILON, base_rates).argmax(axis=1)
+    signature_base = base_rates[np.arange(len(rules)), base_columns]
+    uncapped_rates = np.where(capped, 0.0, rates)
+    fallback_columns = uncapped_rates.argmax(axis=1)
+    signature_fallback = uncapped_rates[np.arange(len(rules)), fallback_columns]
+    fallback_columns[signature_fallback <= 0] = -1
+
+    # Merge rows by (capped rules, base rate) of their signature and cap periods of their date
+    signature_keys = {}
+    signature_codes = np.empty(len(rules), dtype=np.int64)
+    for s, signature_rules in enumerate(rules):
+        pattern = tuple((j, signature_rules[j]) for j in np.flatnonzero(capped[s]).tolist())
+        key = (pattern, float(signature_base[s])) if pattern else None
+        signature_codes[s] = signature_keys.setdefault(key, len(signature_keys))
+    signature_patterns = {code: key for key, code in signature_keys.items()}
+
+    days, day_rows = np.unique(frame.dates, return_inverse=True)
+    day_rows = day_rows.reshape(-1)
+    cap_periods = sorted({program.cap_period for program in programs if program.capped_rules})
+    day_keys = {}
+    day_codes = np.empty(len(days), dtype=np.int64)
+    for d, day in enumerate(np.datetime_as_string(days).tolist()):
+        key = tuple(period_of(day, period) for period in cap_periods)
+        day_codes[d] = day_keys.setdefault(key, len(day_keys))
+    day_periods = {code: dict(zip(cap_periods, key)) for key, code in day_keys.items()}
+
+    row_codes = signature_codes[signature_rows] * len(day_keys) + day_codes[day_rows]
+    spending = np.flatnonzero(cents > 0)
+    group_codes, group_rows = np.unique(row_codes[spending], return_inverse=True)
+    group_rows = group_rows.reshape(-1)
+
+    # Bucket per (program, capped rule, period); groups join the buckets they touch
+    buckets = {}
+    bucket_terms = []
+    group_buckets = []
+    group_edges = []
+    group_overflows = []
+    for code in group_codes.tolist():
+        signature_code, day_code = divmod(code, len(day_keys))
+        key = signature_patterns[signature_code]
+        touched, edges = [], []
+        if key is not None:
+            pattern, base_rate = key
+            for j, rule in pattern:
+                bucket_key = (j, rule, day_periods[day_code][programs[j].cap_period])
+                if bucket_key not in buckets:
+                    limit, overflow_rule, partial = cap_terms[(j, rule)]
+                    if ledger is not None:
+                        limit = max(0.0, limit - ledger.used(user_id, programs[j].name, rule, bucket_key[2]))
+                    buckets[bucket_key] = len(bucket_terms)
+                    bucket_terms.append((j, programs[j].rules[rule], programs[j].rules[overflow_rule], int(round(limit * 100)), partial))
+                b = buckets[bucket_key]
+                touched.append(b)
+                if bucket_terms[b][1] - base_rate > _EPSILON:
+                    edges.append((b, bucket_terms[b][1] - base_rate))
+        group_buckets.append(touched)
+        group_edges.append(edges)
+        group_overflows.append(sorted(touched, key=lambda b: -bucket_terms[b][2]))
+
+    # Buckets sharing a group are decided together
+    parents = list(range(len(bucket_terms)))
+
+    def find(b):
+        while parents[b] != b:
+            parents[b] = parents[parents[b]]
+            b = parents[b]
+        return b
+
+    for touched in group_buckets:
+        for b in touched[1:]:
+            parents[find(b)] = find(touched[0])
+    component_groups = {}
+    for g, touched in enumerate(group_buckets):
+        if touched:
+            component_groups.setdefault(find(touched[0]), []).append(g)
+
+    row_base = signature_base[signature_rows]
+    upper_bound = float((cents * row_base).sum())
+    columns = base_columns[signature_rows]
+    exact = True
+    chronological = spending[np.lexsort((spending, frame.dates[spending]))]
+    chronological_groups = np.empty(count, dtype=np.int64)
+    chronological_groups[spending] = group_rows
+    for component in component_groups.values():
+        local_groups = {g: n for n, g in enumerate(component)}
+        local_buckets = {b: n for n, b in enumerate(sorted({b for g in component for b in group_buckets[g]}))}
+        members = chronological[np.isin(chronological_groups[chronological], component)]
+        member_signatures = signature_rows[members]
+        search = _Component(
+            cents[members].tolist(),
+            [local_groups[g] for g in chronological_groups[members].tolist()],
+            signature_base[member_signatures].tolist(),
+            signature_fallback[member_signatures].tolist(),
+            fallback_columns[member_signatures].tolist(),
+            [[(local_buckets[b], profit) for b, profit in group_edges[g]] for g in component],
+            [[local_buckets[b] for b in group_overflows[g]] for g in component],
+            [bucket_terms[b] for b in local_buckets]
+        )
+        bucket_of, bound, solved = search.search(max(1, _SEARCH_WORK // len(members)))
+        member_columns = []
+        search.price(bucket_of, member_columns)
+        columns[members] = member_columns
+        upper_bound += bound
+        exact = exact and solved
+    upper_bound /= 100
+
+    # Price the result through the real caps
+    fresh_ledger = CapLedger if ledger is None else ledger.copy
+    rewards = _price_columns(frame, classification, columns, fresh_ledger(), user_id)
+    if start is not None:
+        start = np.asarray(start)
+        start_rewards = _price_columns(frame, classification, start, fresh_ledger(), user_id)
+        if start_rewards.sum() > rewards.sum():
+            columns, rewards = start.copy(), start_rewards
+
+    return OptimalAssignment(programs, columns, rewards, upper_bound, exact)
@@ -1,27 +1,81 @@
 import os
 import requests
 import json
-from flask import Blueprint, jsonify, request
+import base64
+import hashlib
+import numpy as np
+from flask import Blueprint, jsonify, request, Response, stream_with_context
 from datetime import datetime, timedelta
 import logging
 from app import supabase
 from marshmallow import Schema, fields, post_load, EXCLUDE
-from app.transactions.rewards import REWARDS_PROGRAMS
+from app.transactions.rewards import REWARDS_FINGERPRINT, REWARDS_LIST, REWARDS_PROGRAMS, resolve_rewards_program
+from app.transactions.caps import CapLedger, period_bounds
+from app.transactions.rates import get_rate_cache
+from app.transactions.routing import get_swipe_states, recommend_card
+from app.transactions.optimizer import optimize_assignment, price_assignment
+from app.transactions.simulate import simulate_catalog
+from app.transactions.backtest import run_backtest
+from app.transactions.cashback import refresh_cashback
+from app.transactions.config import (
+    get_plaid_max_concurrency,
+    get_plaid_page_size,
+    get_plaid_max_pages_per_item,
+    get_transactions_source,
+    get_plaid_webhook_url,
+    is_webhook_verification_enabled,
+)
+from app.transactions.store import get_transaction_store
+from app.transactions.plaid_client import get_plaid_client
+from app.transactions.institutions import get_institution_cache
+from app.transactions.webhooks import verify_webhook, should_refresh, WebhookVerificationError, ITEM_ERROR_CODES
+from app.transactions.refresh import get_refresh_queue
+from app.transactions.sync import sync_item, sync_items
+from app.transactions.context import get_user_context, DEFAULT_WINDOW_DAYS
+from app.transactions.repository import get_user_accounts, delete_account, set_account_rewards_program
+from app.transactions.normalize import RowNormalizer
+from app.transactions.aggregate import summarize_transactions
+from app.transactions.request_log import (
+    get_request_log,
+    start_request_log,
+    record_request_status,
+    write_request_summary,
+    LazyJson,
+)
 import functools
 from typing import Callable
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 plaid_bp = Blueprint('plaid', __name__)
 
-# Configure logging
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+# Largest page a client may request from /transactions
+MAX_TRANSACTIONS_PAGE_LIMIT = 500
+
+# Most calendar months /transactions/cashback covers
+MAX_CASHBACK_MONTHS = 36
+
+# History a backtest starts from when transactions are fetched live and no start_date is
+# given; Plaid's transactions/get serves about two years
+LIVE_BACKTEST_DAYS = 730
+
+# History /cards/simulate replays by default, and the most a client may ask for
+DEFAULT_SIMULATION_DAYS = 365
+MAX_SIMULATION_DAYS = 3 * 365
+
+# Part of every ETag; bump it when a response's shape or how rewards are priced
+# changes so clients don't keep revalidating bodies computed by older code. The
+# program definitions themselves are in every ETag through REWARDS_FINGERPRINT
+ETAG_SCHEMA_VERSION = '2'
+
+# Handlers and levels are configured once in create_app
 logger = logging.getLogger('plaid')
-logger.setLevel(logging.INFO) 
 
-# Add console handler for debugging
-console_handler = logging.StreamHandler()
-console_handler.setLevel(logging.DEBUG)
-formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-console_handler.setFormatter(formatter)
-logger.addHandler(console_handler)
+# One summary line per request instead of per-row log spam; see request_log.py
+plaid_bp.before_request(start_request_log)
+plaid_bp.after_request(record_request_status)
+plaid_bp.teardown_request(write_request_summary)
 
 def require_user_id(f: Callable) -> Callable:
     """
@@ -126,7 +180,6 @@ class TransactionSchema(Schema):
                 if isinstance(data['category'], list) and data['category']:
                     # Just take the first category as a string
                     first_category = data['category'][0] if data['category'] else "Other"
-                    logger.debug(f"First category from list: {first_category}, type: {type(first_category)}")
                     data['category'] = first_category
                 elif isinstance(data['category'], str):
                     # If it's already a string, check if it's a stringified list
@@ -151,12 +204,21 @@ class TransactionSchema(Schema):
             data['category'] = "Other"  # Fallback to ensure we have a string
             return data
 
+# Compiled once from TransactionSchema; loads rows identically without the per-row
+# schema construction and load machinery (see scripts/bench_normalize.py)
+_transaction_schema = TransactionSchema()
+transaction_normalizer = RowNormalizer(_transaction_schema, post_load=_transaction_schema.process_transaction)
+
+# Fields every Plaid transaction must carry before it is normalized
+REQUIRED_TRANSACTION_FIELDS = ['transaction_id', 'date', 'name', 'amount', 'account_id']
+
 class TransactionListSchema(Schema):
     """Schema for a list of transactions"""
     class Meta:
         unknown = EXCLUDE
         
     data = fields.List(fields.Nested(TransactionSchema))
+    next_cursor = fields.Str(allow_none=True)
     status = fields.Str(default="success")
     message = fields.Str(default="Transactions retrieved successfully")
 
@@ -199,24 +261,13 @@ class TransactionSummaryResponseSchema(Schema):
     message = fields.Str(default="Transaction summary retrieved successfully")
     data = fields.Nested(TransactionSummarySchema)
 
-def get_plaid_base_url():
-    """Get the appropriate Plaid API URL based on environment."""
-    env = os.getenv('PLAID_ENV', 'sandbox')
-    if env == 'development':
-        return 'https://development.plaid.com'
-    elif env == 'production':
-        return 'https://production.plaid.com'
-    else:
-        return 'https://sandbox.plaid.com'
-
 @plaid_bp.route('/plaid/create-link-token', methods=['POST'])
 def create_link_token():
     """Create a link token for initializing Plaid Link."""
     try:
-        client_id = os.getenv('PLAID_CLIENT_ID')
-        secret = os.getenv('PLAID_SECRET')
+        plaid_client = get_plaid_client()
         
-        if not client_id or not secret:
+        if not plaid_client.has_credentials:
             return jsonify({'error': 'Plaid credentials not configured'}), 500
             
         # Use a value from the request body or a default
@@ -228,8 +279,6 @@ def create_link_token():
         
         # Create the link token
         payload = {
-            'client_id': client_id,
-            'secret': secret,
             'user': {
                 'client_user_id': user_id
             },
@@ -239,10 +288,12 @@ def create_link_token():
             'language': 'en'
         }
         
-        url = f"{get_plaid_base_url()}/link/token/create"
-        headers = {'Content-Type': 'application/json'}
+        # Have Plaid push updates to us so data is refreshed before the user asks for it
+        webhook_url = get_plaid_webhook_url()
+        if webhook_url:
+            payload['webhook'] = webhook_url
         
-        response = requests.post(url, headers=headers, json=payload)
+        response = plaid_client.post('/link/token/create', payload)
         
         if response.status_code == 200:
             return response.json()
@@ -261,10 +312,9 @@ def create_link_token():
 def exchange_token():
     """Exchange a public token for an access token."""
     try:
-        client_id = os.getenv('PLAID_CLIENT_ID')
-        secret = os.getenv('PLAID_SECRET')
+        plaid_client = get_plaid_client()
         
-        if not client_id or not secret:
+        if not plaid_client.has_credentials:
             return jsonify({'error': 'Plaid credentials not configured'}), 500
             
         # Get the public token from the request
@@ -280,29 +330,25 @@ def exchange_token():
             
         # Exchange the public token for an access token
         payload = {
-            'client_id': client_id,
-            'secret': secret,
             'public_token': public_token
         }
         
-        url = f"{get_plaid_base_url()}/item/public_token/exchange"
-        headers = {'Content-Type': 'application/json'}
-        
-        response = requests.post(url, headers=headers, json=payload)
+        response = plaid_client.post('/item/public_token/exchange', payload)
         
         if response.status_code == 200:
             exchange_data = response.json()
             access_token = exchange_data.get('access_token')
             item_id = exchange_data.get('item_id')
             
+            # Get account information; the response also carries the item,
+            # so the institution lookup doesn't need its own item/get call
+            accounts, item = get_accounts(access_token)
+            
             # Get institution information
-            institution_info = get_institution(access_token)
+            institution_info = get_institution(access_token, item)
             institution_id = institution_info.get('institution_id', '')
             institution_name = institution_info.get('name', 'Financial Institution')
             
-            # Now get account information
-            accounts = get_accounts(access_token)
-            
             # Store in Supabase
             # First, insert the plaid item
             plaid_item_result = supabase.table('plaid_items').insert({
@@ -317,7 +363,7 @@ def exchange_token():
             if plaid_item_result.data and len(plaid_item_result.data) > 0:
                 plaid_item_id = plaid_item_result.data[0]['id']
                 
-                # Store accounts
+                # Store accounts, each with its rewards program resolved once here
                 for account in accounts:
                     supabase.table('plaid_accounts').insert({
                         'plaid_item_id': plaid_item_id,
@@ -325,8 +371,10 @@ def exchange_token():
                         'name': account.get('name'),
                         'mask': account.get('mask', ''),
                         'type': account.get('type', ''),
-                        'subtype': account.get('subtype', '')
+                        'subtype': account.get('subtype', ''),
+                        'rewards_program': resolve_rewards_program(institution_name, account.get('name'))
                     }).execute()
+                get_swipe_states().invalidate(user_id)
             
             # Format response accounts
             response_accounts = []
@@ -361,27 +409,16 @@ def get_account_endpoint(user_id=None):
     try:
         logger.info(f"Finding accounts for user {user_id}")
         
-        # Query Supabase for linked accounts
-        # First get all plaid items for the user
-        items_response = supabase.table('plaid_items').select('*').eq('user_id', user_id).execute()
-        
+        # Query Supabase for linked accounts (items and accounts in one query each)
         accounts = []
-        if items_response.data:
-            for item in items_response.data:
-                item_id = item['id']
-                institution_name = item.get('institution_name', 'Financial Institution')
-                
-                # Get accounts for this item
-                accounts_response = supabase.table('plaid_accounts').select('*').eq('plaid_item_id', item_id).execute()
-                
-                if accounts_response.data:
-                    for account in accounts_response.data:
-                        accounts.append({
-                            'id': account['account_id'],
-                            'name': account['name'],
-                            'institutionName': institution_name,
-                            'mask': account.get('mask', '****')
-                        })
+        for account in get_user_accounts(user_id):
+            accounts.append({
+                'id': account['account_id'],
+                'name': account['name'],
+                'institutionName': account['institution_name'],
+                'mask': account.get('mask', '****'),
+                'rewardsProgram': account.get('rewards_program') or resolve_rewards_program(account['institution_name'], account['name'])
+            })
         
         logger.info(f"Found {len(accounts)} accounts for user {user_id}")
         return jsonify({'accounts': accounts})
@@ -389,49 +426,37 @@ def get_account_endpoint(user_id=None):
         logger.exception(f"Error fetching accounts: {str(e)}")
         return jsonify({'accounts': [], 'error': str(e)})
 
-def get_institution(access_token):
-    """Get institution details for an access token."""
+def get_institution(access_token, item=None):
+    """
+    Get institution details for an access token.
+    
+    Args:
+        access_token: The item's access token
+        item: The Plaid item object if the caller already has it (e.g. from accounts/get),
+              which saves an item/get round trip
+    """
     try:
-        client_id = os.getenv('PLAID_CLIENT_ID')
-        secret = os.getenv('PLAID_SECRET')
-        
-        # First get the item to get the institution_id
-        payload = {
-            'client_id': client_id,
-            'secret': secret,
-            'access_token': access_token
-        }
-        
-        url = f"{get_plaid_base_url()}/item/get"
-        headers = {'Content-Type': 'application/json'}
-        
-        response = requests.post(url, headers=headers, json=payload)
-        
-        if response.status_code == 200:
-            item_data = response.json()
-            institution_id = item_data.get('item', {}).get('institution_id')
-            
-            if not institution_id:
-                return {'institution_id': '', 'name': 'Financial Institution'}
-            
-            # Now get institution details
-            institution_payload = {
-                'client_id': client_id,
-                'secret': secret,
-                'institution_id': institution_id,
-                'country_codes': ['US']
+        if item is None:
+            # First get the item to get the institution_id
+            payload = {
+                'access_token': access_token
             }
             
-            institution_url = f"{get_plaid_base_url()}/institutions/get_by_id"
+            response = get_plaid_client().post('/item/get', payload)
             
-            institution_response = requests.post(institution_url, headers=headers, json=institution_payload)
+            if response.status_code != 200:
+                return {'institution_id': '', 'name': 'Financial Institution'}
             
-            if institution_response.status_code == 200:
-                institution_data = institution_response.json()
-                return {
-                    'institution_id': institution_id,
-                    'name': institution_data.get('institution', {}).get('name', 'Financial Institution')
-                }
+            item = response.json().get('item', {})
+        
+        institution_id = item.get('institution_id')
+        if not institution_id:
+            return {'institution_id': '', 'name': 'Financial Institution'}
+        
+        # Institution names almost never change, so these come from a shared cache
+        institution = get_institution_cache().get(institution_id)
+        if institution:
+            return institution
         
         return {'institution_id': '', 'name': 'Financial Institution'}
     except Exception as e:
@@ -439,21 +464,19 @@ def get_institution(access_token):
         return {'institution_id': '', 'name': 'Financial Institution'}
 
 def get_accounts(access_token):
-    """Get accounts associated with an access token."""
+    """
+    Get accounts associated with an access token.
+    
+    Returns:
+        (accounts, item) where item is the Plaid item object from the same response,
+        or None if the call failed
+    """
     try:
-        client_id = os.getenv('PLAID_CLIENT_ID')
-        secret = os.getenv('PLAID_SECRET')
-        
         payload = {
-            'client_id': client_id,
-            'secret': secret,
             'access_token': access_token
         }
         
-        url = f"{get_plaid_base_url()}/accounts/get"
-        headers = {'Content-Type': 'application/json'}
-        
-        response = requests.post(url, headers=headers, json=payload)
+        response = get_plaid_client().post('/accounts/get', payload)
         
         if response.status_code == 200:
             data = response.json()
@@ -471,14 +494,505 @@ def get_accounts(access_token):
                 }
                 account_data.append(account_info)
                 
-            return account_data
+            return account_data, data.get('item')
         else:
             print(f"Error getting accounts: {response.text}")
-            return []
+            return [], None
             
     except Exception as e:
         print(f"Exception getting accounts: {str(e)}")
+        return [], None
+
+def fetch_transactions_page(access_token, start_date, end_date, offset, count):
+    """
+    Fetch a single offset page from Plaid transactions/get.
+    
+    Returns:
+        The decoded Plaid response, or None if Plaid returned an error
+    """
+    payload = {
+        'access_token': access_token,
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat(),
+        'options': {
+            'count': count,
+            'offset': offset
+        }
+    }
+    
+    logger.info(f"Calling Plaid API: /transactions/get with dates {start_date.isoformat()} to {end_date.isoformat()} (offset {offset})")
+    
+    response = get_plaid_client().post('/transactions/get', payload)
+    
+    # Add more detailed logging around the Plaid response
+    if response.status_code != 200:
+        logger.error(f"Error response from Plaid API: Status {response.status_code}")
+        logger.error(f"Response body: {response.text}")
+        return None
+    
+    return response.json()
+
+def fetch_transaction_pages(access_token, start_date, end_date):
+    """
+    Fetch every transaction in the date window for an access token.
+    The first page tells us total_transactions; the remaining offset pages are then
+    fetched concurrently, capped at PLAID_MAX_PAGES_PER_ITEM pages.
+    
+    Returns:
+        The raw Plaid transactions in Plaid's order, or None if any page failed; the
+        client has already retried transient errors, and a partial item must never be
+        served as if it were complete
+    """
+    page_size = get_plaid_page_size()
+    
+    first_page = fetch_transactions_page(
+        access_token, start_date, end_date, 0, page_size
+    )
+    if first_page is None:
+        return None
+    
+    # Debug: Print the raw transaction response structure
+    logger.debug("Plaid response keys: %s", first_page.keys())
+    
+    transactions = list(first_page.get('transactions', []))
+    total_transactions = first_page.get('total_transactions', len(transactions))
+    
+    # Work out which offsets are still missing, bounded by the per-item page cap
+    max_pages = get_plaid_max_pages_per_item()
+    total_pages = -(-total_transactions // page_size)
+    if total_pages > max_pages:
+        logger.warning(f"Item has {total_transactions} transactions; only fetching the first {max_pages} pages")
+        total_pages = max_pages
+    offsets = [page * page_size for page in range(1, total_pages)]
+    
+    if not offsets:
+        return transactions
+    
+    max_workers = min(get_plaid_max_concurrency(), len(offsets))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(fetch_transactions_page, access_token, start_date, end_date, offset, page_size)
+            for offset in offsets
+        ]
+        
+        # Merge in offset order; a failed page fails the whole item
+        seen_ids = {tx.get('transaction_id') for tx in transactions}
+        for offset, future in zip(offsets, futures):
+            try:
+                page = future.result()
+            except Exception as e:
+                logger.exception(f"Error fetching transactions page at offset {offset}: {str(e)}")
+                page = None
+            if page is None:
+                logger.error(f"Transactions page at offset {offset} failed; dropping the item's incomplete results")
+                for pending in futures:
+                    pending.cancel()
+                return None
+            
+            # Offsets can shift if Plaid updates the item mid-fetch, so drop duplicates
+            for tx in page.get('transactions', []):
+                transaction_id = tx.get('transaction_id')
+                if transaction_id in seen_ids:
+                    continue
+                seen_ids.add(transaction_id)
+                transactions.append(tx)
+    
+    return transactions
+
+def format_transactions(plaid_transactions, account_map, request_log=None):
+    """
+    Validate and normalize raw Plaid transactions into TransactionSchema's load output.
+    Invalid transactions are logged and skipped rather than failing the whole batch.
+    
+    Args:
+        plaid_transactions: Raw Plaid transaction objects
+        account_map: account_id -> account info, as built by UserDataContext.account_map
+        request_log: The RequestLog counting rows and sampling row-level debug output
+    """
+    request_log = request_log or get_request_log()
+    
+    # Log structure of first transaction for debugging (sampled requests only)
+    if plaid_transactions:
+        first_transaction = plaid_transactions[0]
+        request_log.debug_row(0, "Sample transaction structure: %s", LazyJson(list(first_transaction.keys()), indent=None))
+        request_log.debug_row(0, "Sample transaction category: %r", first_transaction.get('category'))
+    
+    # Process and format transactions
+    item_transactions = []
+    skipped = 0
+    with request_log.timed('normalize'):
+        for idx, transaction in enumerate(plaid_transactions):
+            request_log.debug_row(idx, "Processing transaction %d/%d: %s", idx + 1, len(plaid_transactions), LazyJson(transaction))
+            
+            try:
+                account_id = transaction.get('account_id')
+                if not account_id:
+                    logger.warning("Transaction missing account_id: %s", transaction.get('transaction_id'))
+                    skipped += 1
+                    continue
+                    
+                account_info = account_map.get(account_id, {})
+                
+                # Add account info to the transaction before validation
+                transaction['account_name'] = account_info.get('name', 'Unknown Account')
+                transaction['institution_name'] = account_info.get('institution_name', 'Unknown Institution')
+                
+                # First check if transaction has required fields before schema validation
+                missing_fields = [field for field in REQUIRED_TRANSACTION_FIELDS if transaction.get(field) is None]
+                
+                if missing_fields:
+                    logger.warning("Transaction %s is missing required fields: %s", transaction.get('transaction_id'), missing_fields)
+                    skipped += 1
+                    continue
+                
+                # Validate and transform the transaction like TransactionSchema().load
+                try:
+                    formatted_transaction = transaction_normalizer.load(transaction)
+                    request_log.debug_row(idx, "Processed category: %r", formatted_transaction.get('category'))
+                    item_transactions.append(formatted_transaction)
+                except Exception as schema_error:
+                    logger.error("Error validating transaction %s: %s", transaction.get('transaction_id'), schema_error)
+                    # Print the transaction for deeper debugging
+                    logger.debug("Problematic transaction: %s", LazyJson(transaction))
+                    # Skip invalid transactions instead of failing the entire request
+                    skipped += 1
+                    continue
+            except Exception as e:
+                logger.exception("Error processing transaction: %s", e)
+                skipped += 1
+                continue
+    
+    request_log.count('rows', len(plaid_transactions))
+    request_log.count('skipped', skipped)
+    return item_transactions
+
+def fetch_item_transactions(item, account_map, start_date, end_date, request_log=None):
+    """
+    Fetch and format the transactions for a single linked Plaid item live from transactions/get.
+    Runs on a worker thread from load_user_transactions, so it must not touch the Flask request.
+    
+    Args:
+        item: The plaid_items row to fetch transactions for
+        account_map: account_id -> account info for the user's accounts
+        start_date: First date (inclusive) of the transaction window
+        end_date: Last date (inclusive) of the transaction window
+        request_log: The RequestLog of the request being served
+    """
+    request_log = request_log or get_request_log()
+    access_token = item['access_token']
+    institution_name = item.get('institution_name', 'Financial Institution')
+    item_id = item.get('id', 'unknown')
+    
+    logger.info(f"Fetching transactions for institution: {institution_name} (item_id: {item_id})")
+    
+    # Call Plaid transactions/get endpoint, following total_transactions across pages
+    with request_log.timed('fetch'):
+        plaid_transactions = fetch_transaction_pages(access_token, start_date, end_date)
+    if plaid_transactions is None:
+        logger.warning(f"Skipping institution {institution_name} (item_id: {item_id}): transactions could not be fetched")
         return []
+    
+    # Log total transactions received from Plaid
+    logger.info(f"Received {len(plaid_transactions)} transactions from Plaid for institution: {institution_name}")
+    
+    # Debug: Print a few transactions with their complete details
+    for i, tx in enumerate(plaid_transactions[:2]):  # Just look at first 2 transactions
+        request_log.debug_row(i, "Transaction %d details: %s", i, LazyJson(tx))
+    
+    # If no transactions, log this specifically
+    if not plaid_transactions:
+        logger.warning(f"No transactions returned from Plaid for this item within date range {start_date.isoformat()} to {end_date.isoformat()}")
+        return []
+    
+    return format_transactions(plaid_transactions, account_map, request_log)
+
+def load_item_transactions(item, account_map, start_date, end_date, request_log=None):
+    """
+    Serve a single item's transactions from the local store, syncing it first if it is stale.
+    Runs on a worker thread from load_user_transactions, so it must not touch the Flask request.
+    
+    Args:
+        item: The plaid_items row to load transactions for
+        account_map: account_id -> account info for the user's accounts
+        start_date: First date (inclusive) of the transaction window
+        end_date: Last date (inclusive) of the transaction window
+        request_log: The RequestLog of the request being served
+    """
+    request_log = request_log or get_request_log()
+    institution_name = item.get('institution_name', 'Financial Institution')
+    item_id = item.get('id', 'unknown')
+    
+    logger.info(f"Loading transactions for institution: {institution_name} (item_id: {item_id})")
+    
+    # A failed sync falls back to whatever the store already holds for this item
+    try:
+        with request_log.timed('sync'):
+            sync_item(item)
+    except Exception as e:
+        logger.exception(f"Error syncing item {item_id}, serving stored transactions: {str(e)}")
+    
+    with request_log.timed('store'):
+        plaid_transactions = get_transaction_store().get_transactions([item['id']], start_date, end_date)[str(item['id'])]
+    logger.info(f"Loaded {len(plaid_transactions)} stored transactions for institution: {institution_name}")
+    
+    if not plaid_transactions:
+        logger.warning(f"No stored transactions for this item within date range {start_date.isoformat()} to {end_date.isoformat()}")
+        return []
+    
+    return format_transactions(plaid_transactions, account_map, request_log)
+
+
+def iter_item_transactions(context, start_date, end_date, in_order=True):
+    """
+    Load each item of a UserDataContext concurrently and yield its normalized transactions.
+    A failure in one item is logged and that item is skipped.
+    
+    Args:
+        context: The UserDataContext whose items and accounts are used
+        start_date: First date (inclusive) of the transaction window
+        end_date: Last date (inclusive) of the transaction window
+        in_order: Yield items in item order; if False, yield each item as soon as it finishes
+    
+    Yields:
+        One list of normalized transactions per item, newest first within the item
+    """
+    plaid_items = context.items
+    if not plaid_items:
+        return
+    
+    # Serve from the synced local store, or fetch the window live from transactions/get
+    if get_transactions_source() == 'sync':
+        load_item = load_item_transactions
+    else:
+        load_item = fetch_item_transactions
+    
+    account_map = context.account_map
+    accounts_by_item = context.accounts_by_item
+    
+    # Worker threads can't reach the request, so hand them its log
+    request_log = get_request_log()
+    request_log.count('items', len(plaid_items))
+    
+    # Load every item concurrently so latency tracks the slowest institution
+    # rather than the sum of all of them
+    max_workers = min(get_plaid_max_concurrency(), len(plaid_items))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = []
+        for item in plaid_items:
+            if not accounts_by_item.get(item['id']):
+                logger.warning(f"No accounts found for item {item['id']}")
+                continue
+            futures.append(executor.submit(load_item, item, account_map, start_date, end_date, request_log))
+        
+        for future in (futures if in_order else as_completed(futures)):
+            try:
+                item_transactions = future.result()
+            except Exception as e:
+                logger.exception(f"Error processing item: {str(e)}")
+                continue
+            yield item_transactions
+
+def load_user_transactions(context, start_date, end_date):
+    """
+    Load normalized transactions for every item in a UserDataContext, newest first.
+    Used as the context's transactions loader; see get_user_data.
+    
+    Args:
+        context: The UserDataContext whose items and accounts are used
+        start_date: First date (inclusive) of the transaction window
+        end_date: Last date (inclusive) of the transaction window
+    """
+    all_transactions = []
+    
+    # Merge in item order so the sort below stays deterministic
+    for item_transactions in iter_item_transactions(context, start_date, end_date):
+        all_transactions.extend(item_transactions)
+    
+    # Log total number of valid transactions
+    logger.info(f"Total valid transactions after processing: {len(all_transactions)}")
+    
+    # Sort transactions by date (newest first); the id breaks ties so cursors are stable
+    if all_transactions:
+        all_transactions.sort(key=lambda x: (x['date'], x['id']), reverse=True)
+    
+    # Debug final transactions
+    get_request_log().count('transactions', len(all_transactions))
+    if all_transactions:
+        logger.debug("First transaction final data: %s", all_transactions[0])
+    
+    return all_transactions
+
+def parse_date_range(args):
+    """
+    Read the optional start_date/end_date query parameters (YYYY-MM-DD).
+    Missing values default to the last DEFAULT_WINDOW_DAYS days ending today.
+    
+    Raises:
+        ValueError if a date is malformed or the range is inverted
+    """
+    end_param = args.get('end_date')
+    start_param = args.get('start_date')
+    
+    try:
+        end_date = datetime.strptime(end_param, '%Y-%m-%d').date() if end_param else datetime.now().date()
+        start_date = datetime.strptime(start_param, '%Y-%m-%d').date() if start_param else end_date - timedelta(days=DEFAULT_WINDOW_DAYS)
+    except ValueError:
+        raise ValueError('start_date and end_date must be formatted as YYYY-MM-DD')
+    
+    if start_date > end_date:
+        raise ValueError('start_date must not be after end_date')
+    
+    return start_date, end_date
+
+def get_history_start(user_data, end_date):
+    """
+    First date of a user's full transaction history: the oldest stored transaction when
+    serving from the sync store, otherwise as far back as transactions/get reaches.
+    """
+    if get_transactions_source() == 'sync':
+        # Stale items are synced first so a newly linked item's history counts
+        linked_items = [item for item in user_data.items if user_data.accounts_by_item.get(item['id'])]
+        sync_items(linked_items)
+        first, _ = get_transaction_store().get_date_range([item['id'] for item in linked_items])
+        if first:
+            return min(datetime.strptime(first, '%Y-%m-%d').date(), end_date)
+        return end_date
+    return end_date - timedelta(days=LIVE_BACKTEST_DAYS)
+
+def wants_ndjson():
+    """Whether the client asked for a streamed application/x-ndjson response."""
+    if request.args.get('format') == 'ndjson':
+        return True
+    return request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+def stream_transactions_ndjson(context, start_date, end_date):
+    """
+    Yield one JSON line per normalized transaction, flushing each institution as soon as
+    it finishes. Rows are newest first within an institution but not across them.
+    """
+    transaction_schema = TransactionSchema()
+    count = 0
+    for item_transactions in iter_item_transactions(context, start_date, end_date, in_order=False):
+        lines = [json.dumps(transaction_schema.dump(transaction)) + '\n' for transaction in item_transactions]
+        count += len(lines)
+        yield ''.join(lines)
+    logger.info(f"Streamed {count} transactions for user {context.user_id}")
+
+def get_user_data(user_id):
+    """Get the request-scoped UserDataContext for a user."""
+    return get_user_context(user_id, load_user_transactions)
+
+def parse_page_args(args):
+    """
+    Read the optional limit/cursor query parameters of /transactions.
+    
+    Returns:
+        (limit, cursor) where limit is None when the client did not ask for paging and
+        cursor is the (date, transaction_id) of the last row already seen, or None
+    
+    Raises:
+        ValueError if limit is out of range or cursor was not issued by us
+    """
+    limit_param = args.get('limit')
+    cursor_param = args.get('cursor')
+    
+    limit = None
+    if limit_param is not None:
+        try:
+            limit = int(limit_param)
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= MAX_TRANSACTIONS_PAGE_LIMIT:
+            raise ValueError(f'limit must be between 1 and {MAX_TRANSACTIONS_PAGE_LIMIT}')
+    
+    cursor = None
+    if cursor_param:
+        try:
+            padded = cursor_param + '=' * (-len(cursor_param) % 4)
+            date, transaction_id = json.loads(base64.urlsafe_b64decode(padded))
+            cursor = (str(date), str(transaction_id))
+        except (ValueError, TypeError):
+            raise ValueError('cursor is not a valid page cursor')
+        if limit is None:
+            limit = MAX_TRANSACTIONS_PAGE_LIMIT
+    
+    return limit, cursor
+
+def encode_cursor(transaction):
+    """Opaque cursor pointing just past a transaction in newest-first order."""
+    raw = json.dumps([transaction['date'], transaction['id']]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def paginate_transactions(transactions, limit, cursor):
+    """
+    Take the page of newest-first transactions that follows cursor.
+    Keyset paging on (date, id) keeps pages stable when new transactions arrive.
+    
+    Returns:
+        (page, next_cursor) where next_cursor is None on the last page
+    """
+    if cursor:
+        transactions = [t for t in transactions if (t['date'], t['id']) < cursor]
+    
+    page = transactions[:limit]
+    next_cursor = encode_cursor(page[-1]) if len(transactions) > limit else None
+    return page, next_cursor
+
+def get_user_data_version(user_data):
+    """
+    Fingerprint of everything a user's transaction responses are built from: the stored
+    version of each linked item plus the account details joined into every row.
+    Stale items are synced first, so the version matches what a full load would serve.
+    
+    Returns:
+        A hex digest, or None when transactions are fetched live and carry no version
+    """
+    if get_transactions_source() != 'sync':
+        return None
+    
+    linked_items = [item for item in user_data.items if user_data.accounts_by_item.get(item['id'])]
+    sync_items(linked_items)
+    versions = get_transaction_store().get_item_versions([item['id'] for item in linked_items])
+    
+    digest = hashlib.sha256()
+    for item in linked_items:
+        digest.update(f"{item['id']}:{versions[str(item['id'])]}\n".encode())
+    digest.update(json.dumps(user_data.account_map, sort_keys=True).encode())
+    return digest.hexdigest()
+
+def make_etag(user_data, *params):
+    """
+    ETag for the current endpoint: the user's data version, the rewards programs
+    and every resolved parameter that shapes the body. None when no data version is
+    available.
+    """
+    version = get_user_data_version(user_data)
+    if version is None:
+        return None
+    
+    key = '|'.join([ETAG_SCHEMA_VERSION, REWARDS_FINGERPRINT, version, request.path] + [str(param) for param in params])
+    return hashlib.sha256(key.encode()).hexdigest()
+
+def add_validators(response, etag, weak=False):
+    """
+    Attach the ETag and ask clients to revalidate before reusing the cached body. A weak
+    ETag only promises an equivalent body, not the same bytes.
+    """
+    if etag:
+        response.set_etag(etag, weak=weak)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        response.vary.add('Authorization')
+    return response
+
+def not_modified(etag, weak=False):
+    """A bodyless 304 if If-None-Match already names etag, otherwise None."""
+    if not etag:
+        return None
+    if_none_match = request.if_none_match
+    if if_none_match.contains_weak(etag) if weak else if_none_match.contains(etag):
+        logger.info(f"ETag matched for {request.path}, returning 304")
+        return add_validators(Response(status=304), etag, weak=weak)
+    return None
 
 @plaid_bp.route('/transactions', methods=['GET'])
 @require_user_id
@@ -486,6 +1000,12 @@ def get_transactions(user_id=None, return_json=True):
     """
     Endpoint to retrieve transactions from all linked accounts.
     Uses stored access tokens to get real transactions from Plaid API.
+    Accepts optional start_date/end_date (YYYY-MM-DD) query parameters, defaulting to
+    the last 30 days. Clients sending Accept: application/x-ndjson (or format=ndjson)
+    get one transaction per line, streamed as each institution finishes.
+    JSON responses page with limit (max 500) and the opaque next_cursor of the previous
+    page; without either, every transaction is returned. Responses carry an ETag and
+    If-None-Match is answered with 304 without loading any transactions.
     
     Args:
         user_id: The user ID to get transactions for
@@ -494,11 +1014,9 @@ def get_transactions(user_id=None, return_json=True):
     try:
         logger.info(f"Fetching transactions for user: {user_id}")
         
-        # Query Supabase for all plaid items for this user
-        items_response = supabase.table('plaid_items').select('*').eq('user_id', user_id).execute()
-        plaid_items = items_response.data
+        user_data = get_user_data(user_id)
         
-        if not plaid_items:
+        if not user_data.items:
             logger.warning(f"No linked accounts found for user: {user_id}")
             if return_json:
                 return jsonify({
@@ -508,180 +1026,65 @@ def get_transactions(user_id=None, return_json=True):
             else:
                 return [], 404
         
-        logger.info(f"Found {len(plaid_items)} linked items for user")
+        logger.info(f"Found {len(user_data.items)} linked items for user")
         
-        # Set date range for transactions (last 30 days)
-        end_date = datetime.now().date()
-        start_date = end_date - timedelta(days=30)
-        
-        all_transactions = []
-        client_id = os.getenv('PLAID_CLIENT_ID')
-        secret = os.getenv('PLAID_SECRET')
-        
-        # For each item, fetch transactions
-        for item in plaid_items:
-            try:
-                access_token = item['access_token']
-                institution_name = item.get('institution_name', 'Financial Institution')
-                item_id = item.get('id', 'unknown')
-                
-                logger.info(f"Fetching transactions for institution: {institution_name} (item_id: {item_id})")
-                
-                # Get accounts for this item
-                accounts_response = supabase.table('plaid_accounts').select('*').eq('plaid_item_id', item['id']).execute()
-                accounts = accounts_response.data
-                
-                if not accounts:
-                    logger.warning(f"No accounts found for item {item['id']}")
-                    continue
-                
-                logger.info(f"Found {len(accounts)} accounts for item")
-                
-                account_map = {}
-                for account in accounts:
-                    account_map[account['account_id']] = {
-                        'name': account['name'],
-                        'mask': account.get('mask', ''),
-                        'type': account.get('type', ''),
-                        'institution_name': institution_name
-                    }
-                
-                # Call Plaid transactions/get endpoint
-                payload = {
-                    'client_id': client_id,
-                    'secret': secret,
-                    'access_token': access_token,
-                    'start_date': start_date.isoformat(),
-                    'end_date': end_date.isoformat(),
-                    'options': {
-                        'count': 100  # Adjust as needed
-                    }
-                }
-                
-                url = f"{get_plaid_base_url()}/transactions/get"
-                headers = {'Content-Type': 'application/json'}
-                
-                logger.info(f"Calling Plaid API: {url} with dates {start_date.isoformat()} to {end_date.isoformat()}")
-                
-                response = requests.post(url, headers=headers, json=payload)
-                
-                # Add more detailed logging around the Plaid response
-                if response.status_code != 200:
-                    logger.error(f"Error response from Plaid API: Status {response.status_code}")
-                    logger.error(f"Response body: {response.text}")
-                    continue
-                
-                transactions_data = response.json()
-                
-                # Debug: Print the raw transaction response structure
-                logger.debug(f"Plaid response keys: {transactions_data.keys()}")
-                
-                # Log total transactions received from Plaid
-                plaid_transactions = transactions_data.get('transactions', [])
-                logger.info(f"Received {len(plaid_transactions)} transactions from Plaid for institution: {institution_name}")
-                
-                # Debug: Print a few transactions with their complete details
-                for i, tx in enumerate(plaid_transactions[:2]):  # Just look at first 2 transactions
-                    logger.debug(f"Transaction {i} details: {json.dumps(tx, indent=2)}")
-                
-                # If no transactions, log this specifically
-                if not plaid_transactions:
-                    logger.warning(f"No transactions returned from Plaid for this item within date range {start_date.isoformat()} to {end_date.isoformat()}")
-                    continue
-                
-                # Log structure of first transaction for debugging
-                if plaid_transactions:
-                    first_transaction = plaid_transactions[0]
-                    logger.debug(f"Sample transaction structure: {first_transaction.keys()}")
-                    
-                    # Log the category field specifically to debug issues
-                    if 'category' in first_transaction:
-                        cat_value = first_transaction['category']
-                        logger.debug(f"Sample transaction category: {cat_value}, type: {type(cat_value)}")
-                        if isinstance(cat_value, list):
-                            logger.debug(f"Category list contents: {cat_value}")
-                            for i, c in enumerate(cat_value):
-                                logger.debug(f"  Category {i}: '{c}', type: {type(c)}")
-                    
-                    logger.debug(f"Sample transaction: {first_transaction}")
-                
-                # Process and format transactions
-                for idx, transaction in enumerate(plaid_transactions):
-                    # Log each transaction for debugging
-                    logger.debug(f"Processing transaction {idx+1}/{len(plaid_transactions)}: {transaction.get('transaction_id')} - {transaction.get('name')}")
-                    
-                    try:
-                        account_id = transaction.get('account_id')
-                        if not account_id:
-                            logger.warning(f"Transaction missing account_id: {transaction.get('transaction_id')}")
-                            continue
-                            
-                        account_info = account_map.get(account_id, {})
-                        
-                        # Add account info to the transaction before validation
-                        transaction['account_name'] = account_info.get('name', 'Unknown Account')
-                        transaction['institution_name'] = account_info.get('institution_name', 'Unknown Institution')
-                        
-                        # First check if transaction has required fields before schema validation
-                        required_fields = ['transaction_id', 'date', 'name', 'amount', 'account_id']
-                        missing_fields = [field for field in required_fields if field not in transaction or transaction[field] is None]
-                        
-                        if missing_fields:
-                            logger.warning(f"Transaction is missing required fields: {missing_fields}")
-                            continue
-                        
-                        # Use the schema to validate and format the transaction
-                        try:
-                            # Log the raw category before loading
-                            if 'category' in transaction:
-                                logger.debug(f"Raw category before schema load: {transaction['category']} (type: {type(transaction['category'])})")
-                            
-                            # Validate and transform the transaction using the schema
-                            transaction_schema = TransactionSchema()
-                            formatted_transaction = transaction_schema.load(transaction)
-                            
-                            # Log the category after processing
-                            if 'category' in formatted_transaction:
-                                logger.debug(f"Processed category after schema load: {formatted_transaction['category']} (type: {type(formatted_transaction['category'])})")
-                            
-                            all_transactions.append(formatted_transaction)
-                        except Exception as schema_error:
-                            logger.error(f"Error validating transaction {transaction.get('transaction_id')}: {schema_error}")
-                            # Print the transaction for deeper debugging
-                            logger.error(f"Problematic transaction: {transaction}")
-                            # Skip invalid transactions instead of failing the entire request
-                            continue
-                    except Exception as e:
-                        logger.exception(f"Error processing transaction: {e}")
-                        continue
-
-            except Exception as e:
-                logger.exception(f"Error processing item: {str(e)}")
+        try:
+            start_date, end_date = parse_date_range(request.args)
+        except ValueError as e:
+            return jsonify({
+                'error': 'invalid_date_range',
+                'message': str(e)
+            }), 400
         
-        # Log total number of valid transactions
-        logger.info(f"Total valid transactions after processing: {len(all_transactions)}")
+        # If we want the raw data, return it directly
+        if not return_json:
+            return user_data.get_transactions(start_date, end_date), 200
+        
+        # Stream rows as each institution finishes instead of building one big body.
+        # Institutions finish in any order, so the same data can stream as different
+        # bytes and the ETag is weak
+        if wants_ndjson():
+            etag = make_etag(user_data, start_date, end_date, 'ndjson')
+            cached = not_modified(etag, weak=True)
+            if cached:
+                return cached
+            
+            response = Response(
+                stream_with_context(stream_transactions_ndjson(user_data, start_date, end_date)),
+                mimetype=NDJSON_MIMETYPE
+            )
+            response.vary.add('Accept')
+            return add_validators(response, etag, weak=True)
         
-        # Sort transactions by date (newest first)
-        if all_transactions:
-            all_transactions.sort(key=lambda x: x['date'], reverse=True)
+        try:
+            limit, cursor = parse_page_args(request.args)
+        except ValueError as e:
+            return jsonify({
+                'error': 'invalid_pagination',
+                'message': str(e)
+            }), 400
         
-        # Debug final transactions
-        logger.debug(f"Final transactions count: {len(all_transactions)}")
-        if all_transactions:
-            logger.debug(f"First transaction final data: {all_transactions[0]}")
+        etag = make_etag(user_data, start_date, end_date, limit, cursor)
+        cached = not_modified(etag)
+        if cached:
+            return cached
         
-        # If we want the raw data, return it directly
-        if not return_json:
-            return all_transactions, 200
+        all_transactions = user_data.get_transactions(start_date, end_date)
         
         # Use the list schema to format the response
         transaction_list_schema = TransactionListSchema()
-        result = transaction_list_schema.dump({"data": all_transactions})
+        if limit is None:
+            result = transaction_list_schema.dump({"data": all_transactions})
+        else:
+            page, next_cursor = paginate_transactions(all_transactions, limit, cursor)
+            result = transaction_list_schema.dump({"data": page, "next_cursor": next_cursor})
         
         # Debug the final JSON result before sending to frontend
-        logger.debug(f"Response data count: {len(result.get('data', []))}")
+        logger.debug("Response data count: %d", len(result.get('data', [])))
         
-        return jsonify(result)
+        response = jsonify(result)
+        response.vary.add('Accept')
+        return add_validators(response, etag)
     except Exception as e:
         logger.exception(f"Error fetching transactions: {str(e)}")
         if return_json:
@@ -700,80 +1103,40 @@ def get_transaction_summary(user_id=None):
     Uses the same transaction data but provides aggregated statistics.
     """
     try:
-        # Query Supabase for all plaid items for this user
-        items_response = supabase.table('plaid_items').select('*').eq('user_id', user_id).execute()
-        plaid_items = items_response.data
+        user_data = get_user_data(user_id)
         
-        if not plaid_items:
+        if not user_data.items:
             return jsonify({
                 'error': 'no_linked_accounts',
                 'message': 'No linked bank accounts found'
             }), 404
         
+        # Revisits with an unchanged data version skip the aggregation entirely
+        etag = make_etag(user_data, DEFAULT_WINDOW_DAYS, datetime.now().date())
+        cached = not_modified(etag)
+        if cached:
+            return cached
+        
         # Get transactions data directly
-        transactions, status_code = get_transactions(user_id=user_id, return_json=False)
+        transactions = user_data.transactions
         
-        # If error occurred or no transactions, return appropriate response
-        if status_code != 200 or not transactions:
+        # If no transactions, return appropriate response
+        if not transactions:
             return jsonify({
                 'error': 'no_transactions',
                 'message': 'Failed to retrieve transactions'
-            }), status_code if status_code != 200 else 404
+            }), 404
         
         logger.info(f"Processing {len(transactions)} transactions for summary")
         
-        # Create summary
-        summary = {
-            'total_transactions': len(transactions),
-            'total_amount': sum(abs(t['amount']) for t in transactions),
-            'income': sum(t['amount'] for t in transactions if t['amount'] > 0),
-            'expenses': sum(abs(t['amount']) for t in transactions if t['amount'] < 0),
-            'categories': {},
-            'accounts': {},
-            'institutions': {}
-        }
-        
-        # Aggregate by category
-        for transaction in transactions:
-            category = transaction.get('category', 'Other')
-            amount = abs(transaction['amount'])
-            account_id = transaction.get('account_id', 'unknown')
-            account_name = transaction.get('account_name', 'Unknown Account')
-            institution_name = transaction.get('institution_name', 'Unknown Institution')
-            
-            # Aggregate by category
-            if category not in summary['categories']:
-                summary['categories'][category] = {
-                    'count': 0,
-                    'amount': 0
-                }
-            summary['categories'][category]['count'] += 1
-            summary['categories'][category]['amount'] += amount
-            
-            # Aggregate by account
-            if account_id not in summary['accounts']:
-                summary['accounts'][account_id] = {
-                    'name': account_name,
-                    'count': 0,
-                    'amount': 0
-                }
-            summary['accounts'][account_id]['count'] += 1
-            summary['accounts'][account_id]['amount'] += amount
-            
-            # Aggregate by institution
-            if institution_name not in summary['institutions']:
-                summary['institutions'][institution_name] = {
-                    'count': 0,
-                    'amount': 0
-                }
-            summary['institutions'][institution_name]['count'] += 1
-            summary['institutions'][institution_name]['amount'] += amount
+        # Totals and per-category/account/institution breakdowns in one vectorized pass
+        summary = summarize_transactions(user_data.frame)
         
         # Use the schema to validate and format the response
         summary_schema = TransactionSummaryResponseSchema()
         result = summary_schema.dump({"data": summary})
         
-        return jsonify(result)
+        return add_validators(jsonify(result), etag)
     except Exception as e:
         logger.exception(f"Error fetching transaction summary: {str(e)}")
         return jsonify({
@@ -785,33 +1148,27 @@ def get_transaction_summary(user_id=None):
 def test_credentials():
     """Test endpoint to verify if Plaid credentials are working."""
     try:
-        client_id = os.getenv('PLAID_CLIENT_ID')
-        secret = os.getenv('PLAID_SECRET')
+        plaid_client = get_plaid_client()
         env = os.getenv('PLAID_ENV', 'sandbox')
         
-        if not client_id or not secret:
+        if not plaid_client.has_credentials:
             return jsonify({
                 'valid': False,
                 'error': 'Missing Plaid credentials',
                 'debug': {
-                    'client_id_present': bool(client_id),
-                    'secret_present': bool(secret),
+                    'client_id_present': bool(plaid_client.client_id),
+                    'secret_present': bool(plaid_client.secret),
                     'environment': env
                 }
             })
             
         # Try to call the institutions/get_by_id endpoint as a test
         payload = {
-            'client_id': client_id,
-            'secret': secret,
             'institution_id': 'ins_3',  # Chase Bank in sandbox
             'country_codes': ['US']
         }
         
-        url = f"{get_plaid_base_url()}/institutions/get_by_id"
-        headers = {'Content-Type': 'application/json'}
-        
-        response = requests.post(url, headers=headers, json=payload)
+        response = plaid_client.post('/institutions/get_by_id', payload)
         
         if response.status_code == 200:
             institution_data = response.json().get('institution', {})
@@ -886,7 +1243,12 @@ def check_env():
                 'plaid_client_id_value': env_contents.get('PLAID_CLIENT_ID', 'not found').replace(env_contents.get('PLAID_CLIENT_ID', '')[4:] if env_contents.get('PLAID_CLIENT_ID') else '', '*****') if env_contents.get('PLAID_CLIENT_ID') else 'not found',
                 'working_directory': os.getcwd()
             },
-            'test_connection': test_plaid_credentials()
+            'test_connection': test_plaid_credentials(),
+            'caches': {
+                'institutions': get_institution_cache().stats(),
+                'reward_rates': get_rate_cache().stats(),
+                'swipe_states': get_swipe_states().stats()
+            }
         })
     except Exception as e:
         logger.exception(f"Error in check_env: {str(e)}")
@@ -898,10 +1260,9 @@ def check_env():
 def test_plaid_credentials():
     """Test if Plaid credentials work by making a simple API call."""
     try:
-        client_id = os.getenv('PLAID_CLIENT_ID')
-        secret = os.getenv('PLAID_SECRET')
+        plaid_client = get_plaid_client()
         
-        if not client_id or not secret:
+        if not plaid_client.has_credentials:
             return {
                 'success': False,
                 'message': 'Missing credentials'
@@ -909,16 +1270,11 @@ def test_plaid_credentials():
         
         # Try a simple API call to get institutions
         payload = {
-            'client_id': client_id,
-            'secret': secret,
             'count': 1,
             'country_codes': ['US']
         }
         
-        url = f"{get_plaid_base_url()}/institutions/get"
-        headers = {'Content-Type': 'application/json'}
-        
-        response = requests.post(url, headers=headers, json=payload)
+        response = plaid_client.post('/institutions/get', payload)
         
         if response.status_code == 200:
             return {
@@ -946,28 +1302,19 @@ def remove_account(account_id, user_id=None):
         
         print(f"Removing account {account_id} for user {user_id}")
         
-        # First, find the account to get its plaid_item_id
-        account_response = supabase.table('plaid_accounts').select('*').eq('account_id', account_id).execute()
+        # Delete the account, and its plaid item if this was the item's last account
+        removed = delete_account(account_id)
         
-        if not account_response.data or len(account_response.data) == 0:
+        if not removed:
             return jsonify({
                 'error': 'account_not_found',
                 'message': 'Account not found'
             }), 404
-            
-        account = account_response.data[0]
-        plaid_item_id = account['plaid_item_id']
         
-        # Delete the account
-        delete_response = supabase.table('plaid_accounts').delete().eq('account_id', account_id).execute()
-        
-        # Check if this was the last account for this item
-        remaining_accounts = supabase.table('plaid_accounts').select('*').eq('plaid_item_id', plaid_item_id).execute()
-        
-        # If no more accounts, also delete the plaid item
-        if not remaining_accounts.data or len(remaining_accounts.data) == 0:
-            supabase.table('plaid_items').delete().eq('id', plaid_item_id).execute()
-            print(f"Deleted plaid item {plaid_item_id} as it had no more accounts")
+        if removed['item_deleted']:
+            get_transaction_store().delete_item(removed['plaid_item_id'])
+            print(f"Deleted plaid item {removed['plaid_item_id']} as it had no more accounts")
+        get_swipe_states().invalidate(user_id)
         
         return jsonify({
             'success': True,
@@ -980,129 +1327,228 @@ def remove_account(account_id, user_id=None):
             'message': str(e)
         }), 500
 
+@plaid_bp.route('/plaid/accounts/<account_id>/rewards-program', methods=['PUT'])
+@require_user_id
+def set_rewards_program(account_id, user_id=None):
+    """
+    Override the rewards program of a linked account.
+    Expects {"rewardsProgram": "<program name>"}; null goes back to the program
+    resolved from the institution and account names.
+    """
+    try:
+        program_name = (request.get_json(silent=True) or {}).get('rewardsProgram')
+        if program_name is not None and program_name not in REWARDS_PROGRAMS:
+            return jsonify({
+                'error': 'invalid_rewards_program',
+                'message': f"Unknown rewards program {program_name}",
+                'programs': list(REWARDS_PROGRAMS)
+            }), 400
+        
+        # Only the user's own accounts can be changed
+        account = next((a for a in get_user_accounts(user_id) if a['account_id'] == account_id), None)
+        if not account:
+            return jsonify({
+                'error': 'account_not_found',
+                'message': 'Account not found'
+            }), 404
+        
+        if program_name is None:
+            program_name = resolve_rewards_program(account['institution_name'], account['name'])
+        set_account_rewards_program(account_id, program_name)
+        get_swipe_states().invalidate(user_id)
+        logger.info(f"Set rewards program of account {account_id} to {program_name}")
+        
+        return jsonify({
+            'success': True,
+            'account': {
+                'id': account_id,
+                'rewardsProgram': program_name
+            }
+        })
+    except Exception as e:
+        logger.exception(f"Error setting rewards program: {str(e)}")
+        return jsonify({
+            'error': 'server_error',
+            'message': str(e)
+        }), 500
+
+@plaid_bp.route('/plaid/webhook', methods=['POST'])
+def plaid_webhook():
+    """
+    Receive Plaid TRANSACTIONS and ITEM webhooks.
+    Verified webhooks queue a background refresh of the matching item, so the store is
+    already current when the user next loads the dashboard.
+    """
+    try:
+        body = request.get_data()
+        
+        if is_webhook_verification_enabled():
+            try:
+                verify_webhook(body, request.headers.get('Plaid-Verification'))
+            except WebhookVerificationError as e:
+                logger.warning(f"Rejected Plaid webhook: {str(e)}")
+                return jsonify({'error': 'invalid_webhook', 'message': str(e)}), 401
+        
+        data = json.loads(body or b'{}')
+        webhook_type = data.get('webhook_type')
+        webhook_code = data.get('webhook_code')
+        item_id = data.get('item_id')
+        
+        logger.info(f"Received Plaid webhook {webhook_type}/{webhook_code} for item {item_id}")
+        
+        if webhook_type == 'ITEM' and webhook_code in ITEM_ERROR_CODES:
+            logger.warning(f"Item {item_id} reported {webhook_code}: {data.get('error')}")
+        
+        queued = False
+        if item_id and should_refresh(webhook_type, webhook_code):
+            get_refresh_queue().enqueue(item_id, reason=f"{webhook_type}/{webhook_code}")
+            queued = True
+        
+        # Always acknowledge quickly; Plaid retries webhooks that don't get a 200
+        return jsonify({'received': True, 'refresh_queued': queued})
+    except ValueError as e:
+        logger.warning(f"Malformed Plaid webhook body: {str(e)}")
+        return jsonify({'error': 'invalid_body', 'message': str(e)}), 400
+    except Exception as e:
+        logger.exception(f"Error handling Plaid webhook: {str(e)}")
+        return jsonify({'error': 'server_error', 'message': str(e)}), 500
+
+def get_account_columns(user_data, frame, program_names):
+    """
+    Index into program_names of each account in a frame, from the user's account_programs.
+    
+    Returns:
+        A tuple of (columns, card_names) per frame account code; accounts without a known
+        rewards program get column -1 and card name "Unknown Card"
+    """
+    columns = np.full(len(frame.account_ids), -1)
+    card_names = []
+    for code, account_id in enumerate(frame.account_ids):
+        rewards_program = user_data.account_programs.get(account_id)
+        if rewards_program:
+            columns[code] = program_names.index(rewards_program.name)
+        card_names.append(rewards_program.name if rewards_program else "Unknown Card")
+    return columns, card_names
+
+def get_cashback_window():
+    """
+    Window of the cashback endpoints: the whole calendar months given by the months
+    query parameter, ending today (default 1, the current month so far).
+    
+    Returns:
+        A (months, start_date, end_date) tuple, or None when months is not between 1
+        and MAX_CASHBACK_MONTHS
+    """
+    try:
+        months = int(request.args.get('months', 1))
+    except ValueError:
+        return None
+    if not 1 <= months <= MAX_CASHBACK_MONTHS:
+        return None
+    today = datetime.now().date()
+    first_month = today.year * 12 + today.month - months
+    return months, today.replace(year=first_month // 12, month=first_month % 12 + 1, day=1), today
+
+def get_window_cards(user_data, start_date, end_date, program_names):
+    """
+    The transactions of a cashback window on the cards actually used, with caps counted
+    the way the materialized aggregates count them (see refresh_cashback).
+    
+    From the sync store, a CapLedger is filled with what the cards spent earlier in the
+    cap periods the window starts in, so both endpoints see the same cap room. Fetched
+    live, caps count the window's own transactions only, like the cashback endpoint.
+    
+    Returns:
+        A tuple of (frame, columns per row, card names per account code, ledger)
+    """
+    frame = user_data.get_frame(start_date, end_date)
+    account_columns, card_names = get_account_columns(user_data, frame, program_names)
+    ledger = CapLedger()
+    
+    history_start = min(
+        (period_bounds(start_date, program.cap_period)[0] for program in REWARDS_LIST if program.capped_rules),
+        default=start_date
+    )
+    if get_transactions_source() == 'sync' and history_start < start_date:
+        history = user_data.get_frame(history_start, start_date - timedelta(days=1))
+        history_columns, _ = get_account_columns(user_data, history, program_names)
+        price_assignment(history, history_columns[history.account_codes], ledger=ledger, user_id=user_data.user_id)
+    return frame, account_columns[frame.account_codes], card_names, ledger
+
 @plaid_bp.route('/transactions/cashback', methods=['GET'])
 @require_user_id
 def get_cashback_summary(user_id=None):
     """
-    Endpoint to calculate the total cashback earned on all transactions.
-    Uses the transaction data and matches accounts to rewards programs to compute cashback.
-    Returns only the total cashback earned and cashback per card.
-    TODO: currently hardocded for bank of america and apple card.
+    Endpoint to calculate the total cashback earned over the last few calendar months.
+    Matches accounts to rewards programs to compute cashback, with caps counted from
+    the start of each cap period. Returns only the total cashback earned and cashback
+    per card.
+    Query parameters: months to cover, ending with the current one (default 1, at most 36).
+    When serving from the sync store, cashback is read from per-user (program, month)
+    aggregates that are kept up to date as transactions change (see refresh_cashback),
+    so the request costs the same however long the user's history is.
     """
     try:
+        window = get_cashback_window()
+        if window is None:
+            return jsonify({
+                'error': 'invalid_window',
+                'message': f'months must be between 1 and {MAX_CASHBACK_MONTHS}'
+            }), 400
+        months, start_date, today = window
+        
         logger.info(f"Calculating cashback for user: {user_id}")
         
-        # Get transactions data directly
-        transactions, status_code = get_transactions(user_id=user_id, return_json=False)
+        user_data = get_user_data(user_id)
         
-        # If error occurred or no transactions, return appropriate response
-        if status_code != 200 or not transactions:
+        # Transactions on accounts without a known rewards program are not counted
+        if not user_data.account_programs:
             return jsonify({
                 'error': 'no_transactions',
                 'message': 'Failed to retrieve transactions'
-            }), status_code if status_code != 200 else 404
-        
-        logger.info(f"Processing {len(transactions)} transactions for cashback calculation")
+            }), 404
         
-        # Get all plaid accounts for this user
-        accounts_data = {}
-        items_response = supabase.table('plaid_items').select('*').eq('user_id', user_id).execute()
-        plaid_items = items_response.data
+        # Revisits with an unchanged data version skip the cashback calculation entirely
+        etag = make_etag(user_data, months, today.isoformat()[:7])
+        cached = not_modified(etag)
+        if cached:
+            return cached
         
-        for item in plaid_items:
-            item_id = item['id']
-            institution_name = item.get('institution_name', 'Financial Institution')
-            
-            # Get accounts for this item
-            accounts_response = supabase.table('plaid_accounts').select('*').eq('plaid_item_id', item_id).execute()
-            
-            for account in accounts_response.data:
-                accounts_data[account['account_id']] = {
-                    'name': account['name'],
-                    'institution_name': institution_name
-                }
+        if get_transactions_source() == 'sync':
+            refresh_cashback(user_data, format_transactions)
+            totals = get_transaction_store().get_cashback_totals(user_id, start_date.isoformat()[:7], today.isoformat()[:7])
+        else:
+            # Transactions are fetched live, so there is nothing materialized to read
+            program_names = list(REWARDS_PROGRAMS)
+            frame, columns, _, ledger = get_window_cards(user_data, start_date, today, program_names)
+            cashback = price_assignment(frame, columns, ledger=ledger, user_id=user_id)
+            amounts = np.abs(frame.amount_cents) / 100
+            totals = {
+                program_names[column]: (float(amounts[columns == column].sum()), float(cashback[columns == column].sum()))
+                for column in np.unique(columns[columns >= 0]).tolist()
+            }
         
-        # Calculate cashback for each transaction
-        total_cashback = 0
-        cashback_by_card = {}
-        spending_by_card = {}
-        
-        for transaction in transactions:
-            account_id = transaction.get('account_id')
-            if not account_id or account_id not in accounts_data:
-                continue
-                
-            institution_name = accounts_data[account_id]['institution_name']
-            account_name = accounts_data[account_id]['name']
-            
-            # Match institution name to rewards program
-            rewards_program = None
-            
-            # Check for Bank of America specifically
-            if 'bank of america' in institution_name.lower() or 'bank of america' in account_name.lower():
-                # Use the Bank of America Cash Rewards program for all Bank of America transactions
-                rewards_program = REWARDS_PROGRAMS.get('Bank of America Cash Rewards')
-                logger.info(f"Matched Bank of America transaction to Cash Rewards program")
-            # Check for Chase specifically
-            elif 'chase' in institution_name.lower() or 'chase' in account_name.lower():
-                # Use the Chase Sapphire Preferred Rewards program for all Chase transactions
-                rewards_program = REWARDS_PROGRAMS.get('Chase Sapphire Preferred')
-                logger.info(f"Matched Chase transaction to Chase Sapphire Preferred Rewards program")
-            # Check for American Express specifically
-            elif 'american express' in institution_name.lower() or 'amex' in institution_name.lower() or 'american express' in account_name.lower() or 'amex' in account_name.lower():
-                # Use the American Express Gold Card program for all Amex transactions
-                rewards_program = REWARDS_PROGRAMS.get('American Express Gold Card')
-                logger.info(f"Matched American Express transaction to Gold Card program")
-            # Check for Wells Fargo specifically
-            elif 'wells fargo' in institution_name.lower() or 'wells fargo' in account_name.lower():
-                # Use the Wells Fargo Active Cash program for all Wells Fargo transactions
-                rewards_program = REWARDS_PROGRAMS.get('Wells Fargo Active Cash')
-                logger.info(f"Matched Wells Fargo transaction to Active Cash program")
-            # Check for Citibank specifically
-            elif 'citibank' in institution_name.lower() or 'citi' in institution_name.lower() or 'citibank' in account_name.lower() or 'citi' in account_name.lower():
-                # Use the Citi Double Cash program for all Citibank transactions
-                rewards_program = REWARDS_PROGRAMS.get('Citi Double Cash')
-                logger.info(f"Matched Citibank transaction to Double Cash program")
-            else:
-                # For other institutions, try to match based on program names
-                for program_name, program in REWARDS_PROGRAMS.items():
-                    if program_name.lower() in institution_name.lower() or program_name.lower() in account_name.lower():
-                        rewards_program = program
-                        break
-            
-            # If no match found, skip this transaction
-            if not rewards_program:
-                continue
-            
-            # Calculate cashback for this transaction
-            cashback = rewards_program.calculate_rewards(transaction)
-            
-            # Add to total
-            total_cashback += cashback
-            
-            # Get transaction amount
-            amount = abs(transaction['amount'])
-            
-            # Track by card
-            card_name = rewards_program.name
-            if card_name not in cashback_by_card:
-                cashback_by_card[card_name] = 0
-                spending_by_card[card_name] = 0
-            cashback_by_card[card_name] += cashback
-            spending_by_card[card_name] += amount
+        # Linked cards without spending in the window earn nothing rather than going missing
+        linked = {program.name for program in user_data.account_programs.values()}
+        program_names = [name for name in REWARDS_PROGRAMS if name in totals or name in linked]
+        totals = {name: totals.get(name, (0.0, 0.0)) for name in program_names}
+        cashback_by_card = {name: totals[name][1] for name in program_names}
+        spending_by_card = {name: totals[name][0] for name in program_names}
         
         # Format response
         result = {
             'status': 'success',
             'message': 'Cashback calculated successfully',
             'data': {
-                'total_cashback': round(total_cashback, 2),
+                'start_date': start_date.isoformat(),
+                'end_date': today.isoformat(),
+                'total_cashback': round(sum(cashback_by_card.values()), 2),
                 'cashback_by_card': {k: round(v, 2) for k, v in cashback_by_card.items()},
                 'spending_by_card': {k: round(v, 2) for k, v in spending_by_card.items()}
             }
         }
         
-        return jsonify(result)
+        return add_validators(jsonify(result), etag)
     except Exception as e:
         logger.exception(f"Error calculating cashback: {str(e)}")
         return jsonify({
@@ -1115,138 +1561,89 @@ def get_cashback_summary(user_id=None):
 def get_optimal_cashback(user_id=None):
     """
     Endpoint to calculate the theoretical maximum cashback by choosing the best rewards program
-    for each transaction, regardless of the actual card used.
+    for each transaction, regardless of the actual card used, with spending caps honored
+    (see optimize_assignment).
     This helps users understand how much more they could earn by optimizing their card usage.
+    Query parameters: months to cover, as for /transactions/cashback (default 1). The window
+    and the cap room it starts with are the same as that endpoint's, so its total_cashback
+    and optimal_total_cashback can be compared.
     """
     try:
+        window = get_cashback_window()
+        if window is None:
+            return jsonify({
+                'error': 'invalid_window',
+                'message': f'months must be between 1 and {MAX_CASHBACK_MONTHS}'
+            }), 400
+        _, start_date, today = window
+        
         logger.info(f"Calculating optimal cashback for user: {user_id}")
         
-        # Get transactions data directly
-        transactions, status_code = get_transactions(user_id=user_id, return_json=False)
+        user_data = get_user_data(user_id)
         
-        # If error occurred or no transactions, return appropriate response
-        if status_code != 200 or not transactions:
+        # Transactions on accounts without a known rewards program are not counted
+        if not user_data.account_programs:
             return jsonify({
                 'error': 'no_transactions',
                 'message': 'Failed to retrieve transactions'
-            }), status_code if status_code != 200 else 404
+            }), 404
         
+        transactions = user_data.get_transactions(start_date, today)
         logger.info(f"Processing {len(transactions)} transactions for optimal cashback calculation")
         
-        # Track actual vs optimal cashback
-        actual_total_cashback = 0
-        optimal_total_cashback = 0
-        optimal_card_usage = {}  # Which card was best for which transaction
-        optimal_cashback_by_card = {}  # How much cashback each card would provide if used optimally
-        optimal_spending_by_card = {}  # How much spending each card would have if used optimally
-        transaction_improvements = []  # List of transactions with significant cashback improvement
-        
-        # Get all plaid accounts for this user for the actual cashback calculation
-        accounts_data = {}
-        items_response = supabase.table('plaid_items').select('*').eq('user_id', user_id).execute()
-        plaid_items = items_response.data
-        
-        for item in plaid_items:
-            item_id = item['id']
-            institution_name = item.get('institution_name', 'Financial Institution')
-            
-            # Get accounts for this item
-            accounts_response = supabase.table('plaid_accounts').select('*').eq('plaid_item_id', item_id).execute()
-            
-            for account in accounts_response.data:
-                accounts_data[account['account_id']] = {
-                    'name': account['name'],
-                    'institution_name': institution_name
-                }
+        # Actual rewards program of each row, resolved when its account was linked, and
+        # what the cards had already spent against their caps before the window
+        program_names = list(REWARDS_PROGRAMS)
+        frame, actual_columns, account_card_names, ledger = get_window_cards(user_data, start_date, today, program_names)
+        amounts = np.abs(frame.amount_cents) / 100
+        
+        # Only spending counts; zero-amount rows are skipped
+        rows = np.flatnonzero(amounts > 0)
+        
+        # Calculate actual cashback, each card's caps counting only its own transactions
+        actual_cashback = price_assignment(frame, actual_columns, ledger=ledger.copy(), user_id=user_id)[rows]
+        actual_total_cashback = float(actual_cashback.sum())
+        
+        # The optimal program for each transaction comes from the cap-aware assignment,
+        # which never earns less than the cards actually used
+        assignment = optimize_assignment(frame, user_id=user_id, start=actual_columns, ledger=ledger)
+        best_columns = assignment.columns[rows]
+        best_cashback = assignment.rewards[rows]
+        optimal_total_cashback = float(best_cashback.sum())
+        logger.debug(
+            f"Optimal assignment earns {optimal_total_cashback:.2f} of at most {assignment.upper_bound:.2f}"
+            f"{'' if assignment.exact else ' (search stopped early)'}"
+        )
         
-        # Process each transaction
-        for transaction in transactions:
-            amount = abs(transaction.get('amount', 0))
-            if amount <= 0:
-                continue
-                
-            # Get actual rewards program based on the account
-            actual_rewards_program = None
-            actual_card_name = "Unknown Card"
-            
-            account_id = transaction.get('account_id')
-            if account_id and account_id in accounts_data:
-                institution_name = accounts_data[account_id]['institution_name']
-                account_name = accounts_data[account_id]['name']
-                
-                # Check for Bank of America specifically
-                if 'bank of america' in institution_name.lower() or 'bank of america' in account_name.lower():
-                    actual_rewards_program = REWARDS_PROGRAMS.get('Bank of America Cash Rewards')
-                    actual_card_name = "Bank of America Cash Rewards"
-                # Check for Chase specifically
-                elif 'chase' in institution_name.lower() or 'chase' in account_name.lower():
-                    actual_rewards_program = REWARDS_PROGRAMS.get('Apple Card')
-                    actual_card_name = "Apple Card"
-                # Check for American Express specifically  
-                elif 'american express' in institution_name.lower() or 'amex' in institution_name.lower() or 'american express' in account_name.lower() or 'amex' in account_name.lower():
-                    actual_rewards_program = REWARDS_PROGRAMS.get('American Express Gold Card')
-                    actual_card_name = "American Express Gold Card"
-                # Check for Wells Fargo specifically
-                elif 'wells fargo' in institution_name.lower() or 'wells fargo' in account_name.lower():
-                    actual_rewards_program = REWARDS_PROGRAMS.get('Wells Fargo Active Cash')
-                    actual_card_name = "Wells Fargo Active Cash"
-                # Check for Citibank specifically
-                elif 'citibank' in institution_name.lower() or 'citi' in institution_name.lower() or 'citibank' in account_name.lower() or 'citi' in account_name.lower():
-                    actual_rewards_program = REWARDS_PROGRAMS.get('Citi Double Cash')
-                    actual_card_name = "Citi Double Cash"
-                else:
-                    # For other institutions, try to match based on program names
-                    for program_name, program in REWARDS_PROGRAMS.items():
-                        if program_name.lower() in institution_name.lower() or program_name.lower() in account_name.lower():
-                            actual_rewards_program = program
-                            actual_card_name = program_name
-                            break
-            
-            # Calculate actual cashback
-            actual_cashback = 0
-            if actual_rewards_program:
-                actual_cashback = actual_rewards_program.calculate_rewards(transaction)
-                actual_total_cashback += actual_cashback
-            
-            # Find the optimal rewards program for this transaction
-            best_cashback = 0
-            best_program_name = "No Card"
-            
-            for program_name, program in REWARDS_PROGRAMS.items():
-                try:
-                    cashback = program.calculate_rewards(transaction)
-                    if cashback > best_cashback:
-                        best_cashback = cashback
-                        best_program_name = program_name
-                except Exception as e:
-                    logger.warning(f"Error calculating rewards for {program_name}: {e}")
-            
-            # Update optimal stats
-            optimal_total_cashback += best_cashback
-            
-            if best_program_name not in optimal_cashback_by_card:
-                optimal_cashback_by_card[best_program_name] = 0
-                optimal_spending_by_card[best_program_name] = 0
-            
-            optimal_cashback_by_card[best_program_name] += best_cashback
-            optimal_spending_by_card[best_program_name] += amount
-            
-            # Track which transactions would benefit from different cards
-            cashback_improvement = best_cashback - actual_cashback
-            if cashback_improvement > 0.50:  # Only track if improvement is significant (more than 50 cents)
-                merchant_name = transaction.get('name', 'Unknown Merchant')
-                date = transaction.get('date', '')
-                
-                transaction_improvements.append({
-                    'date': date,
-                    'merchant': merchant_name,
-                    'amount': amount,
-                    'actual_card': actual_card_name,
-                    'actual_cashback': actual_cashback,
-                    'optimal_card': best_program_name,
-                    'optimal_cashback': best_cashback,
-                    'improvement': cashback_improvement
-                })
+        # How much cashback and spending each card would have if used optimally
+        optimal_cashback_by_card = {}
+        optimal_spending_by_card = {}
+        for column in np.unique(best_columns).tolist():
+            selected = (best_columns == column) & (best_cashback > 0)
+            if selected.any():
+                optimal_cashback_by_card[program_names[column]] = float(best_cashback[selected].sum())
+                optimal_spending_by_card[program_names[column]] = float(amounts[rows[selected]].sum())
+        no_card = best_cashback <= 0
+        if no_card.any():
+            optimal_cashback_by_card["No Card"] = 0.0
+            optimal_spending_by_card["No Card"] = float(amounts[rows[no_card]].sum())
+        
+        # Track which transactions would benefit from different cards
+        # Only track if improvement is significant (more than 50 cents)
+        improvements = best_cashback - actual_cashback
+        transaction_improvements = []
+        for k in np.flatnonzero(improvements > 0.50).tolist():
+            transaction = transactions[rows[k]]
+            transaction_improvements.append({
+                'date': transaction.get('date', ''),
+                'merchant': transaction.get('name', 'Unknown Merchant'),
+                'amount': float(amounts[rows[k]]),
+                'actual_card': account_card_names[frame.account_codes[rows[k]]],
+                'actual_cashback': float(actual_cashback[k]),
+                'optimal_card': program_names[best_columns[k]] if best_cashback[k] > 0 else "No Card",
+                'optimal_cashback': float(best_cashback[k]),
+                'improvement': float(improvements[k])
+            })
         
         # Sort improvements by the amount of cashback improvement (highest first)
         transaction_improvements.sort(key=lambda x: x['improvement'], reverse=True)
@@ -1277,6 +1674,187 @@ def get_optimal_cashback(user_id=None):
             'message': str(e)
         }), 500
 
+@plaid_bp.route('/transactions/backtest', methods=['GET'])
+@require_user_id
+def get_backtest(user_id=None):
+    """
+    Endpoint to replay a user's whole history and compare, month by month and quarter
+    by quarter, the cashback their cards earned with what the cap-aware optimal
+    assignment would have earned (see run_backtest).
+    Query parameters: start_date (defaults to the oldest transaction) and end_date
+    (defaults to today), as YYYY-MM-DD.
+    """
+    try:
+        user_data = get_user_data(user_id)
+        
+        try:
+            start_date, end_date = parse_date_range(request.args)
+        except ValueError as e:
+            return jsonify({
+                'error': 'invalid_date_range',
+                'message': str(e)
+            }), 400
+        if not request.args.get('start_date'):
+            start_date = get_history_start(user_data, end_date)
+        
+        etag = make_etag(user_data, start_date, end_date)
+        cached = not_modified(etag)
+        if cached:
+            return cached
+        
+        # Windows are loaded one at a time and not memoized on the context, so memory
+        # stays bounded by a single cap period of transactions
+        backtest = run_backtest(
+            lambda window_start, window_end: load_user_transactions(user_data, window_start, window_end),
+            user_data.account_programs,
+            start_date,
+            end_date
+        )
+        if not backtest['monthly']:
+            return jsonify({
+                'error': 'no_transactions',
+                'message': 'Failed to retrieve transactions'
+            }), 404
+        
+        def rounded(entry):
+            return {k: round(v, 2) if isinstance(v, float) else v for k, v in entry.items()}
+        
+        return add_validators(jsonify({
+            'status': 'success',
+            'data': {
+                'start_date': start_date.isoformat(),
+                'end_date': end_date.isoformat(),
+                'monthly': [rounded(entry) for entry in backtest['monthly']],
+                'quarterly': [rounded(entry) for entry in backtest['quarterly']],
+                'totals': rounded(backtest['totals'])
+            }
+        }), etag)
+    except Exception as e:
+        logger.exception(f"Error running backtest: {str(e)}")
+        return jsonify({
+            'error': 'server_error',
+            'message': str(e)
+        }), 500
+
+@plaid_bp.route('/cards/best', methods=['GET'])
+@require_user_id
+def get_best_card(user_id=None):
+    """
+    Endpoint to pick the linked card to swipe for a purchase about to be made.
+    Query parameters: amount (dollars, required), merchant, category, channel and
+    date (YYYY-MM-DD, defaults to today).
+    Answers from the user's precomputed swipe state (linked programs and cap headroom),
+    so once that exists no Plaid or Supabase call is made for the request.
+    """
+    try:
+        try:
+            amount = float(request.args.get('amount', ''))
+            purchase_date = request.args.get('date')
+            if purchase_date:
+                datetime.strptime(purchase_date, '%Y-%m-%d')
+        except ValueError:
+            amount = None
+        if amount is None or not amount > 0 or amount == float('inf'):
+            return jsonify({
+                'error': 'invalid_purchase',
+                'message': 'amount must be a positive number of dollars and date must be YYYY-MM-DD'
+            }), 400
+        
+        purchase = {
+            'amount': amount,
+            'merchant_name': request.args.get('merchant') or None,
+            'category': request.args.get('category') or 'Other',
+            'payment_channel': request.args.get('channel', ''),
+            'date': purchase_date
+        }
+        
+        state = get_swipe_states().get(user_id, load_user_transactions)
+        options = recommend_card(state, purchase)
+        if not options:
+            return jsonify({
+                'error': 'no_cards',
+                'message': 'No linked card with a known rewards program'
+            }), 404
+        
+        for option in options:
+            option['expected_reward'] = round(option['expected_reward'], 2)
+        
+        return jsonify({
+            'status': 'success',
+            'data': {
+                'best_card': options[0],
+                'alternatives': options[1:],
+                'state_age_seconds': round(state.age, 1)
+            }
+        })
+    except Exception as e:
+        logger.exception(f"Error picking best card: {str(e)}")
+        return jsonify({
+            'error': 'server_error',
+            'message': str(e)
+        }), 500
+
+@plaid_bp.route('/cards/simulate', methods=['GET'])
+@require_user_id
+def simulate_cards(user_id=None):
+    """
+    Endpoint to rank every card in the catalog by how much it would add to the user's
+    rewards per year, replaying their history with their current cards plus that one,
+    all used optimally. Held cards are listed separately with what dropping them would lose.
+    Query parameters: days of history to replay (default 365, at most 1095).
+    """
+    try:
+        try:
+            days = int(request.args.get('days', DEFAULT_SIMULATION_DAYS))
+        except ValueError:
+            days = 0
+        if not 1 <= days <= MAX_SIMULATION_DAYS:
+            return jsonify({
+                'error': 'invalid_window',
+                'message': f'days must be between 1 and {MAX_SIMULATION_DAYS}'
+            }), 400
+        
+        user_data = get_user_data(user_id)
+        
+        today = datetime.now().date()
+        etag = make_etag(user_data, days, today)
+        cached = not_modified(etag)
+        if cached:
+            return cached
+        
+        frame = user_data.get_frame(today - timedelta(days=days), today)
+        if not len(frame):
+            return jsonify({
+                'error': 'no_transactions',
+                'message': 'Failed to retrieve transactions'
+            }), 404
+        
+        # Annualize over the history there is, not the window asked for
+        history_days = int((np.datetime64(today) - frame.dates.min()).astype(int)) + 1
+        simulation = simulate_catalog(frame, user_data.account_programs.values(), history_days)
+        
+        def rounded(entry):
+            return {**entry, 'annual_rewards': round(entry['annual_rewards'], 2), 'incremental_rewards': round(entry['incremental_rewards'], 2)}
+        
+        result = {
+            'status': 'success',
+            'data': {
+                'history_days': history_days,
+                'transaction_count': len(frame),
+                'current_annual_rewards': round(simulation.baseline, 2),
+                'held': [rounded(entry) for entry in simulation.held],
+                'candidates': [rounded(entry) for entry in simulation.candidates]
+            }
+        }
+        
+        return add_validators(jsonify(result), etag)
+    except Exception as e:
+        logger.exception(f"Error simulating card catalog: {str(e)}")
+        return jsonify({
+            'error': 'server_error',
+            'message': str(e)
+        }), 500
+
 @plaid_bp.route('/chat/completions', methods=['POST'])
 def chat_completions():
     """
@@ -0,0 +1,122 @@
+import os
+import time
+import random
+import logging
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.transactions.config import (
+    get_plaid_base_url,
+    get_plaid_http_pool_size,
+    get_plaid_timeouts,
+    get_plaid_max_retries,
+)
+
+logger = logging.getLogger('plaid.client')
+
+# Status codes worth retrying: rate limiting and transient server errors
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+RATE_LIMIT_ERROR_TYPE = 'RATE_LIMIT_EXCEEDED'
+
+# Base delay for exponential backoff, and the longest we ever wait between attempts
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 8
+
+class PlaidClient:
+    """
+    Thin Plaid API client sharing one pooled keep-alive session across all calls.
+    Adds the credentials to every payload, applies default timeouts and retries
+    rate-limited and 5xx responses with exponential backoff.
+    """
+
+    def __init__(self, client_id=None, secret=None, base_url=None, pool_size=None, timeout=None, max_retries=None):
+        self.client_id = client_id if client_id is not None else os.getenv('PLAID_CLIENT_ID')
+        self.secret = secret if secret is not None else os.getenv('PLAID_SECRET')
+        self.base_url = base_url or get_plaid_base_url()
+        self.timeout = timeout or get_plaid_timeouts()
+        self.max_retries = max_retries if max_retries is not None else get_plaid_max_retries()
+
+        pool_size = pool_size or get_plaid_http_pool_size()
+        self.session = requests.Session()
+        self.session.headers.update({'Content-Type': 'application/json'})
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    @property
+    def has_credentials(self):
+        """True if both the client ID and secret are configured."""
+        return bool(self.client_id and self.secret)
+
+    def post(self, path, payload=None, timeout=None):
+        """
+        POST to a Plaid endpoint with credentials added to the payload.
+
+        Args:
+            path: The endpoint path, e.g. '/transactions/get'
+            payload: The request body without credentials
+            timeout: Optional override of the default (connect, read) timeout
+
+        Returns:
+            The final requests.Response, which may still be an error response once
+            retries are exhausted; callers check status_code as before
+        """
+        body = {'client_id': self.client_id, 'secret': self.secret}
+        body.update(payload or {})
+        url = f"{self.base_url}{path}"
+
+        attempt = 0
+        while True:
+            try:
+                response = self.session.post(url, json=body, timeout=timeout or self.timeout)
+            except requests.ConnectionError as e:
+                # Connection failures never reached Plaid, so they are always safe to retry
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+                logger.warning(f"Connection error calling Plaid {path}, retrying in {delay:.2f}s: {str(e)}")
+            else:
+                if not self._should_retry(response) or attempt >= self.max_retries:
+                    return response
+                delay = self._backoff(attempt, response)
+                logger.warning(f"Plaid {path} returned {response.status_code}, retrying in {delay:.2f}s")
+
+            time.sleep(delay)
+            attempt += 1
+
+    @staticmethod
+    def _should_retry(response):
+        if response.status_code in RETRY_STATUS_CODES:
+            return True
+        if response.status_code >= 400:
+            try:
+                return response.json().get('error_type') == RATE_LIMIT_ERROR_TYPE
+            except ValueError:
+                return False
+        return False
+
+    @staticmethod
+    def _backoff(attempt, response=None):
+        """Exponential backoff with jitter, honouring Retry-After when Plaid sends it."""
+        if response is not None:
+            retry_after = response.headers.get('Retry-After')
+            if retry_after:
+                try:
+                    return min(float(retry_after), BACKOFF_MAX_SECONDS)
+                except ValueError:
+                    pass
+        delay = min(BACKOFF_BASE_SECONDS * (2 ** attempt), BACKOFF_MAX_SECONDS)
+        return delay * random.uniform(0.5, 1.0)
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_plaid_client():
+    """Get the process-wide PlaidClient, creating it on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = PlaidClient()
+    return _client
@@ -0,0 +1,52 @@
+import threading
+
+from app.transactions.cache import TTLCache
+from app.transactions.config import get_reward_rate_cache_size
+
+class RateCache:
+    """
+    Process-wide LRU of the uncapped part of rewards: for a transaction's
+    (merchant_name, category, payment_channel), the rule and rate under every program.
+    Cap usage never enters an entry, so entries are shared freely across users, requests
+    and threads. Entries are keyed by the fingerprint of the program definitions that
+    produced them; once definitions change, lookups use the new fingerprint and the old
+    entries are never hit again and age out.
+    """
+
+    def __init__(self, maxsize):
+        self._entries = TTLCache(maxsize=maxsize)
+
+    def get(self, fingerprint, key, compute):
+        """
+        Get the entry for key under the programs identified by fingerprint.
+
+        Args:
+            fingerprint: program_fingerprint of the programs being evaluated
+            key: (merchant_name, category, payment_channel)
+            compute: Callable returning the (rules, rates) entry on a miss
+        """
+        entry_key = (fingerprint,) + key
+        entry = self._entries.get(entry_key)
+        if entry is None:
+            entry = compute()
+            self._entries.set(entry_key, entry)
+        return entry
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        """Get the entry count and hit/miss counters."""
+        return self._entries.stats()
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_rate_cache():
+    """Get the process-wide reward rate cache, creating it on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = RateCache(maxsize=get_reward_rate_cache_size())
+    return _cache
@@ -0,0 +1,72 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app.transactions.config import get_plaid_max_concurrency
+from app.transactions.repository import get_item_by_plaid_item_id
+from app.transactions.sync import sync_item
+from app.transactions.routing import get_swipe_states
+
+logger = logging.getLogger('plaid.refresh')
+
+class RefreshQueue:
+    """
+    Background worker pool that re-syncs items outside the request path.
+    An item that is already queued is not queued twice; once its refresh starts,
+    a new request queues another run so updates arriving mid-sync are not lost.
+    """
+
+    def __init__(self, max_workers=None):
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or get_plaid_max_concurrency(),
+            thread_name_prefix='plaid-refresh'
+        )
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def enqueue(self, item_id, reason=''):
+        """
+        Queue a refresh for a Plaid item_id.
+
+        Returns:
+            The Future of the refresh, or None if one was already queued
+        """
+        with self._lock:
+            if item_id in self._pending:
+                logger.info(f"Refresh for item {item_id} already queued")
+                return None
+            self._pending.add(item_id)
+
+        logger.info(f"Queued refresh for item {item_id} ({reason})")
+        return self._executor.submit(self._refresh, item_id)
+
+    def _refresh(self, item_id):
+        with self._lock:
+            self._pending.discard(item_id)
+
+        try:
+            item = get_item_by_plaid_item_id(item_id)
+            if not item:
+                logger.warning(f"Ignoring refresh for unknown item {item_id}")
+                return False
+
+            changed = sync_item(item, force=True)
+            if changed:
+                get_swipe_states().invalidate(item['user_id'])
+            logger.info(f"Refreshed item {item_id} ({'changed' if changed else 'no changes'})")
+            return changed
+        except Exception as e:
+            logger.exception(f"Error refreshing item {item_id}: {str(e)}")
+            return False
+
+_queue = None
+_queue_lock = threading.Lock()
+
+def get_refresh_queue():
+    """Get the process-wide refresh queue, starting it on first use."""
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = RefreshQueue()
+    return _queue
@@ -0,0 +1,101 @@
+import logging
+
+from app import supabase
+
+logger = logging.getLogger('plaid.repository')
+
+# Only select the columns the handlers actually read
+ITEM_COLUMNS = 'id,item_id,institution_id,institution_name'
+ACCOUNT_COLUMNS = 'account_id,plaid_item_id,name,mask,type,subtype,rewards_program'
+
+def get_user_items(user_id, include_access_token=False):
+    """
+    Get a user's plaid_items rows.
+
+    Args:
+        user_id: The user whose items are loaded
+        include_access_token: Also select access_token; only code that calls Plaid needs it
+    """
+    columns = ITEM_COLUMNS + ',access_token' if include_access_token else ITEM_COLUMNS
+    response = supabase.table('plaid_items').select(columns).eq('user_id', user_id).execute()
+    return response.data or []
+
+def get_accounts_for_items(item_ids):
+    """
+    Get the plaid_accounts rows for several items in a single query.
+
+    Returns:
+        A dict mapping each plaid_items.id to its accounts, in the order Supabase returned them
+    """
+    accounts_by_item = {item_id: [] for item_id in item_ids}
+    if not item_ids:
+        return accounts_by_item
+
+    response = supabase.table('plaid_accounts').select(ACCOUNT_COLUMNS).in_('plaid_item_id', list(item_ids)).execute()
+    for account in response.data or []:
+        accounts_by_item.setdefault(account['plaid_item_id'], []).append(account)
+    return accounts_by_item
+
+def get_user_accounts(user_id):
+    """
+    Get every linked account for a user with its institution name, in two queries
+    regardless of how many institutions are linked.
+
+    Returns:
+        plaid_accounts rows with an added institution_name, grouped in item order
+    """
+    items = get_user_items(user_id)
+    accounts_by_item = get_accounts_for_items([item['id'] for item in items])
+
+    accounts = []
+    for item in items:
+        institution_name = item.get('institution_name', 'Financial Institution')
+        for account in accounts_by_item.get(item['id'], []):
+            accounts.append({**account, 'institution_name': institution_name})
+    return accounts
+
+def set_account_rewards_program(account_id, program_name):
+    """
+    Store the rewards program of a linked account.
+
+    Returns:
+        The updated plaid_accounts row, or None if the account does not exist
+    """
+    updated = supabase.table('plaid_accounts').update({'rewards_program': program_name}).eq('account_id', account_id).execute()
+    return updated.data[0] if updated.data else None
+
+def delete_account(account_id):
+    """
+    Delete a linked account, and its plaid_items row once the item has no accounts left.
+
+    Returns:
+        None if the account did not exist, otherwise a dict with the account's
+        plaid_item_id and whether the item itself was deleted
+    """
+    # The delete returns the removed rows, so no lookup is needed beforehand
+    deleted = supabase.table('plaid_accounts').delete().eq('account_id', account_id).execute()
+    if not deleted.data:
+        return None
+
+    plaid_item_id = deleted.data[0]['plaid_item_id']
+
+    # Only the count of remaining accounts is needed, not the rows themselves
+    remaining = supabase.table('plaid_accounts').select('account_id', count='exact', head=True).eq('plaid_item_id', plaid_item_id).execute()
+
+    item_deleted = not remaining.count
+    if item_deleted:
+        supabase.table('plaid_items').delete().eq('id', plaid_item_id).execute()
+        logger.info(f"Deleted plaid item {plaid_item_id} as it had no more accounts")
+
+    return {'plaid_item_id': plaid_item_id, 'item_deleted': item_deleted}
+
+def get_item_by_plaid_item_id(item_id):
+    """
+    Get the plaid_items row for a Plaid item_id, including its access_token.
+    Used by background jobs that start from a webhook rather than a user.
+
+    Returns:
+        The row, or None if the item is not linked
+    """
+    response = supabase.table('plaid_items').select(ITEM_COLUMNS + ',user_id,access_token').eq('item_id', item_id).limit(1).execute()
+    return response.data[0] if response.data else None
@@ -0,0 +1,123 @@
+import json
+import time
+import random
+import logging
+import threading
+from contextlib import contextmanager
+from flask import g, request, has_request_context
+
+from app.transactions.config import get_debug_sample_percent, get_debug_sample_rows
+
+logger = logging.getLogger('plaid.request')
+
+class LazyJson:
+    """Defers json.dumps of a log argument until a handler actually formats the record."""
+
+    def __init__(self, value, indent=2):
+        self.value = value
+        self.indent = indent
+
+    def __str__(self):
+        return json.dumps(self.value, indent=self.indent, default=str)
+
+class RequestLog:
+    """
+    Counts, timings and sampled row-level debug output for one request.
+    Row-level debug lines are only formatted for a sampled fraction of requests, and then
+    only for the first few rows of each batch; everything else is folded into a single
+    summary line when the request ends. Safe to share with worker threads.
+    """
+
+    def __init__(self, label=None, row_logger=None):
+        """
+        Args:
+            label: Shown in the summary line, e.g. "GET /api/transactions"; None for a
+                detached log whose summary is never written
+            row_logger: Logger that sampled row-level debug lines go to
+        """
+        self.label = label
+        self.status = None
+        self.row_logger = row_logger or logging.getLogger('plaid')
+        self.sample_rows = get_debug_sample_rows()
+        # Decide once per request, so a sampled request logs its rows consistently
+        self.sampled = (
+            self.row_logger.isEnabledFor(logging.DEBUG)
+            and random.random() * 100 < get_debug_sample_percent()
+        )
+        self._started = time.perf_counter()
+        self._counts = {}
+        self._timings = {}
+        self._lock = threading.Lock()
+
+    def count(self, name, amount=1):
+        """Add to a named counter shown in the summary line."""
+        with self._lock:
+            self._counts[name] = self._counts.get(name, 0) + amount
+
+    @contextmanager
+    def timed(self, phase):
+        """Add the time spent in the block to a named phase. Phases run on several threads add up."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._timings[phase] = self._timings.get(phase, 0.0) + elapsed
+
+    def debug_row(self, index, message, *args):
+        """
+        Log a row-level debug line if this request is sampled and the row is among the
+        first sample_rows of its batch. Arguments are only formatted if it is logged.
+        """
+        if self.sampled and index < self.sample_rows:
+            self.row_logger.debug(message, *args)
+
+    def summary(self):
+        """Write the one-line summary of this request."""
+        if self.label is None:
+            return
+
+        elapsed_ms = (time.perf_counter() - self._started) * 1000
+        with self._lock:
+            counts = ' '.join(f"{name}={value}" for name, value in self._counts.items())
+            timings = ' '.join(f"{phase}={seconds * 1000:.1f}ms" for phase, seconds in self._timings.items())
+
+        parts = [f"{self.label} {self.status or '-'} in {elapsed_ms:.1f}ms"]
+        if counts:
+            parts.append(counts)
+        if timings:
+            parts.append(timings)
+        logger.info(' | '.join(parts))
+
+def get_request_log():
+    """
+    Get the RequestLog of the current request, creating it on first use.
+    Outside a request (background refreshes, scripts) a detached log is returned.
+    Worker threads can't see the request, so it must be fetched first and passed along.
+    """
+    if not has_request_context():
+        return RequestLog()
+
+    request_log = g.get('request_log')
+    if request_log is None:
+        request_log = RequestLog(f"{request.method} {request.path}")
+        g.request_log = request_log
+    return request_log
+
+def start_request_log():
+    """before_request hook: start timing the request."""
+    get_request_log()
+
+def record_request_status(response):
+    """after_request hook: remember the status for the summary line."""
+    request_log = g.get('request_log')
+    if request_log is not None:
+        request_log.status = response.status_code
+    return response
+
+def write_request_summary(exception=None):
+    """teardown_request hook: write the summary once the response, including any stream, is done."""
+    request_log = g.pop('request_log', None)
+    if request_log is not None:
+        request_log.summary()
@@ -1,206 +1,344 @@
+import hashlib
+
+import numpy as np
+
+from app.transactions.cache import TTLCache
+from app.transactions.caps import CapLedger, period_of
+from app.transactions.catalog import CompiledCatalog, read_catalog
+from app.transactions.config import get_rewards_catalog_path
+from app.transactions.rates import get_rate_cache
+from app.transactions.matcher import RuleMatcher
+from app.transactions.frame import TransactionFrame
+
 # Rewards Program Interface
 class RewardsProgram:
+    # Rules whose reward depends on spending so far; only these go through the cap pass
+    capped_rules = ()
+    # Calendar period the caps reset on, 'quarter' or 'year'
+    cap_period = 'quarter'
+
     def __init__(self, name, rules):
         self.name = name
         self.rules = rules
+        self._matcher = None
+
+    def match_rules(self):
+        """
+        Substring rules this program's classify checks, as
+        (rule, field, patterns, case_sensitive) tuples. See build_rule_matcher.
+        """
+        return []
+
+    def match(self, transaction):
+        """Get the (program, rule) hits of this program's rules alone for a transaction."""
+        if self._matcher is None:
+            self._matcher = build_rule_matcher([self])
+        return self._matcher.match(transaction)
 
-    def calculate_rewards(self, transaction):
-        raise NotImplementedError("Subclasses must implement calculate_rewards")
+    def classify(self, transaction, hits):
+        """
+        Get the key of self.rules that applies to a transaction, ignoring caps.
+        Only merchant_name, category and payment_channel may be read, so the batch
+        path can classify each distinct combination of them once.
+        """
+        raise NotImplementedError("Subclasses must implement classify")
 
-class AppleCardRewards(RewardsProgram):
-    def __init__(self):
-        super().__init__("Apple Card", {
-            "select_merchants": 0.03,  # 3% on select merchants
-            "apple_pay": 0.02,        # 2% on Apple Pay
-            "other": 0.01             # 1% on all other purchases
-        })
-        self.select_merchants = ["Apple", "Nike", "Lyft"]
+    def cap_terms(self, rule):
+        """
+        How one of capped_rules is limited, as (limit, overflow_rule, partial): up to
+        limit of spending per cap_period earns the rule's rate and the rest earns
+        overflow_rule's. With partial, a transaction crossing the limit is split;
+        otherwise it earns the overflow rate in full.
+        """
+        raise NotImplementedError("Programs with capped_rules must implement cap_terms")
 
-    def calculate_rewards(self, transaction):
+    def capped_reward(self, amount, rule, ledger, user_id, period):
+        """
+        Reward for amount under one of capped_rules, reserving its spending in the
+        ledger under (user_id, self.name, rule, period) on the terms of cap_terms.
+        Programs hold no usage of their own, so one instance can be shared by any
+        number of threads.
+        """
+        limit, overflow_rule, partial = self.cap_terms(rule)
+        reserved = ledger.reserve(user_id, self.name, rule, period, amount, limit, partial=partial)
+        if partial:
+            # Split the transaction if it crosses the limit
+            return reserved * self.rules[rule] + (amount - reserved) * self.rules[overflow_rule]
+        if reserved:
+            return amount * self.rules[rule]
+        return amount * self.rules[overflow_rule]
+
+    def definition(self):
+        """Everything classification depends on; see program_fingerprint."""
+        return (type(self).__qualname__, self.name, sorted(self.rules.items()), self.match_rules())
+
+    def calculate_rewards(self, transaction, hits=None, ledger=None, user_id=None):
+        """
+        Args:
+            transaction: A normalized transaction
+            hits: Rule hits from a shared matcher, e.g. REWARDS_MATCHER.match(transaction);
+                computed for this program alone when omitted
+            ledger: CapLedger to count capped spending in; when omitted the transaction
+                is priced against untouched caps and nothing is recorded
+            user_id: Whose caps the spending counts against in ledger
+        """
         amount = abs(transaction['amount'])
-        merchant_name = transaction.get('merchant_name', '') or ''
+        if hits is None:
+            hits = self.match(transaction)
+
+        rule = self.classify(transaction, hits)
+        if rule in self.capped_rules:
+            if ledger is None:
+                ledger = CapLedger()
+            period = period_of(transaction['date'], self.cap_period)
+            return self.capped_reward(amount, rule, ledger, user_id, period)
+        return amount * self.rules[rule]
+
+class CatalogProgram(RewardsProgram):
+    """
+    A rewards program defined as data in the rewards catalog rather than as code; see
+    catalog.parse_program for the definition format.
+    """
+
+    def __init__(self, definition):
+        """
+        Args:
+            definition: A program from catalog.read_catalog or catalog.parse_program
+        """
+        super().__init__(definition['name'], dict(definition['rates']))
+        self.match_order = definition['rules']
+        self.default = definition['default']
+        self.caps = definition['caps']
+        self.capped_rules = tuple(self.caps)
+        self.cap_period = definition['cap_period']
+
+    def match_rules(self):
+        # One matcher rule per substring condition, named after its position and field
+        return [
+            (f"{i}:{field}", field, patterns, case_sensitive)
+            for i, (rule, conditions) in enumerate(self.match_order)
+            for field, patterns, case_sensitive in conditions
+            if field != 'payment_channel'
+        ]
+
+    def classify(self, transaction, hits):
         payment_channel = transaction.get('payment_channel', '')
-        
-        # Check if transaction is with select merchants (3%)
-        if any(merchant.lower() in merchant_name.lower() for merchant in self.select_merchants):
-            return amount * self.rules["select_merchants"]
-        
-        # Check if payment made with Apple Pay (2%)
-        # Note: This is simplified as Plaid may not provide this information directly
-        elif payment_channel == "apple_pay":
-            return amount * self.rules["apple_pay"]
-        
-        # Default reward rate (1%)
-        return amount * self.rules["other"]
-
-class BankOfAmericaCashRewards(RewardsProgram):
-    def __init__(self):
-        super().__init__("Bank of America Cash Rewards", {
-            "all_purchases": 0.015  # 1.5% on all purchases
-        })
-
-    def calculate_rewards(self, transaction):
-        amount = abs(transaction['amount'])
-        return amount * self.rules["all_purchases"]
-
-class BankOfAmericaCustomizedCashRewards(RewardsProgram):
-    def __init__(self):
-        super().__init__("Bank of America Customized Cash Rewards", {
-            "category_choice": 0.03,  # 3% on category of choice
-            "grocery_wholesale": 0.02,  # 2% on grocery and wholesale
-            "other": 0.01  # 1% on other purchases
-        })
-        self.quarterly_spend = 0
-        self.quarterly_limit = 2500
-
-    def calculate_rewards(self, transaction):
-        amount = abs(transaction['amount'])
-        # Simplified version - would need to check categories and track quarterly spend
-        if self.quarterly_spend + amount <= self.quarterly_limit:
-            self.quarterly_spend += amount
-            return amount * self.rules["category_choice"]
-        return amount * self.rules["other"]
-
-class DiscoverItStudentCashBack(RewardsProgram):
-    def __init__(self):
-        super().__init__("Discover It Student Cash Back", {
-            "quarterly_category": 0.05,  # 5% on quarterly categories
-            "other": 0.01  # 1% on other purchases
-        })
-        self.quarterly_spend = 0
-        self.quarterly_limit = 1500
-        self.quarterly_cashback_limit = 75
-        self.current_quarter_category = "Grocery Stores and Wholesale Clubs"  # April-June 2025
-
-    def calculate_rewards(self, transaction):
-        amount = abs(transaction['amount'])
-        # Simplified version - would need to check categories and track quarterly spend
-        if self.quarterly_spend + amount <= self.quarterly_limit:
-            self.quarterly_spend += amount
-            rewards = amount * self.rules["quarterly_category"]
-            if rewards > self.quarterly_cashback_limit:
-                rewards = self.quarterly_cashback_limit
-            return rewards
-        return amount * self.rules["other"]
-
-class ChaseSapphirePreferred(RewardsProgram):
-    def __init__(self):
-        super().__init__("Chase Sapphire Preferred", {
-            "dining": 0.03,           # 3x points on dining
-            "online_grocery": 0.03,   # 3x points on online grocery
-            "streaming": 0.03,        # 3x points on select streaming services
-            "travel": 0.05,           # 5x points on travel purchased through Chase
-            "other_travel": 0.02,     # 2x points on other travel purchases
-            "other": 0.01             # 1x points on other purchases
-        })
-        self.dining_categories = ["Food and Drink", "Restaurants", "Fast Food"]
-        self.streaming_services = ["Netflix", "Spotify", "Disney+", "HBO", "Hulu", "Amazon Prime"]
-        self.travel_merchants = ["Chase Travel", "Chase Ultimate Rewards"]
-
-    def calculate_rewards(self, transaction):
-        amount = abs(transaction['amount'])
-        category = transaction.get('category', '')
-        merchant_name = transaction.get('merchant_name', '') or ''
-        
-        # Check if transaction is travel through Chase (5x)
-        if any(merchant.lower() in merchant_name.lower() for merchant in self.travel_merchants):
-            return amount * self.rules["travel"]
-        
-        # Check if transaction is dining (3x)
-        elif any(cat.lower() in category.lower() for cat in self.dining_categories):
-            return amount * self.rules["dining"]
-        
-        # Check if transaction is for streaming services (3x)
-        elif any(service.lower() in merchant_name.lower() for service in self.streaming_services):
-            return amount * self.rules["streaming"]
-        
-        # Check if transaction is online grocery (3x)
-        elif "Groceries" in category and "online" in merchant_name.lower():
-            return amount * self.rules["online_grocery"]
-        
-        # Check if transaction is other travel (2x)
-        elif "Travel" in category or "Airlines" in category or "Hotel" in category:
-            return amount * self.rules["other_travel"]
-        
-        # Default reward rate (1x)
-        return amount * self.rules["other"]
-
-class AmexGoldCard(RewardsProgram):
-    def __init__(self):
-        super().__init__("American Express Gold Card", {
-            "restaurants": 0.04,      # 4x points at restaurants worldwide
-            "supermarkets": 0.04,     # 4x points at U.S. supermarkets (up to $25,000 per year)
-            "travel": 0.03,           # 3x points on flights booked directly with airlines or on amextravel.com
-            "other": 0.01             # 1x points on other purchases
-        })
-        self.restaurant_categories = ["Food and Drink", "Restaurants", "Fast Food"]
-        self.supermarket_categories = ["Groceries", "Supermarkets"]
-        self.travel_categories = ["Airlines", "Travel", "Air Travel"]
-        self.travel_merchants = ["Amex Travel"]
-        self.yearly_supermarket_spend = 0
-        self.supermarket_limit = 25000
-
-    def calculate_rewards(self, transaction):
-        amount = abs(transaction['amount'])
-        category = transaction.get('category', '')
-        merchant_name = transaction.get('merchant_name', '') or ''
-        
-        # Check if transaction is at a restaurant (4x)
-        if any(cat.lower() in category.lower() for cat in self.restaurant_categories):
-            return amount * self.rules["restaurants"]
-        
-        # Check if transaction is at a supermarket (4x up to limit)
-        elif any(cat.lower() in category.lower() for cat in self.supermarket_categories):
-            # Check if we're still under the annual limit
-            if self.yearly_supermarket_spend + amount <= self.supermarket_limit:
-                self.yearly_supermarket_spend += amount
-                return amount * self.rules["supermarkets"]
-            else:
-                # Split the transaction if it crosses the limit
-                remaining_limit = self.supermarket_limit - self.yearly_supermarket_spend
-                if remaining_limit > 0:
-                    over_limit_amount = amount - remaining_limit
-                    self.yearly_supermarket_spend = self.supermarket_limit
-                    return (remaining_limit * self.rules["supermarkets"]) + (over_limit_amount * self.rules["other"])
-                else:
-                    return amount * self.rules["other"]
-        
-        # Check if transaction is travel (3x)
-        elif any(cat.lower() in category.lower() for cat in self.travel_categories) or \
-             any(merchant.lower() in merchant_name.lower() for merchant in self.travel_merchants):
-            return amount * self.rules["travel"]
-        
-        # Default reward rate (1x)
-        return amount * self.rules["other"]
-
-class WellsFargoActiveCash(RewardsProgram):
-    def __init__(self):
-        super().__init__("Wells Fargo Active Cash", {
-            "all_purchases": 0.02     # 2% cash rewards on purchases
-        })
-
-    def calculate_rewards(self, transaction):
-        amount = abs(transaction['amount'])
-        return amount * self.rules["all_purchases"]
+        for i, (rule, conditions) in enumerate(self.match_order):
+            if all(
+                payment_channel in patterns if field == 'payment_channel' else (self.name, f"{i}:{field}") in hits
+                for field, patterns, _ in conditions
+            ):
+                return rule
+        return self.default
 
-class CitiDoubleCash(RewardsProgram):
-    def __init__(self):
-        super().__init__("Citi Double Cash", {
-            "all_purchases": 0.02     # 1% when you buy + 1% when you pay = 2% cash back on all purchases
-        })
+    def cap_terms(self, rule):
+        return self.caps[rule]
 
-    def calculate_rewards(self, transaction):
-        amount = abs(transaction['amount'])
-        return amount * self.rules["all_purchases"]
+    def definition(self):
+        return (
+            type(self).__qualname__, self.name, sorted(self.rules.items()), self.match_order,
+            self.default, sorted(self.caps.items()), self.cap_period
+        )
+
+def build_rule_matcher(programs):
+    """Compile the match_rules of several programs into one RuleMatcher."""
+    matcher = RuleMatcher()
+    for program in programs:
+        for rule, field, patterns, case_sensitive in program.match_rules():
+            matcher.add_rule(program.name, rule, field, patterns, case_sensitive)
+    return matcher.build()
+
+def program_fingerprint(programs):
+    """
+    Digest of the program definitions classification depends on: each program's class,
+    name, rates and rules (see RewardsProgram.definition). Changing any of them gives a
+    new fingerprint.
+    """
+    digest = hashlib.sha256()
+    for program in programs:
+        digest.update(repr(program.definition()).encode())
+    return digest.hexdigest()
+
+# Compiled classifiers of recently used program lists, by fingerprint
+_classifiers = TTLCache(maxsize=16)
 
-# Map of account names to rewards programs
+def get_classifier(programs, fingerprint):
+    """
+    Get a callable classifying a transaction's merchant_name, category and payment_channel
+    under every program at once, returning (rules, rates) with one entry per program.
+    Catalog programs share a CompiledCatalog built once per fingerprint; any other
+    program is evaluated through its own classify.
+    """
+    classifier = _classifiers.get(fingerprint)
+    if classifier is None:
+        if all(isinstance(program, CatalogProgram) for program in programs):
+            classifier = CompiledCatalog(programs).classify
+        else:
+            matcher = build_rule_matcher(programs)
+
+            def classifier(transaction):
+                hits = matcher.match(transaction)
+                rules = tuple(program.classify(transaction, hits) for program in programs)
+                return rules, tuple(program.rules[rule] for program, rule in zip(programs, rules))
+        _classifiers.set(fingerprint, classifier)
+    return classifier
+
+def classify_frame(frame, programs=None):
+    """
+    Classify every row of a TransactionFrame under every program, ignoring caps.
+    Rules are classified once per distinct (merchant_name, category, payment_channel)
+    and shared by the rows with that signature. Each signature is looked up in the
+    process-wide rate cache first, so merchants seen in earlier requests skip rule
+    matching altogether.
+
+    Args:
+        frame: A TransactionFrame
+        programs: Programs to evaluate, in column order; defaults to REWARDS_PROGRAMS
+
+    Returns:
+        A tuple of (programs, rules, rates, signature_rows): rules[s][j] is the rule key
+        of signature s under programs[j], rates[s, j] its rate, and signature_rows maps
+        each row of the frame to its signature
+    """
+    programs = list(REWARDS_PROGRAMS.values()) if programs is None else list(programs)
+    fingerprint = REWARDS_FINGERPRINT if programs == REWARDS_LIST else program_fingerprint(programs)
+    rate_cache = get_rate_cache()
+
+    # One signature per distinct combination of the fields classify may read
+    signatures = (
+        frame.merchant_codes.astype(np.int64) * len(frame.categories) + frame.category_codes
+    ) * len(frame.channels) + frame.channel_codes
+    unique_signatures, signature_rows = np.unique(signatures, return_inverse=True)
+    signature_rows = signature_rows.reshape(-1)
+
+    rules = []
+    rates = np.empty((len(unique_signatures), len(programs)))
+    for s, signature in enumerate(unique_signatures.tolist()):
+        signature, channel_code = divmod(signature, len(frame.channels))
+        merchant_code, category_code = divmod(signature, len(frame.categories))
+        transaction = {
+            'merchant_name': frame.merchants[merchant_code],
+            'category': frame.categories[category_code],
+            'payment_channel': frame.channels[channel_code],
+        }
+        key = (transaction['merchant_name'], transaction['category'], transaction['payment_channel'])
+        signature_rules, signature_rates = rate_cache.get(
+            fingerprint, key, lambda: get_classifier(programs, fingerprint)(transaction)
+        )
+        rules.append(signature_rules)
+        rates[s] = signature_rates
+
+    return programs, rules, rates, signature_rows
+
+def select_programs(classification, columns):
+    """
+    Narrow classify_frame output to some of its programs without classifying again.
+
+    Args:
+        classification: A (programs, rules, rates, signature_rows) tuple from classify_frame
+        columns: Indexes of the programs to keep, in the order wanted
+    """
+    programs, rules, rates, signature_rows = classification
+    columns = list(columns)
+    return (
+        [programs[j] for j in columns],
+        [tuple(signature_rules[j] for j in columns) for signature_rules in rules],
+        rates[:, columns],
+        signature_rows
+    )
+
+def lookup_rates(transaction, programs=None):
+    """
+    Rule and rate of a single transaction under every program, ignoring caps, through
+    the same rate cache as classify_frame.
+
+    Returns:
+        A tuple of (programs, rules, rates) with one rule key and rate per program
+    """
+    programs = list(REWARDS_PROGRAMS.values()) if programs is None else list(programs)
+    fingerprint = REWARDS_FINGERPRINT if programs == REWARDS_LIST else program_fingerprint(programs)
+    # Same defaults TransactionFrame uses for missing fields
+    key = (transaction.get('merchant_name'), transaction.get('category', 'Other'), transaction.get('payment_channel', ''))
+    fields = {'merchant_name': key[0], 'category': key[1], 'payment_channel': key[2]}
+
+    rules, rates = get_rate_cache().get(fingerprint, key, lambda: get_classifier(programs, fingerprint)(fields))
+    return programs, rules, rates
+
+def calculate_rewards_batch(transactions, programs=None, ledger=None, user_id=None):
+    """
+    Rewards of every transaction under every program, as a dense matrix.
+    Uncapped rates come from classify_frame and are broadcast to every row; a second
+    pass then walks only the rows that hit a capped rule, oldest first, reserving their
+    spending in each program's caps for the calendar period of the transaction.
+
+    Args:
+        transactions: A TransactionFrame, or normalized transactions to build one from
+        programs: Programs to evaluate, in column order; defaults to REWARDS_PROGRAMS
+        ledger: CapLedger to count capped spending in; a fresh one when omitted, so
+            evaluating a batch leaves no trace
+        user_id: Whose caps the spending counts against in ledger
+
+    Returns:
+        A float64 array of shape (len(transactions), len(programs))
+    """
+    frame = transactions if isinstance(transactions, TransactionFrame) else TransactionFrame.from_transactions(transactions)
+    programs = list(REWARDS_PROGRAMS.values()) if programs is None else list(programs)
+    if not len(frame) or not programs:
+        return np.zeros((len(frame), len(programs)))
+
+    programs, signature_rules, rates, signature_rows = classify_frame(frame, programs)
+    amounts = np.abs(frame.amount_cents) / 100
+    rewards = amounts[:, None] * rates[signature_rows]
+
+    # Cap pass: spending-dependent rules, row by row in date order
+    if ledger is None:
+        ledger = CapLedger()
+    chronological = np.argsort(frame.dates, kind='stable')
+    for j, program in enumerate(programs):
+        if not program.capped_rules:
+            continue
+        capped_signatures = np.array([rules[j] in program.capped_rules for rules in signature_rules])
+        rows = chronological[capped_signatures[signature_rows[chronological]]]
+        days = np.datetime_as_string(frame.dates[rows]).tolist()
+        for i, day in zip(rows.tolist(), days):
+            rule = signature_rules[signature_rows[i]][j]
+            period = period_of(day, program.cap_period)
+            rewards[i, j] = program.capped_reward(float(amounts[i]), rule, ledger, user_id, period)
+
+    return rewards
+
+# Map of program names to rewards programs, from the rewards catalog
 REWARDS_PROGRAMS = {
-    "Apple Card": AppleCardRewards(),
-    "Bank of America Cash Rewards": BankOfAmericaCashRewards(),
-    "Bank of America Customized Cash Rewards": BankOfAmericaCustomizedCashRewards(),
-    "Discover It Student Cash Back": DiscoverItStudentCashBack(),
-    "Chase Sapphire Preferred": ChaseSapphirePreferred(),
-    "American Express Gold Card": AmexGoldCard(),
-    "Wells Fargo Active Cash": WellsFargoActiveCash(),
-    "Citi Double Cash": CitiDoubleCash()
+    definition['name']: CatalogProgram(definition) for definition in read_catalog(get_rewards_catalog_path())
 }
+
+# The default program list and its fingerprint, so default lookups skip hashing
+REWARDS_LIST = list(REWARDS_PROGRAMS.values())
+REWARDS_FINGERPRINT = program_fingerprint(REWARDS_LIST)
+
+# Name fragments of card issuers, checked in order against a linked account's
+# institution and account names
+ISSUER_PROGRAMS = (
+    (("bank of america",), "Bank of America Cash Rewards"),
+    (("chase",), "Chase Sapphire Preferred"),
+    (("american express", "amex"), "American Express Gold Card"),
+    (("wells fargo",), "Wells Fargo Active Cash"),
+    (("citibank", "citi"), "Citi Double Cash"),
+)
+
+def resolve_rewards_program(institution_name, account_name):
+    """
+    Guess the rewards program of a linked account from its names. The issuer fragments
+    win; otherwise the first program whose full name appears in either name.
+
+    Returns:
+        A REWARDS_PROGRAMS key, or None when nothing matches
+    """
+    names = [(institution_name or '').lower(), (account_name or '').lower()]
+    for fragments, program_name in ISSUER_PROGRAMS:
+        if any(fragment in name for fragment in fragments for name in names):
+            return program_name
+    for program_name in REWARDS_PROGRAMS:
+        if any(program_name.lower() in name for name in names):
+            return program_name
+    return None
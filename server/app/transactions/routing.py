@@ -0,0 +1,207 @@
+import time
+import logging
+import threading
+from datetime import date
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from app.transactions.cache import TTLCache
+from app.transactions.caps import CapLedger, period_of
+from app.transactions.config import get_swipe_state_cache_size, get_swipe_state_ttl
+from app.transactions.context import UserDataContext
+from app.transactions.optimizer import price_assignment
+from app.transactions.rewards import REWARDS_PROGRAMS, lookup_rates
+
+logger = logging.getLogger('plaid.routing')
+
+class SwipeState:
+    """
+    Everything needed to pick a card for one user without leaving the process: the
+    linked cards with their rewards programs, and a CapLedger holding this year's
+    spending on each card, so the headroom left in every current cap period is known.
+    """
+
+    def __init__(self, user_id, cards, ledger, built_at):
+        """
+        Args:
+            user_id: The user the state belongs to
+            cards: Dicts with account_id, account_name, institution_name and program
+            ledger: CapLedger with the user's spending so far this year
+            built_at: time.time() when the state was built
+        """
+        self.user_id = user_id
+        self.cards = cards
+        self.ledger = ledger
+        self.built_at = built_at
+
+    @property
+    def age(self):
+        return time.time() - self.built_at
+
+def build_swipe_state(user_id, transactions_loader, today=None):
+    """
+    Load a user's linked cards and replay this year's transactions into a fresh
+    CapLedger, each card's caps counting only its own transactions.
+
+    Args:
+        user_id: The user to build the state for
+        transactions_loader: Callable (context, start_date, end_date) -> normalized transactions
+        today: The current date; defaults to today
+    """
+    started = time.perf_counter()
+    context = UserDataContext(user_id, transactions_loader)
+    today = today or date.today()
+
+    cards = []
+    for account_id, program in context.account_programs.items():
+        account = context.account_map[account_id]
+        cards.append({
+            'account_id': account_id,
+            'account_name': account['name'],
+            'institution_name': account['institution_name'],
+            'program': program
+        })
+
+    # The longest cap period is a calendar year, so nothing before January 1 counts
+    ledger = CapLedger()
+    if cards:
+        frame = context.get_frame(today.replace(month=1, day=1), today)
+        program_names = list(REWARDS_PROGRAMS)
+        account_columns = np.array([
+            program_names.index(context.account_programs[account_id].name) if account_id in context.account_programs else -1
+            for account_id in frame.account_ids
+        ], dtype=np.int64)
+        columns = account_columns[frame.account_codes] if len(frame) else np.zeros(0, dtype=np.int64)
+        price_assignment(frame, columns, ledger=ledger, user_id=user_id)
+
+    logger.info(f"Built swipe state for user {user_id}: {len(cards)} cards in {(time.perf_counter() - started) * 1000:.1f}ms")
+    return SwipeState(user_id, cards, ledger, time.time())
+
+def recommend_card(state, purchase):
+    """
+    Rank a user's linked cards for a prospective purchase by expected reward.
+    Capped rules are quoted against the headroom left in the purchase date's period
+    without using any of it up.
+
+    Args:
+        state: The user's SwipeState
+        purchase: Dict with amount (dollars spent, positive) and optionally merchant_name,
+            category, payment_channel and date ('YYYY-MM-DD', defaults to today)
+
+    Returns:
+        A list of dicts, best card first, each with account_id, account_name,
+        institution_name, rewards_program, rule, rate, expected_reward and, for capped
+        rules, cap_headroom
+    """
+    amount = purchase['amount']
+    day = purchase.get('date') or date.today().isoformat()
+    programs, rules, rates = lookup_rates(purchase)
+    columns = {program.name: j for j, program in enumerate(programs)}
+    probe = state.ledger.probe()
+
+    options = []
+    for card in state.cards:
+        program = card['program']
+        j = columns[program.name]
+        option = {
+            'account_id': card['account_id'],
+            'account_name': card['account_name'],
+            'institution_name': card['institution_name'],
+            'rewards_program': program.name,
+            'rule': rules[j],
+            'rate': rates[j]
+        }
+        if rules[j] in program.capped_rules:
+            period = period_of(day, program.cap_period)
+            limit, overflow_rule, partial = program.cap_terms(rules[j])
+            option['cap_headroom'] = round(max(limit - probe.used(state.user_id, program.name, rules[j], period), 0), 2)
+            option['expected_reward'] = program.capped_reward(amount, rules[j], probe, state.user_id, period)
+        else:
+            option['expected_reward'] = amount * rates[j]
+        options.append(option)
+
+    # Highest reward first; the order cards were linked in breaks ties
+    options.sort(key=lambda option: -option['expected_reward'])
+    return options
+
+class SwipeStateCache:
+    """
+    Process-wide SwipeState per user. A state older than the TTL, or one invalidated
+    because the user's accounts or transactions changed, keeps being served while a
+    background worker rebuilds it; only a user's very first request builds inline.
+    At most maxsize users are kept, the least recently used evicted first together
+    with the loader their rebuilds use.
+    """
+
+    def __init__(self, ttl=None, maxsize=None, max_workers=2):
+        self.ttl = ttl if ttl is not None else get_swipe_state_ttl()
+        # user_id -> (SwipeState, transactions_loader); staleness is tracked per state
+        # rather than by the cache, so expired states can still be served
+        self._states = TTLCache(maxsize=maxsize if maxsize is not None else get_swipe_state_cache_size())
+        self._stale = set()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='swipe-state')
+
+    def get(self, user_id, transactions_loader):
+        """Get a user's SwipeState, building it now if there is none yet."""
+        entry = self._states.get(user_id)
+        if entry is None:
+            state = build_swipe_state(user_id, transactions_loader)
+            self._states.set(user_id, (state, transactions_loader))
+            return state
+
+        state, loader = entry
+        if loader is not transactions_loader:
+            self._states.set(user_id, (state, transactions_loader))
+        with self._lock:
+            stale = user_id in self._stale or state.age > self.ttl
+        if stale:
+            self._schedule(user_id)
+        return state
+
+    def invalidate(self, user_id):
+        """Mark a user's state out of date and rebuild it in the background."""
+        if self._states.get(user_id) is None:
+            return
+        with self._lock:
+            self._stale.add(user_id)
+        self._schedule(user_id)
+
+    def stats(self):
+        """Get the entry count and hit/miss counters."""
+        return self._states.stats()
+
+    def _schedule(self, user_id):
+        with self._lock:
+            if user_id in self._pending:
+                return
+            entry = self._states.get(user_id)
+            self._stale.discard(user_id)
+            if entry is None:
+                return
+            self._pending.add(user_id)
+        self._executor.submit(self._rebuild, user_id, entry[1])
+
+    def _rebuild(self, user_id, transactions_loader):
+        try:
+            state = build_swipe_state(user_id, transactions_loader)
+            self._states.set(user_id, (state, transactions_loader))
+        except Exception as e:
+            logger.exception(f"Error rebuilding swipe state for user {user_id}: {str(e)}")
+        finally:
+            with self._lock:
+                self._pending.discard(user_id)
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_swipe_states():
+    """Get the process-wide swipe state cache, creating it on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SwipeStateCache()
+    return _cache
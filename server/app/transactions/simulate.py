@@ -0,0 +1,154 @@
+import time
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from app.transactions.config import get_simulation_workers
+from app.transactions.optimizer import optimize_assignment
+from app.transactions.rewards import REWARDS_PROGRAMS, classify_frame, select_programs
+
+logger = logging.getLogger('plaid.simulate')
+
+# Below this many candidates, shipping the frame to worker processes costs more than it saves
+_INLINE_CANDIDATES = 8
+
+# Shards per worker, so a shard of slow candidates does not leave the other workers idle
+_SHARDS_PER_WORKER = 4
+
+def get_card_catalog():
+    """Every rewards program a user could add, in a stable order."""
+    return list(REWARDS_PROGRAMS.values())
+
+def _optimal_totals(frame, programs, scenarios):
+    """
+    Best total rewards over frame for each scenario, classifying the frame against all
+    programs once and narrowing that classification per scenario.
+
+    Args:
+        frame: A TransactionFrame
+        programs: Every program any scenario uses
+        scenarios: Lists of indexes into programs, one list per scenario
+
+    Returns:
+        A list with the optimal total of each scenario; 0 for a scenario with no programs
+    """
+    classification = classify_frame(frame, programs)
+    totals = []
+    for columns in scenarios:
+        if not columns:
+            totals.append(0.0)
+            continue
+        assignment = optimize_assignment(frame, classification=select_programs(classification, columns))
+        totals.append(assignment.total)
+    return totals
+
+def _simulate_shard(frame, held, candidates):
+    """Worker side: optimal totals of the held programs plus each candidate in turn."""
+    programs = held + candidates
+    held_columns = list(range(len(held)))
+    return _optimal_totals(frame, programs, [held_columns + [len(held) + k] for k in range(len(candidates))])
+
+class CatalogSimulation:
+    """
+    What a user's history would have earned with each catalog program added to the
+    cards they hold, annualized.
+
+    Attributes:
+        history_days: Days of history the totals were annualized over
+        baseline: Annual rewards of the best use of the cards held
+        candidates: Dicts with program, annual_rewards and incremental_rewards for every
+            catalog program not held, highest incremental_rewards first
+        held: The same for every program held, where incremental_rewards is what
+            dropping the card would lose
+    """
+
+    def __init__(self, history_days, baseline, candidates, held):
+        self.history_days = history_days
+        self.baseline = baseline
+        self.candidates = candidates
+        self.held = held
+
+def simulate_catalog(frame, held_programs, history_days, catalog=None, workers=None):
+    """
+    Replay a history against the user's cards plus each catalog program, with the cards
+    used optimally and caps honored (see optimize_assignment), and rank the catalog by
+    how much each program would add per year.
+
+    Candidates are sharded across the process-wide simulation pool; rule matching and
+    the assignment are pure Python, so threads would not run them in parallel.
+
+    Args:
+        frame: A TransactionFrame of the history
+        held_programs: RewardsPrograms of the user's linked cards
+        history_days: Days the history spans, to annualize totals
+        catalog: Candidate programs; defaults to get_card_catalog()
+        workers: Worker processes to shard over; defaults to SIMULATION_WORKERS
+
+    Returns:
+        A CatalogSimulation
+    """
+    started = time.perf_counter()
+    catalog = get_card_catalog() if catalog is None else catalog
+    workers = get_simulation_workers() if workers is None else workers
+    annualize = 365 / max(history_days, 1)
+
+    held = list({program.name: program for program in held_programs}.values())
+    held_names = {program.name for program in held}
+    candidates = [program for program in catalog if program.name not in held_names]
+
+    # The baseline and each held card's marginal value are a handful of runs; do them here
+    held_columns = list(range(len(held)))
+    totals = _optimal_totals(frame, held, [held_columns] + [held_columns[:j] + held_columns[j + 1:] for j in held_columns])
+    baseline, without = totals[0], totals[1:]
+
+    if workers > 1 and len(candidates) > _INLINE_CANDIDATES:
+        shards = [shard.tolist() for shard in np.array_split(np.arange(len(candidates)), min(len(candidates), workers * _SHARDS_PER_WORKER))]
+        futures = [
+            get_simulation_pool().submit(_simulate_shard, frame, held, [candidates[k] for k in shard])
+            for shard in shards
+        ]
+        with_candidate = [total for future in futures for total in future.result()]
+    else:
+        with_candidate = _simulate_shard(frame, held, candidates)
+
+    ranked = [{
+        'program': program.name,
+        'annual_rewards': total * annualize,
+        'incremental_rewards': (total - baseline) * annualize
+    } for program, total in zip(candidates, with_candidate)]
+    # Biggest gain first; catalog order breaks ties
+    ranked.sort(key=lambda candidate: -candidate['incremental_rewards'])
+
+    kept = [{
+        'program': program.name,
+        'annual_rewards': baseline * annualize,
+        'incremental_rewards': (baseline - total) * annualize
+    } for program, total in zip(held, without)]
+
+    logger.info(
+        f"Simulated {len(candidates)} candidates over {len(frame)} transactions "
+        f"in {(time.perf_counter() - started) * 1000:.1f}ms"
+    )
+    return CatalogSimulation(history_days, baseline * annualize, ranked, kept)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_simulation_pool():
+    """
+    Get the process-wide pool catalog simulations are sharded across, creating it on
+    first use. Workers are spawned rather than forked, so they never inherit a lock
+    held by one of the server's threads.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(
+                    max_workers=max(get_simulation_workers(), 1),
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+    return _pool
@@ -0,0 +1,346 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+
+from app.transactions.config import get_transaction_store_path
+
+logger = logging.getLogger('plaid.store')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sync_state (
+    plaid_item_id TEXT PRIMARY KEY,
+    cursor TEXT,
+    version INTEGER NOT NULL DEFAULT 0,
+    last_synced_at REAL
+);
+
+CREATE TABLE IF NOT EXISTS transactions (
+    transaction_id TEXT PRIMARY KEY,
+    plaid_item_id TEXT NOT NULL,
+    account_id TEXT,
+    date TEXT NOT NULL,
+    pending INTEGER NOT NULL DEFAULT 0,
+    data TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_transactions_item_date
+    ON transactions (plaid_item_id, date);
+
+CREATE TABLE IF NOT EXISTS cashback_dirty (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    plaid_item_id TEXT NOT NULL,
+    account_id TEXT,
+    month TEXT NOT NULL,
+    UNIQUE (plaid_item_id, account_id, month)
+);
+
+CREATE TABLE IF NOT EXISTS cashback_aggregates (
+    user_id TEXT NOT NULL,
+    program TEXT NOT NULL,
+    month TEXT NOT NULL,
+    spending REAL NOT NULL,
+    cashback REAL NOT NULL,
+    PRIMARY KEY (user_id, program, month)
+);
+
+CREATE TABLE IF NOT EXISTS cashback_users (
+    user_id TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL
+);
+"""
+
+class TransactionStore:
+    """
+    Local SQLite copy of each Plaid item's transactions plus its /transactions/sync cursor.
+    Raw Plaid transaction objects are stored as JSON and normalized on read, so the
+    store never needs migrating when our schemas change.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = self._connection()
+        conn.executescript(SCHEMA)
+        conn.commit()
+
+    def _connection(self):
+        """Get this thread's connection; sqlite3 connections can't be shared across threads."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get_sync_state(self, plaid_item_id):
+        """
+        Get the sync cursor and bookkeeping for an item.
+
+        Returns:
+            A dict with cursor, version and last_synced_at, or None if the item was never synced
+        """
+        row = self._connection().execute(
+            'SELECT cursor, version, last_synced_at FROM sync_state WHERE plaid_item_id = ?',
+            (str(plaid_item_id),)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def get_item_versions(self, plaid_item_ids):
+        """
+        Get the data version of several items; it changes whenever their stored transactions do.
+
+        Returns:
+            A dict mapping each plaid_item_id (as a string) to its version, 0 if never synced
+        """
+        item_keys = [str(item_id) for item_id in plaid_item_ids]
+        versions = {item_key: 0 for item_key in item_keys}
+        if not item_keys:
+            return versions
+
+        rows = self._connection().execute(
+            'SELECT plaid_item_id, version FROM sync_state '
+            f'WHERE plaid_item_id IN ({", ".join("?" for _ in item_keys)})',
+            item_keys
+        )
+        for row in rows:
+            versions[row['plaid_item_id']] = row['version']
+        return versions
+
+    def apply_sync(self, plaid_item_id, added, modified, removed, cursor):
+        """
+        Atomically apply one complete /transactions/sync result and advance the cursor.
+        The item's version is bumped whenever any transaction changed, and the account
+        and month of both the old and new version of every changed transaction are
+        marked dirty for the cashback aggregates. A month is marked once however often
+        it changes, so an item whose user never refreshes them holds at most one dirty
+        row per account and month of history.
+
+        Args:
+            plaid_item_id: The plaid_items row the deltas belong to
+            added: Transactions Plaid reported as added
+            modified: Transactions Plaid reported as modified
+            removed: Removed transaction objects (only transaction_id is read)
+            cursor: The next_cursor from the last sync page
+        """
+        item_key = str(plaid_item_id)
+        rows = [
+            (
+                tx['transaction_id'],
+                item_key,
+                tx.get('account_id'),
+                tx.get('date') or '',
+                1 if tx.get('pending') else 0,
+                json.dumps(tx)
+            )
+            for tx in list(added) + list(modified)
+            if tx.get('transaction_id')
+        ]
+        removed_ids = [(tx['transaction_id'],) for tx in removed if tx.get('transaction_id')]
+        changed = bool(rows or removed_ids)
+
+        conn = self._connection()
+        with conn:
+            # Where the replaced and removed versions were, so their months get recomputed too
+            dirty = {(row[2], row[3][:7]) for row in rows}
+            changed_ids = [row[0] for row in rows] + [transaction_id for transaction_id, in removed_ids]
+            for start in range(0, len(changed_ids), 500):
+                batch = changed_ids[start:start + 500]
+                dirty.update((row['account_id'], row['date'][:7]) for row in conn.execute(
+                    'SELECT account_id, date FROM transactions '
+                    f'WHERE transaction_id IN ({", ".join("?" for _ in batch)})',
+                    batch
+                ))
+            # Replacing gives a month marked again a new, higher id, so a refresh already
+            # under way does not clear it
+            conn.executemany(
+                'INSERT OR REPLACE INTO cashback_dirty (plaid_item_id, account_id, month) VALUES (?, ?, ?)',
+                [(item_key, account_id, month) for account_id, month in dirty if month]
+            )
+            conn.executemany(
+                'INSERT OR REPLACE INTO transactions '
+                '(transaction_id, plaid_item_id, account_id, date, pending, data) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                rows
+            )
+            conn.executemany('DELETE FROM transactions WHERE transaction_id = ?', removed_ids)
+            conn.execute(
+                'INSERT INTO sync_state (plaid_item_id, cursor, version, last_synced_at) '
+                'VALUES (?, ?, ?, ?) '
+                'ON CONFLICT(plaid_item_id) DO UPDATE SET '
+                'cursor = excluded.cursor, '
+                'version = sync_state.version + excluded.version, '
+                'last_synced_at = excluded.last_synced_at',
+                (item_key, cursor, 1 if changed else 0, time.time())
+            )
+
+        logger.info(
+            f"Applied sync for item {item_key}: {len(added)} added, "
+            f"{len(modified)} modified, {len(removed_ids)} removed"
+        )
+        return changed
+
+    def get_transactions(self, plaid_item_ids, start_date=None, end_date=None):
+        """
+        Read stored transactions for a set of items, newest first.
+
+        Args:
+            plaid_item_ids: The plaid_items rows to read
+            start_date: Optional first date (inclusive)
+            end_date: Optional last date (inclusive)
+
+        Returns:
+            A dict mapping each plaid_item_id (as a string) to its raw Plaid transactions
+        """
+        item_keys = [str(item_id) for item_id in plaid_item_ids]
+        transactions = {item_key: [] for item_key in item_keys}
+        if not item_keys:
+            return transactions
+
+        query = (
+            'SELECT plaid_item_id, data FROM transactions '
+            f'WHERE plaid_item_id IN ({", ".join("?" for _ in item_keys)})'
+        )
+        params = list(item_keys)
+        if start_date:
+            query += ' AND date >= ?'
+            params.append(start_date.isoformat())
+        if end_date:
+            query += ' AND date <= ?'
+            params.append(end_date.isoformat())
+        query += ' ORDER BY date DESC, transaction_id DESC'
+
+        for row in self._connection().execute(query, params):
+            transactions[row['plaid_item_id']].append(json.loads(row['data']))
+        return transactions
+
+    def get_date_range(self, plaid_item_ids):
+        """
+        Get the dates of the oldest and newest stored transactions of a set of items.
+
+        Returns:
+            A (first, last) tuple of 'YYYY-MM-DD' strings, or (None, None) if nothing is stored
+        """
+        item_keys = [str(item_id) for item_id in plaid_item_ids]
+        if not item_keys:
+            return None, None
+
+        row = self._connection().execute(
+            'SELECT MIN(date) AS first, MAX(date) AS last FROM transactions '
+            f'WHERE plaid_item_id IN ({", ".join("?" for _ in item_keys)}) AND date != ?',
+            item_keys + ['']
+        ).fetchone()
+        return row['first'], row['last']
+
+    def delete_item(self, plaid_item_id):
+        """Forget an item's transactions and cursor, e.g. after it was unlinked."""
+        item_key = str(plaid_item_id)
+        conn = self._connection()
+        with conn:
+            conn.execute('DELETE FROM transactions WHERE plaid_item_id = ?', (item_key,))
+            conn.execute('DELETE FROM sync_state WHERE plaid_item_id = ?', (item_key,))
+            conn.execute('DELETE FROM cashback_dirty WHERE plaid_item_id = ?', (item_key,))
+
+    def get_cashback_dirty(self, plaid_item_ids):
+        """
+        Get where transactions changed since the cashback aggregates were last brought up to date.
+
+        Returns:
+            A (marker, dirty) tuple: dirty is a set of (account_id, 'YYYY-MM') pairs and
+            marker is passed to save_cashback once they are recomputed, or None if nothing is dirty
+        """
+        item_keys = [str(item_id) for item_id in plaid_item_ids]
+        if not item_keys:
+            return None, set()
+
+        rows = self._connection().execute(
+            'SELECT id, account_id, month FROM cashback_dirty '
+            f'WHERE plaid_item_id IN ({", ".join("?" for _ in item_keys)})',
+            item_keys
+        ).fetchall()
+        if not rows:
+            return None, set()
+        return max(row['id'] for row in rows), {(row['account_id'], row['month']) for row in rows}
+
+    def get_cashback_fingerprint(self, user_id):
+        """Get the fingerprint a user's cashback aggregates were built for, or None if never built."""
+        row = self._connection().execute(
+            'SELECT fingerprint FROM cashback_users WHERE user_id = ?', (str(user_id),)
+        ).fetchone()
+        return row['fingerprint'] if row else None
+
+    def save_cashback(self, user_id, fingerprint, replaced, plaid_item_ids, marker, rebuild=False):
+        """
+        Write recomputed cashback aggregates in a single transaction, so readers see them
+        as they were before or after, never half written, and a refresh that fails
+        leaves the fingerprint and dirty months for the next one to redo.
+
+        Args:
+            user_id: The user the aggregates belong to
+            fingerprint: What the aggregates were computed for; see cashback_fingerprint
+            replaced: (program, first_month, last_month, months) per range of 'YYYY-MM'
+                months recomputed, months holding (month, spending, cashback) rows for
+                the months with transactions
+            plaid_item_ids: The user's items, whose dirty months up to marker are forgotten
+            marker: From get_cashback_dirty; dirty months marked later stay
+            rebuild: Drop every other aggregate of the user first
+        """
+        item_keys = [str(item_id) for item_id in plaid_item_ids]
+        conn = self._connection()
+        with conn:
+            if rebuild:
+                conn.execute('DELETE FROM cashback_aggregates WHERE user_id = ?', (str(user_id),))
+            for program, first_month, last_month, months in replaced:
+                conn.execute(
+                    'DELETE FROM cashback_aggregates WHERE user_id = ? AND program = ? AND month BETWEEN ? AND ?',
+                    (str(user_id), program, first_month, last_month)
+                )
+                conn.executemany(
+                    'INSERT INTO cashback_aggregates (user_id, program, month, spending, cashback) VALUES (?, ?, ?, ?, ?)',
+                    [(str(user_id), program, month, spending, cashback) for month, spending, cashback in months]
+                )
+            conn.execute(
+                'INSERT OR REPLACE INTO cashback_users (user_id, fingerprint) VALUES (?, ?)',
+                (str(user_id), fingerprint)
+            )
+            if item_keys and marker is not None:
+                conn.execute(
+                    'DELETE FROM cashback_dirty '
+                    f'WHERE plaid_item_id IN ({", ".join("?" for _ in item_keys)}) AND id <= ?',
+                    item_keys + [marker]
+                )
+
+    def get_cashback_totals(self, user_id, first_month, last_month):
+        """
+        Sum a user's cashback aggregates over a range of months.
+
+        Returns:
+            A dict mapping each program name to its (spending, cashback) over the range
+        """
+        rows = self._connection().execute(
+            'SELECT program, SUM(spending) AS spending, SUM(cashback) AS cashback FROM cashback_aggregates '
+            'WHERE user_id = ? AND month BETWEEN ? AND ? GROUP BY program',
+            (str(user_id), first_month, last_month)
+        )
+        return {row['program']: (row['spending'], row['cashback']) for row in rows}
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_transaction_store():
+    """Get the process-wide transaction store, creating it on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = TransactionStore(get_transaction_store_path())
+    return _store
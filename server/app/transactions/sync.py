@@ -0,0 +1,116 @@
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app.transactions.config import get_sync_interval, get_plaid_max_concurrency, PLAID_MAX_SYNC_PAGE_SIZE
+from app.transactions.plaid_client import get_plaid_client
+from app.transactions.store import get_transaction_store
+
+logger = logging.getLogger('plaid.sync')
+
+# Plaid asks clients to restart pagination from the original cursor when this happens
+MUTATION_DURING_PAGINATION = 'TRANSACTIONS_SYNC_MUTATION_DURING_PAGINATION'
+MAX_SYNC_RESTARTS = 3
+
+# One lock per item so concurrent dashboard requests don't sync the same item twice
+_item_locks = {}
+_item_locks_guard = threading.Lock()
+
+def _get_item_lock(plaid_item_id):
+    with _item_locks_guard:
+        return _item_locks.setdefault(str(plaid_item_id), threading.Lock())
+
+class SyncError(Exception):
+    """Raised when Plaid rejects a /transactions/sync call."""
+
+def fetch_sync_updates(access_token, cursor):
+    """
+    Page through /transactions/sync from a cursor until has_more is false.
+
+    Returns:
+        (added, modified, removed, next_cursor) covering every page
+    """
+    plaid_client = get_plaid_client()
+
+    for attempt in range(MAX_SYNC_RESTARTS + 1):
+        added, modified, removed = [], [], []
+        next_cursor = cursor
+        has_more = True
+
+        while has_more:
+            payload = {
+                'access_token': access_token,
+                'count': PLAID_MAX_SYNC_PAGE_SIZE
+            }
+            if next_cursor:
+                payload['cursor'] = next_cursor
+
+            response = plaid_client.post('/transactions/sync', payload)
+
+            if response.status_code != 200:
+                error_code = None
+                try:
+                    error_code = response.json().get('error_code')
+                except ValueError:
+                    pass
+                if error_code == MUTATION_DURING_PAGINATION:
+                    break
+                raise SyncError(f"Plaid /transactions/sync failed with status {response.status_code}: {response.text}")
+
+            data = response.json()
+            added.extend(data.get('added', []))
+            modified.extend(data.get('modified', []))
+            removed.extend(data.get('removed', []))
+            next_cursor = data.get('next_cursor')
+            has_more = data.get('has_more', False)
+        else:
+            return added, modified, removed, next_cursor
+
+        logger.warning(f"Item changed during sync pagination, restarting (attempt {attempt + 1})")
+
+    raise SyncError("Plaid /transactions/sync kept changing during pagination")
+
+def sync_item(item, force=False):
+    """
+    Bring the local store up to date with Plaid for one plaid_items row.
+    Items synced less than PLAID_SYNC_INTERVAL seconds ago are skipped without calling
+    Plaid unless force is set.
+
+    Args:
+        item: The plaid_items row, including access_token
+        force: Sync even if the item is still fresh
+
+    Returns:
+        True if any transaction was added, modified or removed
+    """
+    store = get_transaction_store()
+    plaid_item_id = item['id']
+
+    with _get_item_lock(plaid_item_id):
+        # Re-read the state under the lock; another request may have just synced this item
+        state = store.get_sync_state(plaid_item_id)
+        if not force and state and state.get('last_synced_at'):
+            if time.time() - state['last_synced_at'] < get_sync_interval():
+                return False
+
+        cursor = state.get('cursor') if state else None
+        added, modified, removed, next_cursor = fetch_sync_updates(item['access_token'], cursor)
+        return store.apply_sync(plaid_item_id, added, modified, removed, next_cursor)
+
+def sync_items(items, force=False):
+    """
+    Sync several items concurrently. A failure in one item is logged and does not
+    stop the others; that item is then served from whatever the store already has.
+    """
+    if not items:
+        return
+
+    max_workers = min(get_plaid_max_concurrency(), len(items))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(sync_item, item, force) for item in items]
+        for item, future in zip(items, futures):
+            try:
+                future.result()
+            except Exception as e:
+                logger.exception(f"Error syncing item {item.get('id')}: {str(e)}")
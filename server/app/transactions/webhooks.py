@@ -0,0 +1,100 @@
+import json
+import time
+import hmac
+import hashlib
+import logging
+
+import jwt
+
+from app.transactions.cache import TTLCache
+from app.transactions.plaid_client import get_plaid_client
+
+logger = logging.getLogger('plaid.webhooks')
+
+# Plaid recommends rejecting webhooks signed more than five minutes ago
+MAX_WEBHOOK_AGE_SECONDS = 5 * 60
+
+# Verification keys rotate rarely; cache them so each webhook doesn't cost a Plaid call
+_verification_keys = TTLCache(maxsize=32, ttl=24 * 3600)
+
+# Webhooks that mean the item's transactions changed and should be re-synced
+TRANSACTIONS_REFRESH_CODES = {
+    'SYNC_UPDATES_AVAILABLE',
+    'DEFAULT_UPDATE',
+    'INITIAL_UPDATE',
+    'HISTORICAL_UPDATE',
+    'TRANSACTIONS_REMOVED',
+}
+
+# ITEM webhooks that report a broken item; syncing it would only fail again
+ITEM_ERROR_CODES = {
+    'ERROR',
+    'PENDING_EXPIRATION',
+    'PENDING_DISCONNECT',
+    'USER_PERMISSION_REVOKED',
+    'USER_ACCOUNT_REVOKED',
+}
+
+class WebhookVerificationError(Exception):
+    """Raised when a webhook's Plaid-Verification header does not check out."""
+
+def _get_verification_key(key_id):
+    """Get the JWK Plaid signed webhooks with, from cache or webhook_verification_key/get."""
+    key = _verification_keys.get(key_id)
+    if key is not None:
+        return key
+
+    response = get_plaid_client().post('/webhook_verification_key/get', {'key_id': key_id})
+    if response.status_code != 200:
+        raise WebhookVerificationError(f"Could not fetch verification key {key_id}: {response.text}")
+
+    key = response.json().get('key', {})
+    _verification_keys.set(key_id, key)
+    return key
+
+def verify_webhook(body, verification_header):
+    """
+    Check a webhook's Plaid-Verification JWT against the raw request body.
+
+    Args:
+        body: The raw request body bytes, exactly as received
+        verification_header: The Plaid-Verification header value
+
+    Raises:
+        WebhookVerificationError if the signature, age or body hash is wrong
+    """
+    if not verification_header:
+        raise WebhookVerificationError("Missing Plaid-Verification header")
+
+    try:
+        header = jwt.get_unverified_header(verification_header)
+    except jwt.PyJWTError as e:
+        raise WebhookVerificationError(f"Malformed verification token: {str(e)}")
+
+    if header.get('alg') != 'ES256':
+        raise WebhookVerificationError(f"Unexpected signing algorithm {header.get('alg')}")
+
+    key = _get_verification_key(header.get('kid'))
+    if key.get('expired_at'):
+        raise WebhookVerificationError("Webhook was signed with an expired key")
+
+    try:
+        public_key = jwt.algorithms.ECAlgorithm.from_jwk(json.dumps(key))
+        claims = jwt.decode(verification_header, public_key, algorithms=['ES256'], options={'verify_exp': False})
+    except jwt.PyJWTError as e:
+        raise WebhookVerificationError(f"Invalid webhook signature: {str(e)}")
+
+    if time.time() - claims.get('iat', 0) > MAX_WEBHOOK_AGE_SECONDS:
+        raise WebhookVerificationError("Webhook is too old")
+
+    body_hash = hashlib.sha256(body).hexdigest()
+    if not hmac.compare_digest(body_hash, claims.get('request_body_sha256', '')):
+        raise WebhookVerificationError("Webhook body does not match its signature")
+
+def should_refresh(webhook_type, webhook_code):
+    """Whether a webhook should trigger a background refresh of its item."""
+    if webhook_type == 'TRANSACTIONS':
+        return webhook_code in TRANSACTIONS_REFRESH_CODES
+    if webhook_type == 'ITEM':
+        return webhook_code not in ITEM_ERROR_CODES
+    return False
@@ -0,0 +1,61 @@
+"""
+Backtest a user's whole transaction history from the command line: what their cards
+earned against what the cap-aware optimal assignment would have, by quarter or month.
+Same engine as GET /api/transactions/backtest.
+
+Run from the server directory with the server's environment (.env) in place:
+
+    python scripts/backtest.py --user-id <supabase user id>
+    python scripts/backtest.py --user-id <id> --start-date 2022-01-01 --monthly
+    python scripts/backtest.py --user-id <id> --json > backtest.json
+"""
+import os
+import sys
+import json
+import argparse
+from datetime import date, datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from app import create_app
+from app.transactions.backtest import run_backtest
+from app.transactions.context import UserDataContext
+from app.transactions.plaid import get_history_start, load_user_transactions
+
+def parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest a user's cashback against the optimal card assignment")
+    parser.add_argument('--user-id', required=True)
+    parser.add_argument('--start-date', type=parse_date, help='YYYY-MM-DD; defaults to the oldest transaction')
+    parser.add_argument('--end-date', type=parse_date, default=date.today(), help='YYYY-MM-DD; defaults to today')
+    parser.add_argument('--monthly', action='store_true', help='Print months instead of quarters')
+    parser.add_argument('--json', action='store_true', help='Print the full result as JSON')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        context = UserDataContext(args.user_id, load_user_transactions)
+        start_date = args.start_date or get_history_start(context, args.end_date)
+        backtest = run_backtest(
+            lambda window_start, window_end: load_user_transactions(context, window_start, window_end),
+            context.account_programs,
+            start_date,
+            args.end_date
+        )
+
+    if args.json:
+        print(json.dumps(backtest, indent=2))
+        return
+
+    label, series = ('month', backtest['monthly']) if args.monthly else ('quarter', backtest['quarterly'])
+    print(f"{label:>9}  {'spending':>12}  {'actual':>10}  {'optimal':>10}  {'missed':>10}")
+    for entry in series + [dict(backtest['totals'], **{label: 'total'})]:
+        print(
+            f"{entry[label]:>9}  {entry['spending']:>12,.2f}  {entry['actual']:>10,.2f}  "
+            f"{entry['optimal']:>10,.2f}  {entry['missed']:>10,.2f}"
+        )
+
+if __name__ == '__main__':
+    main()
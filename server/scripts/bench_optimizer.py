@@ -0,0 +1,150 @@
+"""
+Time the cap-aware optimize_assignment behind /transactions/optimal-cashback on
+multi-year histories, and show how close its assignment gets to the relaxation bound.
+First checks it against brute force: every way of putting a handful of purchases on
+a few cards, priced by price_assignment. Exits non-zero on any mismatch.
+
+Run from the server directory:
+
+    python scripts/bench_optimizer.py
+    python scripts/bench_optimizer.py --sizes 2000 20000 --years 3
+    python scripts/bench_optimizer.py --checks 1000 --sizes
+
+The uncapped column is what picking each transaction's best card on its own would
+claim; it ignores that the cap room is shared and so overstates what can be earned.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import itertools
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy as np
+
+from app.transactions.frame import TransactionFrame
+from app.transactions.rewards import REWARDS_LIST, REWARDS_PROGRAMS, classify_frame
+from app.transactions.optimizer import optimize_assignment, price_assignment
+
+CATEGORIES = ['Food and Drink', 'Groceries', 'Supermarkets', 'Travel', 'Shops', 'Service', 'Recreation']
+MERCHANTS = [None, None, None, 'Apple', 'Netflix', 'Lyft', 'Whole Foods', 'Amex Travel']
+CHANNELS = ['in store', 'online', 'other']
+
+def make_transactions(count, years, rng):
+    """Normalized purchases spread over the given number of years."""
+    transactions = []
+    for i in range(count):
+        transactions.append({
+            'id': f'tx_{i}',
+            'amount': -round(rng.lognormvariate(3.5, 1.1), 2),
+            'date': f'{2025 - rng.randrange(years)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}',
+            'category': rng.choice(CATEGORIES),
+            'merchant_name': rng.choice(MERCHANTS),
+            'payment_channel': rng.choice(CHANNELS),
+            'account_id': 'acc_0',
+        })
+    return transactions
+
+# Purchases big enough next to the caps that which ones fit decides the optimum
+CHECK_AMOUNTS = [(1, 100), (300, 900), (500, 3000), (2000, 20000)]
+
+# Cases the assignment once got wrong: (programs, purchases as (amount, date, category))
+CHECK_CASES = [
+    (
+        ['American Express Gold Card', 'Bank of America Customized Cash Rewards', 'Wells Fargo Active Cash'],
+        [(13568.25, '2024-01-05', 'Groceries'), (17573.95, '2024-02-05', 'Groceries'), (2440.02, '2024-03-05', 'Groceries')]
+    ),
+    (
+        ['Discover It Student Cash Back', 'Bank of America Customized Cash Rewards', 'Wells Fargo Active Cash'],
+        [
+            (512.40, '2024-04-02', 'Shops'), (873.15, '2024-04-09', 'Service'), (305.99, '2024-04-18', 'Shops'),
+            (648.20, '2024-05-03', 'Recreation'), (799.00, '2024-05-21', 'Shops'), (421.75, '2024-06-11', 'Service')
+        ]
+    ),
+]
+
+def make_purchases(purchases):
+    """Normalized transactions from (amount, date, category) tuples."""
+    return [
+        {
+            'id': f'tx_{i}',
+            'amount': -amount,
+            'date': day,
+            'category': category,
+            'merchant_name': None,
+            'payment_channel': 'in store',
+            'account_id': 'acc_0',
+        }
+        for i, (amount, day, category) in enumerate(purchases)
+    ]
+
+def brute_force_total(frame, programs):
+    """Best total over every card, or none, for every transaction."""
+    return max(
+        float(price_assignment(frame, columns, programs).sum())
+        for columns in itertools.product(range(-1, len(programs)), repeat=len(frame))
+    )
+
+def check_against_brute_force(checks, rng):
+    """Compare optimize_assignment with brute force on the known cases and random small ones."""
+    cases = [([REWARDS_PROGRAMS[name] for name in names], purchases) for names, purchases in CHECK_CASES]
+    for _ in range(checks):
+        count = rng.randint(2, 6)
+        purchases = [
+            (round(rng.uniform(*rng.choice(CHECK_AMOUNTS)), 2), f'2024-{rng.choice([1, 2, 4, 5]):02d}-{rng.randint(1, 28):02d}', rng.choice(CATEGORIES))
+            for _ in range(count)
+        ]
+        cases.append((rng.sample(REWARDS_LIST, rng.randint(1, 3 if count > 5 else 4)), purchases))
+
+    for programs, purchases in cases:
+        frame = TransactionFrame.from_transactions(make_purchases(purchases))
+        assignment = optimize_assignment(frame, programs)
+        expected = brute_force_total(frame, programs)
+        repriced = float(price_assignment(frame, assignment.columns, programs).sum())
+        if abs(assignment.total - expected) > 1e-6 or abs(repriced - assignment.total) > 1e-6:
+            sys.exit(
+                f"Assignment earns {assignment.total:.4f} (repriced {repriced:.4f}) where brute force finds "
+                f"{expected:.4f}: {[program.name for program in programs]} {purchases}"
+            )
+        if assignment.total > assignment.upper_bound + 1e-6:
+            sys.exit(f"Assignment exceeds its upper bound: {[program.name for program in programs]} {purchases}")
+    print(f"Brute force OK: {len(cases)} cases")
+
+def uncapped_total(frame):
+    """Each row at its best rate as if no cap existed."""
+    programs, rules, rates, signature_rows = classify_frame(frame)
+    return float((np.abs(frame.amount_cents) / 100 * rates[signature_rows].max(axis=1)).sum())
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the cap-aware optimal card assignment')
+    parser.add_argument('--sizes', type=int, nargs='*', default=[1000, 5000, 20000, 100000])
+    parser.add_argument('--years', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--checks', type=int, default=200, help='Random cases to check against brute force')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    check_against_brute_force(args.checks, rng)
+    if not args.sizes:
+        return
+
+    print(f"{'rows':>9}  {'optimize':>9}  {'assigned':>11}  {'bound':>11}  {'gap':>7}  {'uncapped':>11}  exact")
+    for size in args.sizes:
+        frame = TransactionFrame.from_transactions(make_transactions(size, args.years, rng))
+
+        started = time.perf_counter()
+        assignment = optimize_assignment(frame)
+        seconds = time.perf_counter() - started
+
+        if assignment.total > assignment.upper_bound + 1e-6:
+            sys.exit(f"Assignment exceeds its upper bound at {size} rows")
+
+        print(
+            f"{size:>9,}  {seconds * 1000:>7.1f}ms  {assignment.total:>11,.2f}  {assignment.upper_bound:>11,.2f}  "
+            f"{assignment.upper_bound - assignment.total:>7.2f}  {uncapped_total(frame):>11,.2f}  {assignment.exact}"
+        )
+
+if __name__ == '__main__':
+    main()
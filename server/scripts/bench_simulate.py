@@ -0,0 +1,89 @@
+"""
+Time simulate_catalog, behind /api/cards/simulate, on a large card catalog and a
+multi-year history, in-process and sharded across the simulation pool.
+
+Run from the server directory:
+
+    python scripts/bench_simulate.py
+    python scripts/bench_simulate.py --catalog 500 --history 20000 --workers 8
+
+The catalog is the real programs plus variants of them with scaled rates, so it has
+capped and uncapped programs in the same proportions. Exits non-zero when the sharded
+and in-process rankings disagree.
+"""
+import os
+import sys
+import copy
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from app.transactions.frame import TransactionFrame
+from app.transactions.rewards import REWARDS_PROGRAMS
+from app.transactions.simulate import simulate_catalog, get_simulation_pool
+
+CATEGORIES = ['Food and Drink', 'Groceries', 'Supermarkets', 'Travel', 'Shops', 'Service', 'Airlines']
+MERCHANTS = [None, None, 'Apple', 'Netflix', 'Lyft', 'Whole Foods', 'Amex Travel', 'Chase Travel']
+CHANNELS = ['in store', 'online', 'other']
+
+def make_catalog(size, rng):
+    """The real programs followed by renamed copies with every rate scaled."""
+    catalog = list(REWARDS_PROGRAMS.values())
+    bases = list(catalog)
+    while len(catalog) < size:
+        program = copy.copy(rng.choice(bases))
+        scale = rng.uniform(0.5, 1.5)
+        program.name = f'{program.name} #{len(catalog)}'
+        program.rules = {rule: round(rate * scale, 4) for rule, rate in program.rules.items()}
+        program._matcher = None
+        catalog.append(program)
+    return catalog
+
+def make_transactions(count, years, rng):
+    return [{
+        'amount': -round(rng.lognormvariate(3.5, 1.1), 2),
+        'date': f'{2025 - rng.randrange(years)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}',
+        'category': rng.choice(CATEGORIES),
+        'merchant_name': rng.choice(MERCHANTS),
+        'payment_channel': rng.choice(CHANNELS),
+        'account_id': 'acc_0',
+    } for _ in range(count)]
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the card catalog simulation')
+    parser.add_argument('--catalog', type=int, default=200)
+    parser.add_argument('--history', type=int, default=5000)
+    parser.add_argument('--years', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    os.environ['SIMULATION_WORKERS'] = str(args.workers)
+    rng = random.Random(args.seed)
+    catalog = make_catalog(args.catalog, rng)
+    frame = TransactionFrame.from_transactions(make_transactions(args.history, args.years, rng))
+    held = [REWARDS_PROGRAMS['Bank of America Cash Rewards'], REWARDS_PROGRAMS['Citi Double Cash']]
+    history_days = args.years * 365
+
+    # Spawning the workers is paid once per server process, not per request
+    started = time.perf_counter()
+    list(get_simulation_pool().map(abs, range(args.workers)))
+    print(f"Started {args.workers} workers in {(time.perf_counter() - started) * 1000:.0f}ms")
+
+    results = {}
+    for label, workers in (('in-process', 1), (f'{args.workers} workers', args.workers), (f'{args.workers} workers, warm', args.workers)):
+        started = time.perf_counter()
+        results[label] = simulate_catalog(frame, held, history_days, catalog=catalog, workers=workers)
+        print(f"{label:>20}: {len(catalog)} programs x {args.history:,} transactions in {time.perf_counter() - started:.2f}s")
+
+    ranked = [[(c['program'], round(c['incremental_rewards'], 6)) for c in result.candidates] for result in results.values()]
+    if any(ranking != ranked[0] for ranking in ranked):
+        sys.exit("Sharded ranking differs from the in-process one")
+
+    for candidate in results['in-process'].candidates[:5]:
+        print(f"  {candidate['program']:<40} +{candidate['incremental_rewards']:>9,.2f}/yr")
+
+if __name__ == '__main__':
+    main()
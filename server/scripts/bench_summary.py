@@ -0,0 +1,124 @@
+"""
+Compare the old dict-walking /transactions/summary aggregation against the vectorized
+summarize_transactions, from 1k to 1M transactions.
+
+Run from the server directory:
+
+    python scripts/bench_summary.py
+    python scripts/bench_summary.py --sizes 1000 10000 100000
+
+Each size is first checked for the same groups and counts, with amounts equal up to the
+rounding error the old float accumulation introduced.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from app.transactions.frame import TransactionFrame
+from app.transactions.aggregate import summarize_transactions
+
+CATEGORIES = ['Food and Drink', 'Shops', 'Travel', 'Transfer', 'Service', 'Payment', 'Recreation', 'Other']
+ACCOUNTS = [(f'acc_{i}', f'Card {i}', f'Bank {i % 3}') for i in range(6)]
+
+def make_transactions(count, rng):
+    """Normalized transactions carrying the fields the summary reads."""
+    transactions = []
+    for i in range(count):
+        account_id, account_name, institution_name = rng.choice(ACCOUNTS)
+        transactions.append({
+            'id': f'tx_{i}',
+            'amount': round(rng.uniform(-400, 150), 2),
+            'date': f'2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}',
+            'category': rng.choice(CATEGORIES),
+            'merchant_name': None,
+            'payment_channel': 'other',
+            'account_id': account_id,
+            'account_name': account_name,
+            'institution_name': institution_name,
+        })
+    return transactions
+
+def legacy_summary(transactions):
+    """The summary loop get_transaction_summary used before summarize_transactions."""
+    summary = {
+        'total_transactions': len(transactions),
+        'total_amount': sum(abs(t['amount']) for t in transactions),
+        'income': sum(t['amount'] for t in transactions if t['amount'] > 0),
+        'expenses': sum(abs(t['amount']) for t in transactions if t['amount'] < 0),
+        'categories': {},
+        'accounts': {},
+        'institutions': {}
+    }
+    for transaction in transactions:
+        category = transaction.get('category', 'Other')
+        amount = abs(transaction['amount'])
+        account_id = transaction.get('account_id', 'unknown')
+        account_name = transaction.get('account_name', 'Unknown Account')
+        institution_name = transaction.get('institution_name', 'Unknown Institution')
+
+        if category not in summary['categories']:
+            summary['categories'][category] = {'count': 0, 'amount': 0}
+        summary['categories'][category]['count'] += 1
+        summary['categories'][category]['amount'] += amount
+
+        if account_id not in summary['accounts']:
+            summary['accounts'][account_id] = {'name': account_name, 'count': 0, 'amount': 0}
+        summary['accounts'][account_id]['count'] += 1
+        summary['accounts'][account_id]['amount'] += amount
+
+        if institution_name not in summary['institutions']:
+            summary['institutions'][institution_name] = {'count': 0, 'amount': 0}
+        summary['institutions'][institution_name]['count'] += 1
+        summary['institutions'][institution_name]['amount'] += amount
+    return summary
+
+def same_summary(expected, actual, tolerance):
+    """Same keys, counts and names, and amounts within tolerance dollars."""
+    if expected.keys() != actual.keys():
+        return False
+    for key, value in expected.items():
+        if isinstance(value, dict):
+            if list(value) != list(actual[key]) or not same_summary(value, actual[key], tolerance):
+                return False
+        elif isinstance(value, float):
+            if abs(value - actual[key]) > tolerance:
+                return False
+        elif value != actual[key]:
+            return False
+    return True
+
+def timed(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark /transactions/summary aggregation')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000, 1000000])
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'rows':>9}  {'legacy':>10}  {'frame build':>11}  {'vectorized':>10}  {'speedup':>8}")
+    for size in args.sizes:
+        transactions = make_transactions(size, rng)
+
+        expected, legacy_seconds = timed(legacy_summary, transactions)
+        frame, build_seconds = timed(TransactionFrame.from_transactions, transactions)
+        actual, vector_seconds = timed(summarize_transactions, frame)
+
+        # Float accumulation drifts by about one ulp per addition; allow for that
+        if not same_summary(expected, actual, tolerance=1e-9 * size + 1e-9):
+            sys.exit(f"Summary mismatch at {size} rows")
+
+        print(
+            f"{size:>9,}  {legacy_seconds * 1000:>8.1f}ms  {build_seconds * 1000:>9.1f}ms  "
+            f"{vector_seconds * 1000:>8.2f}ms  {legacy_seconds / vector_seconds:>7.0f}x"
+        )
+
+if __name__ == '__main__':
+    main()
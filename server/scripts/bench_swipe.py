@@ -0,0 +1,98 @@
+"""
+Measure how long recommend_card takes to rank a user's cards for one purchase, the
+work /api/cards/best does per request once the user's swipe state is built.
+
+Run from the server directory:
+
+    python scripts/bench_swipe.py
+    python scripts/bench_swipe.py --requests 50000 --history 20000 --budget-ms 5
+
+One card per rewards program is linked and this year's history is replayed into the
+cap ledger first, as build_swipe_state does. Purchases mix repeat merchants with new
+ones, so some lookups miss the rate cache. Exits non-zero when p99 is over budget.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy as np
+
+from app.transactions.caps import CapLedger
+from app.transactions.frame import TransactionFrame
+from app.transactions.optimizer import price_assignment
+from app.transactions.rewards import REWARDS_PROGRAMS
+from app.transactions.routing import SwipeState, recommend_card
+
+CATEGORIES = ['Food and Drink', 'Groceries', 'Supermarkets', 'Travel', 'Shops', 'Service', 'Airlines']
+MERCHANTS = [None, 'Apple', 'Netflix', 'Lyft', 'Whole Foods', 'Amex Travel', 'Chase Travel', 'Instacart Online']
+CHANNELS = ['in store', 'online', 'other']
+
+def make_state(history, rng):
+    """A SwipeState with one card per program and history transactions since January 1."""
+    today = date.today()
+    program_names = list(REWARDS_PROGRAMS)
+    cards = [{
+        'account_id': f'acc_{j}',
+        'account_name': f'{name} Card',
+        'institution_name': name,
+        'program': program
+    } for j, (name, program) in enumerate(REWARDS_PROGRAMS.items())]
+
+    transactions = [{
+        'amount': -round(rng.lognormvariate(3.5, 1.1), 2),
+        'date': date.fromordinal(rng.randint(today.replace(month=1, day=1).toordinal(), today.toordinal())).isoformat(),
+        'category': rng.choice(CATEGORIES),
+        'merchant_name': rng.choice(MERCHANTS),
+        'payment_channel': rng.choice(CHANNELS),
+        'account_id': f'acc_{rng.randrange(len(program_names))}',
+    } for _ in range(history)]
+    frame = TransactionFrame.from_transactions(transactions)
+    columns = np.array([int(account_id.split('_')[1]) for account_id in frame.account_ids])[frame.account_codes]
+
+    ledger = CapLedger()
+    started = time.perf_counter()
+    price_assignment(frame, columns, ledger=ledger, user_id='bench')
+    print(f"Replayed {history:,} transactions into the cap ledger in {(time.perf_counter() - started) * 1000:.1f}ms")
+    return SwipeState('bench', cards, ledger, time.time())
+
+def make_purchase(rng):
+    # One purchase in twenty is at a merchant not seen before
+    merchant = rng.choice(MERCHANTS) if rng.random() > 0.05 else f'New Merchant {rng.randrange(10 ** 6)}'
+    return {
+        'amount': round(rng.lognormvariate(3.5, 1.1), 2),
+        'merchant_name': merchant,
+        'category': rng.choice(CATEGORIES),
+        'payment_channel': rng.choice(CHANNELS),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark best-card routing latency')
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--history', type=int, default=5000)
+    parser.add_argument('--budget-ms', type=float, default=5.0)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    state = make_state(args.history, rng)
+    purchases = [make_purchase(rng) for _ in range(args.requests)]
+
+    latencies = []
+    for purchase in purchases:
+        started = time.perf_counter()
+        recommend_card(state, purchase)
+        latencies.append(time.perf_counter() - started)
+
+    latencies = np.array(latencies) * 1000
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    print(f"{args.requests:,} purchases: p50 {p50:.3f}ms  p95 {p95:.3f}ms  p99 {p99:.3f}ms  max {latencies.max():.3f}ms")
+    if p99 > args.budget_ms:
+        sys.exit(f"p99 {p99:.3f}ms is over the {args.budget_ms}ms budget")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""
+Check the rewards catalog against the hand-written program classes it replaced.
+
+Run from the server directory:
+
+    python scripts/parity_rewards.py
+    python scripts/parity_rewards.py --rows 20000
+
+The classes are frozen in scripts/legacy_rewards.py. Every program must keep its
+rates, capped rules and cap terms; every merchant/category/channel signature built
+from the legacy patterns (in several casings, so the case-sensitive Chase categories
+are covered) must get the same rule from each program and from the compiled catalog;
+and a random run of purchases must earn the same cashback, transaction by transaction
+through the caps and in one batch.
+"""
+import os
+import sys
+import random
+import argparse
+import itertools
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import legacy_rewards as legacy
+from app.transactions import rewards
+from app.transactions.caps import CapLedger
+from app.transactions.catalog import CompiledCatalog
+
+NEUTRAL_MERCHANTS = [None, '', 'Corner Store', 'Ünïcode Café']
+NEUTRAL_CATEGORIES = [None, '', 'Shops', 'Other', 'Shops, Supermarkets and Groceries', 'Groceries, Travel']
+CHANNELS = ['', 'in store', 'online', 'other', 'apple_pay', 'Apple_Pay', 'APPLE_PAY']
+
+def variants(pattern):
+    """A pattern as written, recased, and inside a longer string."""
+    return {pattern, pattern.lower(), pattern.upper(), f'The {pattern} Shop'}
+
+def signatures():
+    """Every merchant/category/channel combination worth telling the programs apart on."""
+    merchants = set(NEUTRAL_MERCHANTS)
+    categories = set(NEUTRAL_CATEGORIES)
+    for program in legacy.REWARDS_PROGRAMS.values():
+        for _, field, patterns, _ in program.match_rules():
+            values = merchants if field == 'merchant_name' else categories
+            for pattern in patterns:
+                values.update(variants(pattern))
+    order = lambda value: (value is not None, value or '')
+    return [
+        {'merchant_name': merchant, 'category': category, 'payment_channel': channel}
+        for merchant, category, channel in itertools.product(
+            sorted(merchants, key=order), sorted(categories, key=order), CHANNELS
+        )
+    ]
+
+def check_definitions():
+    """Same programs, in the same order, with the same rates and caps."""
+    if list(legacy.REWARDS_PROGRAMS) != list(rewards.REWARDS_PROGRAMS):
+        sys.exit('Catalog programs differ from the legacy programs')
+    for name, old in legacy.REWARDS_PROGRAMS.items():
+        new = rewards.REWARDS_PROGRAMS[name]
+        if old.rules != new.rules or set(old.capped_rules) != set(new.capped_rules) or old.cap_period != new.cap_period:
+            sys.exit(f'{name}: rates, capped rules or cap period differ')
+        for rule in old.capped_rules:
+            if old.cap_terms(rule) != new.cap_terms(rule):
+                sys.exit(f'{name}: cap terms of {rule} differ')
+
+def check_signatures(rows):
+    """Same rule for every signature, per program and through the compiled catalog."""
+    catalog = CompiledCatalog(rewards.REWARDS_LIST)
+    for transaction in rows:
+        hits = legacy.REWARDS_MATCHER.match(transaction)
+        expected = tuple(program.classify(transaction, hits) for program in legacy.REWARDS_PROGRAMS.values())
+        actual = tuple(program.classify(transaction, program.match(transaction)) for program in rewards.REWARDS_LIST)
+        compiled, _ = catalog.classify(transaction)
+        if actual != expected or compiled != expected:
+            sys.exit(f'Rules differ for {transaction}: legacy {expected}, catalog {actual}, compiled {compiled}')
+
+def make_purchases(count, rows, rng):
+    """Purchases over two years on the signatures, large enough to run through every cap."""
+    return [
+        dict(
+            rng.choice(rows),
+            id=f'tx_{i}',
+            account_id='acc_0',
+            amount=-round(rng.lognormvariate(5, 1.4), 2),
+            date=f'{rng.choice([2024, 2025])}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}'
+        )
+        for i in range(count)
+    ]
+
+def check_capped(purchases):
+    """
+    Same cashback through the caps, one transaction at a time in date order and batched.
+    The legacy batch walked the rows the same way, so the walk is its expected output.
+    """
+    programs = list(legacy.REWARDS_PROGRAMS.values())
+    expected = np.zeros((len(purchases), len(programs)))
+    old_ledger, new_ledger = CapLedger(), CapLedger()
+    chronological = sorted(range(len(purchases)), key=lambda i: purchases[i]['date'])
+    for i in chronological:
+        transaction = purchases[i]
+        for j, old in enumerate(programs):
+            expected[i, j] = old.calculate_rewards(transaction, ledger=old_ledger, user_id='user')
+            actual = rewards.REWARDS_PROGRAMS[old.name].calculate_rewards(transaction, ledger=new_ledger, user_id='user')
+            if abs(expected[i, j] - actual) > 1e-9:
+                sys.exit(f'{old.name}: {transaction["id"]} earns {actual}, legacy {expected[i, j]}')
+
+    actual = rewards.calculate_rewards_batch(purchases)
+    if expected.shape != actual.shape or np.abs(expected - actual).max() > 1e-9:
+        sys.exit('Batch cashback differs from the legacy programs')
+
+def main():
+    parser = argparse.ArgumentParser(description='Check the rewards catalog against the legacy program classes')
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    check_definitions()
+    rows = signatures()
+    check_signatures(rows)
+    purchases = make_purchases(args.rows, rows, random.Random(args.seed))
+    check_capped(purchases)
+    print(
+        f"Parity OK: {len(legacy.REWARDS_PROGRAMS)} programs, {len(rows)} signatures, "
+        f"{len(purchases)} purchases through the caps"
+    )
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+"""
+Send a fake Plaid webhook to a locally running server.
+
+Start the server with PLAID_WEBHOOK_VERIFICATION=false, then e.g.:
+
+    python scripts/send_fake_webhook.py --item-id <plaid item_id>
+    python scripts/send_fake_webhook.py --item-id <plaid item_id> --type ITEM --code NEW_ACCOUNTS_AVAILABLE
+"""
+import argparse
+import requests
+
+def build_webhook(webhook_type, webhook_code, item_id):
+    """Build a webhook body shaped like the ones Plaid sends."""
+    body = {
+        'webhook_type': webhook_type,
+        'webhook_code': webhook_code,
+        'item_id': item_id,
+        'environment': 'sandbox'
+    }
+    if webhook_type == 'TRANSACTIONS' and webhook_code == 'SYNC_UPDATES_AVAILABLE':
+        body.update({'initial_update_complete': True, 'historical_update_complete': True})
+    elif webhook_type == 'TRANSACTIONS' and webhook_code == 'DEFAULT_UPDATE':
+        body['new_transactions'] = 1
+    elif webhook_type == 'TRANSACTIONS' and webhook_code == 'TRANSACTIONS_REMOVED':
+        body['removed_transactions'] = []
+    elif webhook_type == 'ITEM' and webhook_code == 'ERROR':
+        body['error'] = {'error_type': 'ITEM_ERROR', 'error_code': 'ITEM_LOGIN_REQUIRED'}
+    return body
+
+def main():
+    parser = argparse.ArgumentParser(description='Send a fake Plaid webhook to a local server')
+    parser.add_argument('--url', default='http://localhost:5000/api/plaid/webhook')
+    parser.add_argument('--item-id', required=True, help='Plaid item_id (plaid_items.item_id)')
+    parser.add_argument('--type', default='TRANSACTIONS', help='webhook_type, e.g. TRANSACTIONS or ITEM')
+    parser.add_argument('--code', default='SYNC_UPDATES_AVAILABLE', help='webhook_code')
+    args = parser.parse_args()
+
+    body = build_webhook(args.type, args.code, args.item_id)
+    response = requests.post(args.url, json=body, timeout=10)
+    print(f"{response.status_code} {response.text.strip()}")
+
+if __name__ == '__main__':
+    main()